@@ -0,0 +1,134 @@
+import logging
+
+try:
+    import numpy as np
+except ImportError as e:  # Only report generation needs NumPy
+    raise ImportError("Batch analysis requires NumPy: pip install numpy") from e
+
+logger = logging.getLogger('NetSpeedMeter')
+
+DEFAULT_PERCENTILES = (50, 95, 99)
+
+
+def counter_deltas(counters, counter_bits=64):
+    """Per-step increments of cumulative counters with resets and wraps corrected.
+
+    counters is a (time, interface) array. A counter that goes backwards has
+    either wrapped (it was in the top half of its range, as 32-bit counters
+    do) and the increment is counted across the wrap, or it was reset (NIC
+    re-added, driver reload) and the new value is the increment since the
+    reset. Returns (deltas, resets) where resets marks corrected steps.
+
+    counters may be a masked array with missing samples masked, as from
+    trace_arrays(); steps from or to a missing sample are then masked in
+    deltas and never count as resets.
+    """
+    missing = np.ma.getmaskarray(counters)
+    counters = np.asarray(np.ma.getdata(counters))
+    if counters.ndim == 1:
+        counters = counters[:, np.newaxis]
+        missing = missing[:, np.newaxis]
+    # int64 is exact for anything below 8 EiB and lets differences go negative
+    values = counters.astype(np.int64, copy=False)
+    deltas = np.diff(values, axis=0)
+    resets = deltas < 0
+    if resets.any():
+        current = values[1:]
+        corrected = np.where(resets, current, deltas)
+        if counter_bits < 64:
+            previous = values[:-1]
+            wrapped = resets & (previous >= (1 << (counter_bits - 1)))
+            corrected = np.where(wrapped, current + (1 << counter_bits) - previous, corrected)
+        deltas = corrected
+    if missing.any():
+        gaps = missing[1:] | missing[:-1]
+        resets &= ~gaps
+        deltas = np.ma.masked_array(deltas, gaps)
+    return deltas, resets
+
+
+def compute_rates(timestamps, counters, counter_bits=64):
+    """Bytes/s between consecutive samples for every interface.
+
+    Returns (rates, intervals, resets); rates has one row fewer than the
+    input and is NaN where the interval isn't positive or a sample is missing.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    deltas, resets = counter_deltas(counters, counter_bits)
+    intervals = np.diff(timestamps)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        rates = np.ma.filled(deltas / intervals[:, np.newaxis], np.nan)
+    rates[intervals <= 0] = np.nan
+    return rates, intervals, resets
+
+
+def rolling_mean(rates, intervals, window):
+    """Time-weighted mean rate over the last `window` steps, i.e. bytes over seconds.
+
+    The first window-1 rows average over however many steps exist so far.
+    """
+    valid = ~np.isnan(rates)
+    byte_counts = np.where(valid, rates * intervals[:, np.newaxis], 0.0)
+    seconds = np.where(valid, intervals[:, np.newaxis], 0.0)
+
+    def window_sum(values):
+        total = np.cumsum(values, axis=0)
+        total[window:] = total[window:] - total[:-window]
+        return total
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        return window_sum(byte_counts) / window_sum(seconds)
+
+
+def percentiles(rates, q=DEFAULT_PERCENTILES):
+    """Per-interface percentiles as a (len(q), interface) array, ignoring gaps"""
+    return np.nanpercentile(rates, q, axis=0)
+
+
+def analyze(timestamps, counters, window=60, q=DEFAULT_PERCENTILES, counter_bits=64):
+    """Rates, reset corrections, rolling means and percentiles in one pass"""
+    rates, intervals, resets = compute_rates(timestamps, counters, counter_bits)
+    return {
+        'rates': rates,
+        'intervals': intervals,
+        'resets': resets,
+        'rolling_mean': rolling_mean(rates, intervals, window),
+        'percentiles': dict(zip(q, percentiles(rates, q))),
+    }
+
+
+def trace_arrays(path, field='bytes_recv'):
+    """Load one counter of a recorded trace as (timestamps, counters, interface names).
+
+    counters is a masked array: samples an interface wasn't reported in
+    (before it appeared, after it went away) are masked, so their rates come
+    out as gaps rather than its whole counter in one step.
+    """
+    from counter_trace import ReplayCounterSource
+    from net_sampler import COUNTER_FIELDS
+
+    source = ReplayCounterSource(path)
+    offset = COUNTER_FIELDS.index(field)
+    names = []
+    columns = {}
+    timestamps = []
+    rows = []
+    try:
+        for sample_names, timestamp, values in source.iter_samples():
+            width = len(sample_names)
+            for name in sample_names:
+                if name not in columns:
+                    columns[name] = len(names)
+                    names.append(name)
+            timestamps.append(timestamp)
+            rows.append((sample_names, values[offset * width:(offset + 1) * width]))
+    finally:
+        source.close()
+
+    counters = np.zeros((len(rows), len(names)), dtype=np.int64)
+    present = np.zeros((len(rows), len(names)), dtype=bool)
+    for row, (sample_names, values) in enumerate(rows):
+        cells = [columns[name] for name in sample_names]
+        counters[row, cells] = values
+        present[row, cells] = True
+    return np.asarray(timestamps), np.ma.masked_array(counters, ~present), names
@@ -0,0 +1,94 @@
+"""Per-tick CPU cost of each counter source at 1, 50 and 500 interfaces.
+
+Both sources read the same synthetic /proc/net/dev: the procfs source is
+pointed at it directly and psutil through psutil.PROCFS_PATH, so the numbers
+compare parsing cost rather than what the host happens to have configured.
+
+Run from the repository root (Linux only):
+    python -m benchmarks.bench_counter_sources
+"""
+import os
+import sys
+import tempfile
+import time
+
+import psutil
+
+from counter_sources import ProcNetDevCounterSource, PsutilCounterSource
+from net_sampler import InterfaceTable
+
+INTERFACE_COUNTS = (1, 50, 500)
+MIN_DURATION = 1.0  # seconds of CPU time per measurement
+
+HEADER = (
+    'Inter-|   Receive                                                |  Transmit\n'
+    ' face |bytes    packets errs drop fifo frame compressed multicast|'
+    'bytes    packets errs drop fifo colls carrier compressed\n'
+)
+
+
+def write_proc_net_dev(directory, interface_count):
+    """Write a /proc/net/dev lookalike with the given number of veth interfaces"""
+    os.makedirs(os.path.join(directory, 'net'), exist_ok=True)
+    lines = [HEADER]
+    for i in range(interface_count):
+        recv = 123456789012 + i * 7919
+        sent = 98765432109 + i * 104729
+        lines.append(
+            f'{"veth%05d" % i:>6}:{recv:8d} {recv // 1400:7d}    0    3    0     0          0         0 '
+            f'{sent:8d} {sent // 1400:7d}    0    1    0     0       0          0\n'
+        )
+    with open(os.path.join(directory, 'net', 'dev'), 'w') as f:
+        f.write(''.join(lines))
+
+
+def measure(source):
+    """Average CPU time per tick in microseconds"""
+    table = InterfaceTable()
+    # Warm up so interface registration isn't part of the steady state
+    for _ in range(3):
+        table.begin_tick(time.monotonic())
+        source.read(table)
+        table.end_tick()
+
+    ticks = 0
+    start = time.process_time()
+    while True:
+        for _ in range(100):
+            table.begin_tick(time.monotonic())
+            source.read(table)
+            table.end_tick()
+        ticks += 100
+        elapsed = time.process_time() - start
+        if elapsed >= MIN_DURATION:
+            return elapsed / ticks * 1e6
+
+
+def main():
+    if not sys.platform.startswith('linux'):
+        print('Counter source benchmark requires Linux')
+        return
+
+    original_procfs = psutil.PROCFS_PATH
+    print(f'{"interfaces":>10} {"psutil us/tick":>15} {"procfs us/tick":>15} {"speedup":>8}')
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            for count in INTERFACE_COUNTS:
+                write_proc_net_dev(directory, count)
+                psutil.PROCFS_PATH = directory
+                psutil_cost = measure(PsutilCounterSource())
+
+                source = ProcNetDevCounterSource(os.path.join(directory, 'net', 'dev'))
+                try:
+                    procfs_cost = measure(source)
+                finally:
+                    source.close()
+
+                print(f'{count:>10} {psutil_cost:>15.1f} {procfs_cost:>15.1f} '
+                      f'{psutil_cost / procfs_cost:>7.1f}x')
+        finally:
+            psutil.PROCFS_PATH = original_procfs
+
+
+if __name__ == '__main__':
+    main()
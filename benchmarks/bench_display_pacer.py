@@ -0,0 +1,75 @@
+"""Readings sent to the GUI per second: every tick against DisplayPacer.
+
+Synthetic traffic profiles are fed through a SpeedCalculator at the
+scheduler's fast rate of 10 ticks per second, on a simulated clock. Before,
+every tick was a queued cross-thread signal and a GUI wake-up; the pacer
+only sends readings that change the display at its precision, at most one
+per frame budget, plus a re-send of an unchanged reading every MAX_STALE
+seconds. Also reports the pacer's own cost per tick, on the measurement
+thread.
+
+Run from the repository root:
+    python -m benchmarks.bench_display_pacer [--seconds N] [--budget MS]
+"""
+import argparse
+import random
+import time
+
+from display_pacer import DisplayPacer, FRAME_BUDGET_MS
+from speed_calculator import SpeedCalculator
+
+TICK = 0.1   # seconds, the scheduler's fast period
+
+# name -> bytes per second for tick n
+PROFILES = {
+    'idle': lambda n, rnd: 0.0,
+    'trickle 1-2 KB/s': lambda n, rnd: rnd.uniform(1000, 2000) if n % 10 == 0 else 0.0,
+    'steady 850 KB/s ±0.05%': lambda n, rnd: 850 * 1024 * rnd.uniform(0.9995, 1.0005),
+    'download 5 MB/s ±5%': lambda n, rnd: 5 * 1024 * 1024 * rnd.uniform(0.95, 1.05),
+}
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def run(profile, seconds, budget, smoothing):
+    rnd = random.Random(1)
+    clock = FakeClock()
+    calculator = SpeedCalculator()
+    calculator.set_smoothing(smoothing)
+    sent = []
+    pacer = DisplayPacer(lambda download, upload, interval: sent.append(download),
+                         frame_budget_ms=budget, clock=clock)
+    ticks = int(seconds / TICK)
+    elapsed = 0
+    for n in range(ticks):
+        clock.now = n * TICK
+        rate = profile(n, rnd)
+        calculator.add_rates(rate, rate / 20, TICK, clock.now)
+        download, upload = calculator.get_current_speeds()
+        start = time.perf_counter_ns()
+        pacer(download, upload, TICK)
+        elapsed += time.perf_counter_ns() - start
+    return ticks / seconds, len(sent) / seconds, elapsed / ticks
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=int, default=600)
+    parser.add_argument('--budget', type=int, default=FRAME_BUDGET_MS, help='frame budget in ms')
+    args = parser.parse_args()
+
+    print(f'{"profile":<24} {"smoothing":<9} {"before /s":>10} {"after /s":>9} {"pacer µs":>9}')
+    for smoothing in ('instant', 'ewma'):
+        for name, profile in PROFILES.items():
+            before, after, cost = run(profile, args.seconds, args.budget, smoothing)
+            print(f'{name:<24} {smoothing:<9} {before:>10.1f} {after:>9.2f} {cost / 1e3:>9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""Fleet aggregator cost per host at 1 Hz.
+
+Measures the receive path (datagram_received) per datagram and the
+once-a-second publish (totals, ranking and the shared memory write) for
+1,000, 5,000 and 10,000 hosts, and derives how much of one core a fleet of
+that size costs. Pass --loopback to also push real datagrams through the
+asyncio endpoint on 127.0.0.1 with the simulator.
+
+Run from the repository root:
+    python -m benchmarks.bench_fleet [--loopback]
+"""
+import argparse
+import asyncio
+import os
+import time
+
+from fleet import FleetAggregator, encode_datagram, fleet_rows, simulate
+from shared_rates import SharedRatesPublisher
+
+HOST_COUNTS = (1000, 5000, 10000)
+ROUNDS = 5
+
+
+def datagrams(hosts, sequence):
+    return [encode_datagram(f'host-{n:05d}'.encode(), sequence, 1e9 + sequence, 1.0, 1000.0 * n, 100.0 * n)
+            for n in range(hosts)]
+
+
+def bench_ingest(hosts):
+    aggregator = FleetAggregator()
+    address = ('127.0.0.1', 40000)
+    rounds = [datagrams(hosts, sequence) for sequence in range(1, ROUNDS + 2)]
+    for data in rounds[0]:
+        aggregator.datagram_received(data, address)  # register the hosts
+    start = time.perf_counter_ns()
+    for batch in rounds[1:]:
+        for data in batch:
+            aggregator.datagram_received(data, address)
+    return aggregator, (time.perf_counter_ns() - start) / (hosts * ROUNDS)
+
+
+def bench_publish(aggregator, hosts):
+    publisher = SharedRatesPublisher(name=f'netspeedmeter-bench-{os.getpid()}', capacity=hosts)
+    try:
+        start = time.perf_counter_ns()
+        for _ in range(ROUNDS):
+            live = aggregator.live_hosts()
+            _, recv, sent = aggregator.totals(live)
+            publisher.write(time.time(), 1.0, recv, sent, fleet_rows(live, hosts))
+        return (time.perf_counter_ns() - start) / ROUNDS
+    finally:
+        publisher.close()
+
+
+async def bench_loopback(hosts, seconds=3.0):
+    loop = asyncio.get_running_loop()
+    transport, aggregator = await loop.create_datagram_endpoint(FleetAggregator, local_addr=('127.0.0.1', 0))
+    port = transport.get_extra_info('sockname')[1]
+    start = time.process_time()
+    sent = await simulate('127.0.0.1', port, hosts, duration=seconds)
+    cpu = time.process_time() - start
+    transport.close()
+    return sent, aggregator.received, cpu
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--loopback', action='store_true', help='also run simulated agents over loopback')
+    args = parser.parse_args()
+
+    print(f'{"hosts":>7} {"ns/datagram":>12} {"publish ms":>11} {"core % at 1 Hz":>15}')
+    for hosts in HOST_COUNTS:
+        aggregator, ingest_ns = bench_ingest(hosts)
+        publish_ns = bench_publish(aggregator, hosts)
+        core = (ingest_ns * hosts + publish_ns) / 1e9
+        print(f'{hosts:>7} {ingest_ns:>12,.0f} {publish_ns / 1e6:>11.2f} {core:>15.1%}')
+
+    if args.loopback:
+        for hosts in HOST_COUNTS:
+            sent, received, cpu = asyncio.run(bench_loopback(hosts))
+            print(f'loopback {hosts} agents: {received}/{sent} datagrams received, '
+                  f'{cpu:.2f} s CPU for senders and aggregator together')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Compression ratio and throughput of the history block codec.
+
+Synthetic per-second traces for a host with four interfaces (received and
+sent byte counters each), compared against 16 raw bytes per sample per
+interface (two 64-bit counters).
+
+Run from the repository root:
+    python -m benchmarks.bench_history_codec
+"""
+import random
+import time
+
+from history_codec import BlockEncoder, decode_block
+
+SAMPLES = 20000
+INTERFACES = 4
+RAW_BYTES_PER_SAMPLE = 16 * INTERFACES
+
+
+def trace(kind, seed=1):
+    """Yield (timestamp, counters) for an idle, bursty or saturated link"""
+    rng = random.Random(seed)
+    counters = [rng.randrange(1 << 40) for _ in range(INTERFACES * 2)]
+    timestamp = 1_700_000_000.0
+    burst = 0
+    for _ in range(SAMPLES):
+        # Sampling jitter of a few milliseconds around a 1 s period
+        timestamp += 1.0 + rng.uniform(-0.003, 0.003)
+        for k in range(len(counters)):
+            if kind == 'idle':
+                step = rng.choice((0, 0, 0, 60, 120)) if k < 2 else 0
+            elif kind == 'bursty':
+                if burst == 0 and rng.random() < 0.02:
+                    burst = rng.randrange(2, 30)
+                step = rng.randrange(5_000_000, 50_000_000) if burst and k < 2 else rng.randrange(200)
+            else:
+                step = 117_000_000 + rng.randrange(-500_000, 500_000) if k < 2 else 0
+            counters[k] += step
+        burst = max(0, burst - 1)
+        yield timestamp, tuple(counters)
+
+
+def main():
+    print(f'{"trace":>10} {"bytes/sample":>13} {"ratio":>7} {"encode/s":>12} {"decode/s":>12}')
+    for kind in ('idle', 'bursty', 'saturated'):
+        samples = list(trace(kind))
+        encoder = BlockEncoder(INTERFACES * 2)
+
+        start = time.perf_counter()
+        blocks = [block for block in (encoder.add(t, v) for t, v in samples) if block]
+        last = encoder.flush()
+        if last:
+            blocks.append(last)
+        encode_time = time.perf_counter() - start
+
+        start = time.perf_counter()
+        decoded = [sample for block in blocks for sample in decode_block(block)]
+        decode_time = time.perf_counter() - start
+
+        assert [v for _, v in decoded] == [v for _, v in samples]
+        size = sum(len(block) for block in blocks)
+        print(f'{kind:>10} {size / SAMPLES:>13.2f} {RAW_BYTES_PER_SAMPLE * SAMPLES / size:>6.1f}x '
+              f'{SAMPLES / encode_time:>12,.0f} {SAMPLES / decode_time:>12,.0f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,274 @@
+"""Cost of the sampling, calculation and formatting hot path.
+
+Every case is timed in ns/op, with retained memory blocks per op (net
+allocations that outlive the call) and peak bytes allocated during one call
+(temporary garbage). Calculation cases are driven by a synthetic trace or by
+a recorded one (--trace), and the whole replay pipeline is reported in
+samples/s. Results are written to benchmarks/results/ as JSON and compared
+with the previous run so regressions between versions stand out.
+
+Run from the repository root, no display needed:
+    python -m benchmarks.bench_hot_path [--trace FILE] [--filter NAME] [--no-save]
+"""
+import argparse
+import gc
+import itertools
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+
+# Formatting cases import the widget module; never open a window
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from counter_sources import PsutilCounterSource, create_counter_source
+from counter_trace import ReplayCounterSource, TraceRecorder, replay
+from net_sampler import InterfaceFilter, InterfaceTable, NetSampler
+from speed_calculator import SpeedCalculator
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+MIN_DURATION = 0.5       # seconds per measurement
+REGRESSION_THRESHOLD = 0.10
+SYNTHETIC_INTERFACES = 8
+SYNTHETIC_SAMPLES = 5000
+
+
+def write_synthetic_trace(path, interfaces=SYNTHETIC_INTERFACES, samples=SYNTHETIC_SAMPLES):
+    """Record a deterministic trace of mixed idle and busy interfaces at 10 Hz"""
+    table = InterfaceTable()
+    for i in range(interfaces):
+        table.add_interface(f'eth{i}')
+    recorder = TraceRecorder(path)
+    timestamp = 1000.0
+    for n in range(samples):
+        table.begin_tick(timestamp)
+        for i in range(interfaces):
+            busy = (n // 50 + i) % 3 == 0
+            step = 1_250_000 + (n * 7919 + i * 104729) % 250_000 if busy else (n + i) % 2 * 60
+            table.bytes_recv[i] = table.prev_bytes_recv[i] + step
+            table.bytes_sent[i] = table.prev_bytes_sent[i] + step // 20
+            table.packets_recv[i] = table.prev_packets_recv[i] + step // 1400
+            table.packets_sent[i] = table.prev_packets_sent[i] + step // 28000
+            table.seen[i] = table.tick
+        table.updated = interfaces
+        recorder.record(table)
+        timestamp += 0.1
+    recorder.close()
+
+
+def load_trace(path):
+    """(final interface table, per-tick byte deltas) for driving calculator cases"""
+    source = ReplayCounterSource(path)
+    sampler = NetSampler(source, clock=source.clock)
+    calculator = SpeedCalculator()
+    deltas = []
+    while not source.finished():
+        table = sampler.sample()
+        interval = table.interval()
+        if interval > 0:
+            recv_rate, sent_rate = calculator.calculate_rates(table)
+            deltas.append((recv_rate * interval, sent_rate * interval, interval))
+    sampler.close()
+    return sampler.table, deltas
+
+
+def measure(op):
+    """(ns/op, retained blocks/op, peak bytes/op) for a zero-argument callable"""
+    for _ in range(100):
+        op()
+
+    loops = 1000
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(loops):
+            op()
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= MIN_DURATION * 1e9:
+            break
+        loops *= 2
+    ns_per_op = elapsed / loops
+
+    gc.collect()
+    gc.disable()
+    try:
+        blocks = sys.getallocatedblocks()
+        for _ in range(1000):
+            op()
+        retained = (sys.getallocatedblocks() - blocks) / 1000
+    finally:
+        gc.enable()
+
+    tracemalloc.start()
+    try:
+        op()
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+        op()
+        peak = tracemalloc.get_traced_memory()[1] - baseline
+    finally:
+        tracemalloc.stop()
+    return ns_per_op, retained, peak
+
+
+def calculator_cases(table, deltas):
+    calculator = SpeedCalculator()
+    interface_filter = InterfaceFilter(exclude=())
+    samples = itertools.cycle(deltas)
+    clock = itertools.count(1000.0, 0.1)
+
+    def calculate_speed():
+        recv, _, interval = next(samples)
+        calculator.calculate_speed(recv, interval)
+
+    def add_sample():
+        recv, _, interval = next(samples)
+        calculator.add_sample(recv, True, interval, next(clock))
+
+    for _ in range(20):
+        add_sample()
+
+    return {
+        'calculate_speed': calculate_speed,
+        'add_sample': add_sample,
+        'calculate_rates': lambda: calculator.calculate_rates(table, interface_filter),
+        'calculate_packet_rates': lambda: calculator.calculate_packet_rates(table, interface_filter),
+        'add_interface_quantiles': lambda: calculator.add_interface_quantiles(table, interface_filter),
+        'get_weighted_average': lambda: calculator.get_weighted_average(calculator.download_stats),
+        'get_current_speeds': calculator.get_current_speeds,
+    }
+
+
+def format_speed_label(self, speed_data, direction='down'):
+    """The widget's rich-text label before SpeedDisplay, kept as the baseline for format_speed"""
+    speed, unit = speed_data
+    speed_text = self.format_speed(speed, unit)
+    arrow = '↓' if direction == 'down' else '↑'
+
+    if self.show_colored_arrows:
+        color = self.download_color if direction == 'down' else self.upload_color
+        return f'<span style="color: {color}">{arrow}</span> {speed_text}'
+    return f'{arrow} {speed_text}'
+
+
+def formatting_cases():
+    try:
+        from speed_meter import SpeedMeter
+    except ImportError as e:
+        print(f'Skipping formatting cases: {e}')
+        return {}
+
+    class Formatter:
+        # The widget's formatting without constructing a window, plus the old label as the baseline
+        show_colored_arrows = True
+        download_color = '#ff4444'
+        upload_color = '#4CAF50'
+        format_speed = SpeedMeter.format_speed
+        format_speed_label = format_speed_label
+
+    formatter = Formatter()
+    speeds = itertools.cycle([(0.05, 'KB/s'), (5.5, 'KB/s'), (55.5, 'KB/s'), (555.5, 'KB/s'), (5.5, 'MB/s')])
+    return {
+        'format_speed': lambda: formatter.format_speed(*next(speeds)),
+        'format_speed_label': lambda: formatter.format_speed_label(next(speeds), 'down'),
+    }
+
+
+def counter_read_cases():
+    cases = {}
+    sources = {'psutil': PsutilCounterSource()}
+    source = create_counter_source()
+    if source.name != 'psutil':
+        sources[source.name] = source
+    for name, source in sources.items():
+        sampler = NetSampler(source)
+        cases[f'counter_read[{name}]'] = sampler.sample
+    return cases
+
+
+def pipeline_case(path):
+    """Whole replay path; reported as samples per second"""
+    ticks, elapsed = replay(path, SpeedCalculator())
+    return ticks / elapsed
+
+
+def git_revision():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def previous_results():
+    if not os.path.isdir(RESULTS_DIR):
+        return None
+    names = sorted(name for name in os.listdir(RESULTS_DIR) if name.endswith('.json'))
+    if not names:
+        return None
+    with open(os.path.join(RESULTS_DIR, names[-1])) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--trace', help='recorded .nsmtrace to drive the calculator cases')
+    parser.add_argument('--filter', default='', help='only run cases containing this text')
+    parser.add_argument('--no-save', action='store_true', help="don't store the results")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        trace = args.trace
+        if trace is None:
+            trace = os.path.join(directory, 'synthetic.nsmtrace')
+            write_synthetic_trace(trace)
+        table, deltas = load_trace(trace)
+
+        cases = {}
+        cases.update(counter_read_cases())
+        cases.update(calculator_cases(table, deltas))
+        cases.update(formatting_cases())
+
+        previous = previous_results()
+        previous_cases = previous['cases'] if previous else {}
+        results = {}
+        print(f'{"case":<26} {"ns/op":>10} {"ops/s":>12} {"blocks/op":>10} {"peak B/op":>10} {"change":>8}')
+        for name, op in cases.items():
+            if args.filter not in name:
+                continue
+            ns_per_op, retained, peak = measure(op)
+            results[name] = {'ns_per_op': ns_per_op, 'retained_blocks_per_op': retained,
+                             'peak_bytes_per_op': peak}
+            change = ''
+            if name in previous_cases:
+                ratio = ns_per_op / previous_cases[name]['ns_per_op'] - 1
+                change = f'{ratio:+.0%}' + (' !' if ratio > REGRESSION_THRESHOLD else '')
+            print(f'{name:<26} {ns_per_op:>10,.0f} {1e9 / ns_per_op:>12,.0f} '
+                  f'{retained:>10.2f} {peak:>10,} {change:>8}')
+
+        if args.filter in 'replay_pipeline':
+            samples_per_second = pipeline_case(trace)
+            results['replay_pipeline'] = {'samples_per_second': samples_per_second}
+            change = ''
+            if 'replay_pipeline' in previous_cases:
+                ratio = samples_per_second / previous_cases['replay_pipeline']['samples_per_second'] - 1
+                change = f'{ratio:+.0%}' + (' !' if ratio < -REGRESSION_THRESHOLD else '')
+            print(f'{"replay_pipeline":<26} {samples_per_second:>12,.0f} samples/s {change:>26}')
+
+    if previous:
+        print(f'Compared with {previous["revision"]} from {previous["date"]}')
+    if not args.no_save:
+        os.makedirs(RESULTS_DIR, exist_ok=True)
+        revision = git_revision()
+        date = time.strftime('%Y-%m-%dT%H:%M:%S')
+        path = os.path.join(RESULTS_DIR, f'{time.strftime("%Y%m%d-%H%M%S")}-{revision}.json')
+        with open(path, 'w') as f:
+            json.dump({'revision': revision, 'date': date, 'python': sys.version.split()[0],
+                       'platform': sys.platform, 'cases': results}, f, indent=2)
+        print(f'Results saved to {path}')
+
+
+if __name__ == '__main__':
+    main()
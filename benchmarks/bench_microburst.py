@@ -0,0 +1,71 @@
+"""Cost of microburst sampling at up to 1 kHz.
+
+Times one sample with each counter source and one frame summary, then runs
+the sampler flat out at 250, 500 and 1000 Hz for a few seconds and reports
+the samples taken, deadlines missed, frames delivered and the CPU it used.
+
+Run from the repository root:
+    python -m benchmarks.bench_microburst [--seconds S]
+"""
+import argparse
+import sys
+import threading
+import time
+
+from counter_sources import COUNTER_SOURCES
+from microburst import BurstSampler
+
+RATES = (250, 500, 1000)
+SAMPLES = 2000
+
+
+def bench_sample(source_name):
+    sampler = BurstSampler(source=COUNTER_SOURCES[source_name]())
+    sampler.sample()
+    start = time.perf_counter_ns()
+    for _ in range(SAMPLES):
+        sampler.sample()
+    sample_ns = (time.perf_counter_ns() - start) / SAMPLES
+    start = time.perf_counter_ns()
+    for _ in range(100):
+        sampler.frame_start = sampler.count - 101
+        sampler.frame()
+    frame_ns = (time.perf_counter_ns() - start) / 100
+    sampler.source.close()
+    return sample_ns, frame_ns
+
+
+def bench_run(rate, seconds):
+    sampler = BurstSampler(rate=rate)
+    frames = []
+    sampler.add_listener(frames.append)
+    thread = threading.Thread(target=sampler.run)
+    start_cpu = time.process_time()
+    thread.start()
+    time.sleep(seconds)
+    sampler.stop()
+    thread.join()
+    cpu = time.process_time() - start_cpu
+    missed = sum(frame.missed for frame in frames) + sampler.missed
+    return sampler.count, missed, len(frames), cpu / seconds
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=3.0)
+    args = parser.parse_args()
+
+    sources = ['psutil'] + (['procfs'] if sys.platform.startswith('linux') else [])
+    print(f'{"source":>8} {"µs/sample":>10} {"µs/frame (100 samples)":>23}')
+    for name in sources:
+        sample_ns, frame_ns = bench_sample(name)
+        print(f'{name:>8} {sample_ns / 1e3:>10.1f} {frame_ns / 1e3:>23.1f}')
+
+    print(f'\n{"rate":>6} {"samples":>8} {"missed":>7} {"frames":>7} {"core %":>7}')
+    for rate in RATES:
+        count, missed, frames, core = bench_run(rate, args.seconds)
+        print(f'{rate:>6} {count:>8} {missed:>7} {frames:>7} {core:>7.1%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""Per-namespace counters with many network namespaces.
+
+Starts N processes in namespaces of their own (unshare -n, so this needs
+root), then times a full scan (walking /proc and opening every
+namespace's net/dev) against a cached tick that only re-reads the open
+files, for 0, 100 and 300 extra namespaces. A cached tick that needed a
+rescan would show up in the last column.
+
+Run from the repository root (Linux, as root):
+    python -m benchmarks.bench_namespaces [--namespaces N ...]
+"""
+import argparse
+import subprocess
+import time
+
+from namespaces import NamespaceCounters
+
+ROUNDS = 20
+
+
+def spawn(count):
+    return [subprocess.Popen(['unshare', '--net', 'sleep', '3600']) for _ in range(count)]
+
+
+def bench(extra):
+    processes = spawn(extra)
+    time.sleep(0.5)
+    scan = 0
+    for _ in range(ROUNDS):
+        counters = NamespaceCounters()
+        start = time.perf_counter_ns()
+        counters.scan()
+        scan += (time.perf_counter_ns() - start) / ROUNDS
+        counters.close()
+    counters = NamespaceCounters()
+    try:
+        counters.update()
+        start = time.perf_counter_ns()
+        for _ in range(ROUNDS):
+            counters.update()
+        tick = (time.perf_counter_ns() - start) / ROUNDS
+        return len(counters.namespaces), counters.scans - 1, scan, tick
+    finally:
+        counters.close()
+        for process in processes:
+            process.kill()
+            process.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--namespaces', type=int, nargs='+', default=[0, 100, 300])
+    args = parser.parse_args()
+
+    print(f'{"extra":>6} {"found":>6} {"full scan ms":>13} {"cached tick ms":>15} {"rescans":>8}')
+    for extra in args.namespaces:
+        found, rescans, scan, tick = bench(extra)
+        print(f'{extra:>6} {found:>6} {scan / 1e6:>13.2f} {tick / 1e6:>15.3f} {rescans:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Cost of saving the window position during a drag: QSettings sync per move against SettingsStore.
+
+A drag is a stream of move events, each saving pos_x and pos_y. The old
+path wrote and synced QSettings on every one; SettingsStore keeps them in
+memory and writes once the moves have settled. Both use a throwaway INI
+file, never the meter's own settings. Reported per move, in wall time
+(the writes are disk I/O), together with the number of disk writes.
+
+Run from the repository root, no display needed:
+    python -m benchmarks.bench_settings [--moves N]
+"""
+import argparse
+import os
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEventLoop, QSettings, QTimer
+from PyQt5.QtWidgets import QApplication
+
+import settings_store
+from settings_store import SettingsStore
+
+
+def drag_synced(path, moves):
+    settings = QSettings(path, QSettings.IniFormat)
+    start = time.perf_counter_ns()
+    for n in range(moves):
+        settings.setValue('pos_x', 100 + n)
+        settings.setValue('pos_y', 300)
+        settings.sync()
+    return time.perf_counter_ns() - start, moves
+
+
+def drag_store(path, moves):
+    store = SettingsStore(QSettings(path, QSettings.IniFormat))
+    start = time.perf_counter_ns()
+    for n in range(moves):
+        store.set('pos_x', 100 + n)
+        store.set('pos_y', 300)
+    elapsed = time.perf_counter_ns() - start
+    during = store.writes
+    # Let the drag settle so the batch is written, and count that write too
+    loop = QEventLoop()
+    QTimer.singleShot(settings_store.SAVE_DELAY_MS + 200, loop.quit)
+    loop.exec_()
+    assert during == 0 and store.writes == 1
+    return elapsed, store.writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--moves', type=int, default=500)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, 'Settings.ini')
+        print(f'{"":<22} {"µs per move":>12} {"disk writes":>12}')
+        for name, drag in (('sync per move', drag_synced), ('SettingsStore', drag_store)):
+            elapsed, writes = drag(path, args.moves)
+            print(f'{name:<22} {elapsed / args.moves / 1e3:>12.1f} {writes:>12}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,115 @@
+"""Reader/writer contention on the shared-memory rates segment.
+
+A writer process publishes a synthetic interface table as fast as it can
+while 0, 1, 2 and 4 reader processes take snapshots in a loop. Reported are
+the writer's publish cost, each reader's snapshots/s and rates() reads/s,
+and how often a read raced a write and had to be retried.
+
+Run from the repository root:
+    python -m benchmarks.bench_shared_rates [--interfaces N] [--seconds S]
+"""
+import argparse
+import multiprocessing
+import os
+import time
+
+from net_sampler import InterfaceTable
+from shared_rates import SharedRatesPublisher, SharedRatesReader
+from speed_calculator import SpeedCalculator
+
+READER_COUNTS = (0, 1, 2, 4)
+
+
+def synthetic_table(interfaces):
+    table = InterfaceTable()
+    for i in range(interfaces):
+        table.add_interface(f'eth{i}')
+    for tick in range(2):
+        table.begin_tick(1000.0 + tick)
+        for i in range(interfaces):
+            table.bytes_recv[i] = (tick + 1) * 1_000_000 * (i + 1)
+            table.bytes_sent[i] = (tick + 1) * 50_000 * (i + 1)
+            table.seen[i] = table.tick
+        table.updated = interfaces
+    return table
+
+
+def writer(name, interfaces, ready, stop, results):
+    table = synthetic_table(interfaces)
+    publisher = SharedRatesPublisher(SpeedCalculator(), name=name)
+    ready.set()
+    publishes = 0
+    start = time.perf_counter()
+    while not stop.is_set():
+        for _ in range(100):
+            publisher.publish(table, 1.0)
+        publishes += 100
+    elapsed = time.perf_counter() - start
+    publisher.close()
+    results.put(('writer', publishes, elapsed, 0))
+
+
+def reader(name, method, seconds, results):
+    shared = SharedRatesReader(name)
+    read = getattr(shared, method)
+    reads = 0
+    deadline = time.perf_counter() + seconds
+    start = time.perf_counter()
+    while time.perf_counter() < deadline:
+        for _ in range(100):
+            read()
+        reads += 100
+    elapsed = time.perf_counter() - start
+    results.put((method, reads, elapsed, shared.contended_reads))
+    shared.close()
+
+
+def run(interfaces, reader_count, method, seconds):
+    name = f'netspeedmeter-bench-{os.getpid()}'
+    ready = multiprocessing.Event()
+    stop = multiprocessing.Event()
+    results = multiprocessing.Queue()
+    writer_process = multiprocessing.Process(target=writer, args=(name, interfaces, ready, stop, results))
+    writer_process.start()
+    ready.wait()
+    readers = [multiprocessing.Process(target=reader, args=(name, method, seconds, results))
+               for _ in range(reader_count)]
+    for process in readers:
+        process.start()
+    if not readers:
+        time.sleep(seconds)
+    for process in readers:
+        process.join()
+    stop.set()
+    writer_process.join()
+    finished = sum(process.exitcode == 0 for process in readers) + 1
+    return [results.get() for _ in range(finished)]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--interfaces', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=2.0)
+    args = parser.parse_args()
+
+    print(f'{args.interfaces} interfaces, writer publishing flat out')
+    print(f'{"readers":>7} {"read":>9} {"publish ns":>11} {"reads/s/reader":>15} {"ns/read":>9} {"retried":>8}')
+    for method in ('snapshot', 'rates'):
+        for reader_count in READER_COUNTS:
+            if method == 'rates' and reader_count == 0:
+                continue
+            results = run(args.interfaces, reader_count, method, args.seconds)
+            _, publishes, writer_elapsed, _ = next(r for r in results if r[0] == 'writer')
+            reads = [r for r in results if r[0] != 'writer']
+            publish_ns = writer_elapsed / publishes * 1e9
+            if reads:
+                per_reader = sum(count / elapsed for _, count, elapsed, _ in reads) / len(reads)
+                retried = sum(r[3] for r in reads) / sum(r[1] for r in reads)
+                print(f'{reader_count:>7} {method:>9} {publish_ns:>11,.0f} {per_reader:>15,.0f} '
+                      f'{1e9 / per_reader:>9,.0f} {retried:>8.2%}')
+            else:
+                print(f'{reader_count:>7} {"-":>9} {publish_ns:>11,.0f}')
+
+
+if __name__ == '__main__':
+    main()
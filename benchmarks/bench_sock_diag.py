@@ -0,0 +1,117 @@
+"""Per-endpoint TCP breakdown over loopback connections.
+
+Opens N loopback connections spread over a few listening ports, pushes a
+known number of bytes through each, and checks that TcpEndpoints credits
+every server port with exactly what its clients sent. Then times
+update() with all N connections open, steady state and with a tenth of
+them replaced between dumps. Each connection is two sockets; the run is
+capped by the open file limit.
+
+Run from the repository root (Linux):
+    python -m benchmarks.bench_sock_diag [--connections N ...]
+"""
+import argparse
+import resource
+import socket
+import time
+
+from sock_diag import TcpEndpoints
+
+SERVER_PORTS = 8
+ROUNDS = 5
+
+
+def open_connections(count, servers):
+    clients = []
+    accepted = []
+    for n in range(count):
+        server = servers[n % len(servers)]
+        client = socket.create_connection(server.getsockname())
+        clients.append(client)
+        accepted.append(server.accept()[0])
+    return clients, accepted
+
+
+def push(clients, accepted, base):
+    """Send base + index bytes on every client, drain the servers; returns bytes per server port"""
+    expected = {}
+    for n, (client, peer) in enumerate(zip(clients, accepted)):
+        size = base + n % 1000
+        client.sendall(b'x' * size)
+        received = 0
+        while received < size:
+            received += len(peer.recv(65536))
+        port = client.getpeername()[1]
+        expected[port] = expected.get(port, 0) + size
+    return expected
+
+
+def verify(endpoints, expected):
+    endpoints.update()
+    reported = {name: sent for name, _, sent in endpoints.top(len(endpoints.endpoint_keys))}
+    errors = 0
+    for port, size in expected.items():
+        if reported.get(f'127.0.0.1:{port}') != size:
+            errors += 1
+    return errors
+
+
+def bench(count, servers):
+    clients, accepted = open_connections(count, servers)
+    endpoints = TcpEndpoints(include_loopback=True)
+    try:
+        endpoints.update()
+        errors = verify(endpoints, push(clients, accepted, 100))
+
+        start = time.perf_counter_ns()
+        for _ in range(ROUNDS):
+            endpoints.update()
+        steady = (time.perf_counter_ns() - start) / ROUNDS
+
+        churn_ns = 0
+        for _ in range(ROUNDS):
+            replace = count // 10
+            for sock in clients[:replace] + accepted[:replace]:
+                sock.close()
+            fresh = open_connections(replace, servers)
+            clients[:replace], accepted[:replace] = fresh
+            start = time.perf_counter_ns()
+            endpoints.update()
+            churn_ns += time.perf_counter_ns() - start
+        return endpoints.sockets, errors, steady, churn_ns / ROUNDS
+    finally:
+        endpoints.close()
+        for sock in clients + accepted:
+            sock.close()
+
+
+def main():
+    soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+    resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+    limit = (hard - 64) // 2
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--connections', type=int, nargs='+', default=[1000, 4000, 8000])
+    args = parser.parse_args()
+
+    servers = []
+    for _ in range(SERVER_PORTS):
+        server = socket.socket()
+        server.bind(('127.0.0.1', 0))
+        server.listen(4096)
+        servers.append(server)
+
+    print(f'{"conns":>7} {"sockets":>8} {"wrong ports":>12} {"update ms":>10} {"ns/socket":>10} '
+          f'{"10% churn ms":>13}')
+    for count in args.connections:
+        if count > limit:
+            print(f'{count:>7} skipped: open file limit allows {limit} connections')
+            continue
+        sockets, errors, steady, churn = bench(count, servers)
+        print(f'{count:>7} {sockets:>8} {errors:>12} {steady / 1e6:>10.2f} {steady / sockets:>10,.0f} '
+              f'{churn / 1e6:>13.2f}')
+    for server in servers:
+        server.close()
+
+
+if __name__ == '__main__':
+    main()
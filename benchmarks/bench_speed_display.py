@@ -0,0 +1,109 @@
+"""GUI-thread cost of showing a reading: rich-text QLabel against SpeedDisplay.
+
+Both widgets sit in a shown, translucent window like the meter's. Each
+update sets a new reading and processes events until it has been painted,
+timed in GUI-thread CPU (thread_time) per update, for readings that change
+every time, readings that change only in their last digit and readings
+that repeat. Two more cases restyle before every update: with the same
+colour, as the meter does on every hover, and swapping between two themes.
+
+Run from the repository root, no display needed:
+    python -m benchmarks.bench_speed_display [--updates N]
+"""
+import argparse
+import itertools
+import os
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import QApplication, QLabel, QVBoxLayout, QWidget
+
+from speed_display import SpeedDisplay
+
+FONT_SIZE = 25
+COLORS = ('#E0E0E0', '#333333')
+READINGS = {
+    'changing': ['0.00 KB/s', '5.52 KB/s', '55.5 KB/s', '555 KB/s', '5.55 MB/s', '12.3 MB/s'],
+    'last digit': ['55.1 KB/s', '55.2 KB/s', '55.3 KB/s', '55.4 KB/s'],
+    'unchanged': ['0.00 KB/s'],
+}
+
+
+class RichLabel:
+    """The widget's previous path: HTML arrows and style sheets"""
+
+    def __init__(self):
+        self.label = QLabel('↓ 0 KB/s')
+        self.label.setStyleSheet(f'font-size: {FONT_SIZE}px; color: {COLORS[0]};')
+
+    def set_value(self, text):
+        self.label.setText(f'<span style="color: #ff4444">↓</span> {text}')
+
+    def set_color(self, color):
+        self.label.setStyleSheet(f'font-size: {FONT_SIZE}px; color: {color};')
+
+
+class PaintedLabel:
+    def __init__(self):
+        self.label = SpeedDisplay('↓', '0 KB/s')
+        self.label.set_font_size(FONT_SIZE)
+        self.label.set_text_color(COLORS[0])
+        self.label.set_arrow_color('#ff4444')
+
+    def set_value(self, text):
+        self.label.set_value(text)
+
+    def set_color(self, color):
+        self.label.set_text_color(color)
+
+
+def window_for(widget):
+    window = QWidget()
+    window.setWindowFlags(Qt.FramelessWindowHint | Qt.Tool)
+    window.setAttribute(Qt.WA_TranslucentBackground)
+    layout = QVBoxLayout(window)
+    layout.addWidget(widget)
+    window.show()
+    return window
+
+
+def bench(app, make, readings, updates, colors=None):
+    subject = make()
+    window = window_for(subject.label)
+    app.processEvents()
+    values = itertools.cycle(readings)
+    colors = itertools.cycle(colors) if colors else None
+    for _ in range(50):
+        subject.set_value(next(values))
+        app.processEvents()
+    start = time.thread_time_ns()
+    for _ in range(updates):
+        if colors is not None:
+            subject.set_color(next(colors))
+        subject.set_value(next(values))
+        app.processEvents()
+    elapsed = time.thread_time_ns() - start
+    window.close()
+    return elapsed / updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--updates', type=int, default=2000)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    print(f'{"readings":<22} {"QLabel µs":>10} {"SpeedDisplay µs":>16} {"saved":>7}')
+    cases = [(name, readings, None) for name, readings in READINGS.items()]
+    cases.append(('changing + hover', READINGS['changing'], COLORS[:1]))
+    cases.append(('changing + theme swap', READINGS['changing'], COLORS))
+    for name, readings, colors in cases:
+        label_ns = bench(app, RichLabel, readings, args.updates, colors)
+        display_ns = bench(app, PaintedLabel, readings, args.updates, colors)
+        print(f'{name:<22} {label_ns / 1e3:>10.1f} {display_ns / 1e3:>16.1f} {1 - display_ns / label_ns:>7.0%}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""GUI-thread cost of hover and opacity changes: style sheets against compiled themes.
+
+A window laid out like the meter's (a background panel, two speed lines
+and three small labels) is restyled the old way, with a fresh style sheet
+on the panel and every label, and the new way, through a cached Theme
+painted by ThemedPanel. Hover is timed per pointer crossing, including
+every frame of the fade animation for the compiled theme, after the
+window sat idle for a moment as it does between real crossings (work
+after idling runs on cold caches and costs noticeably more); a slider
+tick is one opacity change, back to back. All in GUI-thread CPU
+(thread_time), painting included.
+
+Run from the repository root, no display needed:
+    python -m benchmarks.bench_themes [--rounds N]
+"""
+import argparse
+import os
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt5.QtCore import QEventLoop, Qt
+from PyQt5.QtWidgets import QApplication, QLabel, QVBoxLayout, QWidget
+
+from speed_display import SpeedDisplay
+from themes import ThemeCache, ThemedPanel
+
+NORMAL_OPACITY = 0.8
+HOVER_OPACITY = 1.0
+IDLE_BEFORE_HOVER = 0.2   # seconds
+
+
+def build(panel, speed_lines):
+    window = QWidget()
+    window.setWindowFlags(Qt.FramelessWindowHint | Qt.Tool)
+    window.setAttribute(Qt.WA_TranslucentBackground)
+    QVBoxLayout(window).addWidget(panel)
+    layout = QVBoxLayout(panel)
+    small = [QLabel('↓ 120 pkt/s 1400 B'), QLabel('Peak 1s ↓ 1.2 MB/s'), QLabel('3 hosts ↓ 2 MB/s')]
+    for widget in speed_lines + small:
+        layout.addWidget(widget)
+    window.show()
+    return window, small
+
+
+class StyleSheetMeter:
+    """The meter's previous path: a style sheet per theme or opacity change"""
+
+    def __init__(self):
+        self.panel = QWidget()
+        self.panel.setObjectName('mainWidget')
+        self.lines = [QLabel('<span style="color: #ff4444">↓</span> 0.00 KB/s'),
+                      QLabel('<span style="color: #4CAF50">↑</span> 0.00 KB/s')]
+        self.window, self.small = build(self.panel, self.lines)
+        self.opacity = NORMAL_OPACITY
+        self.apply()
+
+    def apply(self):
+        self.panel.setStyleSheet(f"""
+            QWidget#mainWidget {{
+                background-color: rgba(0, 0, 0, {int(self.opacity * 255)});
+                border-radius: 10px;
+                border: 1px solid rgba(255, 255, 255, 0.1);
+            }}
+        """)
+        for label in self.lines:
+            label.setStyleSheet('font-size: 25px; color: #E0E0E0;')
+        for label in self.small:
+            label.setStyleSheet('font-size: 15px; color: #E0E0E0;')
+
+    def hover(self, app, entering):
+        self.opacity = HOVER_OPACITY if entering else NORMAL_OPACITY
+        self.apply()
+        app.processEvents()
+
+    def set_opacity(self, app, opacity):
+        self.opacity = opacity
+        self.apply()
+        app.processEvents()
+
+
+class CompiledMeter:
+    def __init__(self):
+        cache = ThemeCache()
+        theme = cache.get('dark')
+        self.panel = ThemedPanel(theme, NORMAL_OPACITY)
+        self.lines = [SpeedDisplay('↓', '0.00 KB/s'), SpeedDisplay('↑', '0.00 KB/s')]
+        for line in self.lines:
+            line.set_text_color(theme.text)
+        self.window, self.small = build(self.panel, self.lines)
+        for label in self.small:
+            label.setPalette(cache.text_palette(theme.text))
+        self.frames = 0
+        self.panel.fade.valueChanged.connect(self.count_frame)
+        self.loop = QEventLoop()
+        self.panel.fade.finished.connect(self.loop.quit)
+
+    def count_frame(self, value):
+        self.frames += 1
+
+    def hover(self, app, entering):
+        self.panel.fade_to(HOVER_OPACITY if entering else NORMAL_OPACITY)
+        # The whole fade in a real event loop; waiting between frames isn't GUI-thread CPU
+        self.loop.exec_()
+        app.processEvents()
+
+    def set_opacity(self, app, opacity):
+        self.panel.set_opacity(opacity)
+        app.processEvents()
+
+
+def bench(app, meter, rounds):
+    app.processEvents()
+    hover = 0
+    for n in range(rounds):
+        time.sleep(IDLE_BEFORE_HOVER)
+        start = time.thread_time_ns()
+        meter.hover(app, n % 2 == 0)
+        hover += (time.thread_time_ns() - start) / rounds
+    start = time.thread_time_ns()
+    for n in range(rounds):
+        meter.set_opacity(app, 0.2 + (n % 81) / 100)
+    slider = (time.thread_time_ns() - start) / rounds
+    meter.window.close()
+    return hover, slider
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rounds', type=int, default=50)
+    args = parser.parse_args()
+
+    app = QApplication([])
+    old_hover, old_slider = bench(app, StyleSheetMeter(), args.rounds)
+    compiled = CompiledMeter()
+    new_hover, new_slider = bench(app, compiled, args.rounds)
+    frames = compiled.frames / args.rounds
+    print(f'{"":<24} {"style sheets µs":>16} {"compiled µs":>12}')
+    print(f'{"hover crossing":<24} {old_hover / 1e3:>16.1f} {new_hover / 1e3:>12.1f}  ({frames:.0f} fade frames)')
+    print(f'{"opacity slider tick":<24} {old_slider / 1e3:>16.1f} {new_slider / 1e3:>12.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+import itertools
+import logging
+import threading
+import time
+
+from net_sampler import InterfaceFilter, NetSampler
+from scheduler import AdaptiveScheduler
+
+logger = logging.getLogger('NetSpeedMeter')
+
+# How much on-disk history is loaded back into memory at startup
+HISTORY_RESTORE_SECONDS = 24 * 60 * 60
+
+
+class Collector:
+    """The measurement pipeline without any GUI: sample, calculate, record, notify.
+
+    Each tick reads all interface counters, turns the selected ones into
+    byte and packet rates through the SpeedCalculator, feeds history and the optional trace
+    recorder, and calls every listener with (download, upload, interval),
+    where download and upload are (value, unit) pairs. Tick listeners get
+    (table, interval) first, for consumers that want the raw per-interface
+    counters rather than display values. Per-interface rate quantiles are
+    one such listener, on unless interface_quantiles is off. The Qt widget runs one
+    inside a QThread; the headless daemon runs one on its main thread.
+    History from disk is replayed on a thread of its own, so the first
+    tick doesn't wait for a day of records.
+    """
+
+    def __init__(self, speed_calculator, interface_filter=None, sampler=None, scheduler=None,
+                 history=None, history_log=None, recorder=None, interface_quantiles=True):
+        self.speed_calculator = speed_calculator
+        self.interface_filter = interface_filter or InterfaceFilter()
+        self.sampler = sampler or NetSampler()
+        self.scheduler = scheduler or AdaptiveScheduler()
+        self.history = history
+        self.history_log = history_log
+        self.recorder = recorder
+        self.listeners = []
+        self.tick_listeners = []
+        self.running = True
+        self.restorer = None
+        self._error_wait = threading.Event()
+        if interface_quantiles:
+            self.add_tick_listener(self.add_interface_quantiles)
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def add_tick_listener(self, listener):
+        self.tick_listeners.append(listener)
+
+    def add_interface_quantiles(self, table, interval):
+        self.speed_calculator.add_interface_quantiles(table, self.interface_filter)
+
+    def run(self):
+        if self.history is not None and self.history_log is not None:
+            self.restorer = threading.Thread(target=self.restore_history, name='history-restore', daemon=True)
+            self.restorer.start()
+        while self.running and self.scheduler.wait():
+            try:
+                self.tick()
+            except Exception as e:
+                logger.error(f"Error in speed measurement: {str(e)}")
+                self._error_wait.wait(1)
+        self.close()
+
+    def tick(self):
+        # One read of every interface's counters per tick
+        table = self.sampler.sample()
+        interval = table.interval()
+        recorder = self.recorder
+        if recorder is not None:
+            recorder.record(table)
+
+        # The first read only primes the previous counters
+        if interval <= 0:
+            return
+        recv_rate, sent_rate = self.speed_calculator.calculate_rates(table, self.interface_filter)
+        packets = self.speed_calculator.calculate_packet_rates(table, self.interface_filter)
+        self.scheduler.report_activity(recv_rate + sent_rate)
+        self.speed_calculator.add_rates(recv_rate, sent_rate, interval, table.timestamp)
+        now = time.time()
+        if self.history is not None:
+            self.history.record(now, interval, (recv_rate, sent_rate, packets.packets_recv, packets.packets_sent,
+                                                packets.errors_in + packets.errors_out,
+                                                packets.drops_in + packets.drops_out))
+        if self.history_log is not None:
+            self.history_log.append(now, interval, recv_rate, sent_rate)
+        for listener in self.tick_listeners:
+            listener(table, interval)
+
+        download, upload = self.speed_calculator.get_current_speeds()
+        for listener in self.listeners:
+            listener(download, upload, interval)
+
+    def restore_history(self):
+        """Reload recent history from disk so it survives restarts"""
+        try:
+            start = time.time() - HISTORY_RESTORE_SECONDS
+            records = itertools.takewhile(lambda record: self.running, self.history_log.read(start))
+            count = self.history.load(records)
+            logger.info(f"Restored {count} seconds of history")
+        except Exception as e:
+            logger.error(f"Error restoring history: {str(e)}")
+
+    def set_visible(self, visible):
+        """Let the scheduler slow down while nobody is looking"""
+        self.scheduler.set_visible(visible)
+
+    def stop(self):
+        self.running = False
+        self.scheduler.stop()
+        self._error_wait.set()
+
+    def close(self):
+        self.sampler.close()
+        if self.restorer is not None:
+            # Don't close the log under the replay
+            self.restorer.join()
+            self.restorer = None
+        if self.history_log is not None:
+            self.history_log.close()
+        if self.recorder is not None:
+            self.recorder.close()
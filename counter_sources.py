@@ -0,0 +1,183 @@
+import logging
+import os
+import sys
+from array import array
+
+import psutil
+
+logger = logging.getLogger('NetSpeedMeter')
+
+PROC_NET_DEV = '/proc/net/dev'
+
+PROC_NET_DEV_STRIDE = 17  # name + 16 counters
+
+# Table field and token offset (from the name token) of each column we keep
+PROC_NET_DEV_COLUMNS = (
+    ('bytes_recv', 1), ('packets_recv', 2), ('errin', 3), ('dropin', 4),
+    ('bytes_sent', 9), ('packets_sent', 10), ('errout', 11), ('dropout', 12),
+)
+
+
+class CounterSource:
+    """Interface for anything that can fill an InterfaceTable with cumulative counters.
+
+    read() is called once per tick between InterfaceTable.begin_tick() and
+    end_tick(); it must store each reported interface's counters at its table
+    index, mark it as seen for the current tick and set table.updated.
+    """
+
+    name = 'base'
+
+    def read(self, table):
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class PsutilCounterSource(CounterSource):
+    """Reads per-interface counters through psutil in a single call"""
+
+    name = 'psutil'
+
+    def read(self, table):
+        counters = psutil.net_io_counters(pernic=True)
+        index = table.index
+        tick = table.tick
+        seen = table.seen
+        bytes_recv, bytes_sent = table.bytes_recv, table.bytes_sent
+        packets_recv, packets_sent = table.packets_recv, table.packets_sent
+        errin, errout = table.errin, table.errout
+        dropin, dropout = table.dropin, table.dropout
+        for name, c in counters.items():
+            i = index.get(name)
+            if i is None:
+                i = table.add_interface(name)
+            bytes_recv[i] = c.bytes_recv
+            bytes_sent[i] = c.bytes_sent
+            packets_recv[i] = c.packets_recv
+            packets_sent[i] = c.packets_sent
+            errin[i] = c.errin
+            errout[i] = c.errout
+            dropin[i] = c.dropin
+            dropout[i] = c.dropout
+            seen[i] = tick
+        table.updated = len(counters)
+
+
+class ProcNetDevCounterSource(CounterSource):
+    """Linux fast path: pread /proc/net/dev through a persistent descriptor.
+
+    The file stays open for the lifetime of the source and is re-read from
+    offset 0 into a preallocated buffer every tick. Only the byte, packet,
+    error and drop columns are converted, and interface names are matched as
+    raw bytes so nothing is decoded after an interface first appears.
+    """
+
+    name = 'procfs'
+
+    def __init__(self, path=PROC_NET_DEV, buffer_size=64 * 1024):
+        self.path = path
+        self.fd = os.open(path, os.O_RDONLY)
+        self.buffer = bytearray(buffer_size)
+        self.view = memoryview(self.buffer)
+        self.name_index = {}  # raw interface name -> table index
+        self.names = None     # raw names of the last read when they line up with the table
+
+    def _read_file(self):
+        """Read the whole file into the buffer and return its length.
+
+        procfs files are seq_files that hand out about a page per read, so
+        a short read is not the end of the file: keep reading at the
+        advancing offset until a read returns nothing.
+        """
+        n = 0
+        while True:
+            if n == len(self.buffer):
+                # Buffer filled up completely; grow it so the read isn't truncated
+                buffer = bytearray(len(self.buffer) * 2)
+                buffer[:n] = self.buffer
+                self.view.release()
+                self.buffer = buffer
+                self.view = memoryview(buffer)
+            count = os.preadv(self.fd, [self.view[n:]], n)
+            if count == 0:
+                return n
+            n += count
+
+    def read_tokens(self):
+        """Raw tokens of the interface lines, PROC_NET_DEV_STRIDE per interface starting with its name"""
+        n = self._read_file()
+        buffer = self.buffer
+        # Skip the two header lines
+        start = buffer.find(b'\n', buffer.find(b'\n') + 1) + 1
+        # Wide counters can run straight into the colon after the name
+        return bytes(self.view[start:n]).replace(b':', b' ').split()
+
+    def read(self, table):
+        tokens = self.read_tokens()
+        names = tokens[::PROC_NET_DEV_STRIDE]
+        if names == self.names and len(table) == len(names):
+            # Same interfaces in the same order as they were registered:
+            # convert whole columns at once instead of walking line by line
+            for field, column in PROC_NET_DEV_COLUMNS:
+                getattr(table, field)[:] = array('Q', map(int, tokens[column::PROC_NET_DEV_STRIDE]))
+            table.seen[:] = array('Q', (table.tick,)) * len(names)
+            table.updated = len(names)
+            return
+        self._read_lines(table, tokens, names)
+
+    def _read_lines(self, table, tokens, names):
+        """Slow path used while interfaces appear, disappear or get reordered"""
+        name_index = self.name_index
+        if len(name_index) != len(table):
+            # Table was reset or shared with another source; rebuild the mapping
+            name_index.clear()
+            for i, name in enumerate(table.names):
+                name_index[name.encode()] = i
+        tick = table.tick
+        seen = table.seen
+        for k, raw_name in enumerate(names):
+            i = name_index.get(raw_name)
+            if i is None:
+                i = table.add_interface(raw_name.decode(errors='replace'))
+                name_index[raw_name] = i
+            base = k * PROC_NET_DEV_STRIDE
+            for field, column in PROC_NET_DEV_COLUMNS:
+                getattr(table, field)[i] = int(tokens[base + column])
+            seen[i] = tick
+        table.updated = len(names)
+        # Enable the bulk path only when line order matches table indices
+        if all(name_index.get(raw_name) == k for k, raw_name in enumerate(names)):
+            self.names = names
+        else:
+            self.names = None
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+            self.view.release()
+
+
+COUNTER_SOURCES = {
+    PsutilCounterSource.name: PsutilCounterSource,
+    ProcNetDevCounterSource.name: ProcNetDevCounterSource,
+}
+
+
+def create_counter_source(name='auto'):
+    """Create a counter source by name, picking the fastest available for 'auto'"""
+    if name == 'auto':
+        if sys.platform.startswith('linux') and os.access(PROC_NET_DEV, os.R_OK):
+            name = ProcNetDevCounterSource.name
+        else:
+            name = PsutilCounterSource.name
+    try:
+        return COUNTER_SOURCES[name]()
+    except KeyError:
+        raise ValueError(f"Unknown counter source: {name}. "
+                         f"Available sources: {', '.join(COUNTER_SOURCES)}") from None
+    except OSError as e:
+        logger.warning(f"Counter source {name} unavailable ({e}), falling back to psutil")
+        return PsutilCounterSource()
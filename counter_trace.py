@@ -0,0 +1,254 @@
+import argparse
+import logging
+import os
+import threading
+import time
+
+from counter_sources import CounterSource
+from history_codec import BlockEncoder, BlockFile, decode_block, read_varint, write_varint
+from net_sampler import COUNTER_FIELDS, NetSampler
+
+logger = logging.getLogger('NetSpeedMeter')
+
+TRACE_DIR = os.path.join(os.path.expanduser('~'), '.netspeedmeter', 'traces')
+TRACE_EXTENSION = '.nsmtrace'
+
+# Marks a block listing the interfaces that the following sample blocks cover
+NAMES_MAGIC = 0xC8
+
+
+def encode_names(names):
+    out = bytearray((NAMES_MAGIC,))
+    write_varint(out, len(names))
+    for name in names:
+        raw = name.encode()
+        write_varint(out, len(raw))
+        out.extend(raw)
+    return bytes(out)
+
+
+def decode_names(data):
+    count, pos = read_varint(data, 1)
+    names = []
+    for _ in range(count):
+        length, pos = read_varint(data, pos)
+        names.append(data[pos:pos + length].decode())
+        pos += length
+    return names
+
+
+def default_trace_path():
+    os.makedirs(TRACE_DIR, exist_ok=True)
+    return os.path.join(TRACE_DIR, time.strftime('trace-%Y%m%d-%H%M%S') + TRACE_EXTENSION)
+
+
+class TraceRecorder:
+    """Dumps the raw per-interface counter stream of every tick to a trace file.
+
+    Samples are stored with the compressed block codec, every counter of
+    every interface per tick. Whenever the interface set changes the current
+    block is closed and a names block is written before the next one.
+    """
+
+    def __init__(self, path=None):
+        self.path = path or default_trace_path()
+        self.file = BlockFile(self.path)
+        self.encoder = None
+        self.generation = None
+        self.samples = 0
+        self.lock = threading.Lock()
+        logger.info(f"Recording counter trace to {self.path}")
+
+    def record(self, table):
+        with self.lock:
+            if self.file is None:
+                return
+            if table.generation != self.generation:
+                self._flush_block()
+                self.file.append(encode_names(table.names))
+                self.encoder = BlockEncoder(len(table) * len(COUNTER_FIELDS))
+                self.generation = table.generation
+
+            values = []
+            for field in COUNTER_FIELDS:
+                values.extend(getattr(table, field))
+            block = self.encoder.add(table.timestamp, values)
+            if block:
+                self.file.append(block)
+            self.samples += 1
+
+    def _flush_block(self):
+        if self.encoder is not None:
+            block = self.encoder.flush()
+            if block:
+                self.file.append(block)
+
+    def close(self):
+        with self.lock:
+            if self.file is None:
+                return
+            self._flush_block()
+            self.file.close()
+            self.file = None
+        logger.info(f"Recorded {self.samples} samples to {self.path}")
+
+
+class ReplayCounterSource(CounterSource):
+    """Feeds a recorded trace into an InterfaceTable with a virtual clock.
+
+    Pass clock() as the NetSampler clock: it advances to the next recorded
+    sample and returns its timestamp, and read() then fills the table with
+    that sample's counters.
+    """
+
+    name = 'replay'
+
+    def __init__(self, path):
+        self.path = path
+        self.file = BlockFile(path)
+        self.samples = self.iter_samples()
+        self.names = []
+        self.current = None
+        self.upcoming = next(self.samples, None)
+
+    def iter_samples(self):
+        """Yield (interface names, timestamp, counter values) for every recorded sample"""
+        names = []
+        for index in range(len(self.file)):
+            data = self.file.block(index)
+            if data[0] == NAMES_MAGIC:
+                names = decode_names(data)
+                continue
+            for timestamp, values in decode_block(data):
+                yield names, timestamp, values
+
+    def finished(self):
+        return self.upcoming is None
+
+    def peek_timestamp(self):
+        return None if self.upcoming is None else self.upcoming[1]
+
+    def clock(self):
+        if self.upcoming is not None:
+            self.current = self.upcoming
+            self.upcoming = next(self.samples, None)
+        return self.current[1] if self.current else 0.0
+
+    def read(self, table):
+        if self.current is None:
+            return
+        names, _, values = self.current
+        index = table.index
+        count = len(names)
+        tick = table.tick
+        for i, name in enumerate(names):
+            slot = index.get(name)
+            if slot is None:
+                slot = table.add_interface(name)
+            for f, field in enumerate(COUNTER_FIELDS):
+                getattr(table, field)[slot] = values[f * count + i]
+            table.seen[slot] = tick
+        table.updated = count
+
+    def close(self):
+        self.file.close()
+
+
+class ReplayScheduler:
+    """Paces a replay like AdaptiveScheduler paces live sampling.
+
+    With speed=None samples are delivered as fast as they can be processed;
+    otherwise the recorded gaps are reproduced, scaled by speed.
+    """
+
+    def __init__(self, source, speed=None):
+        self.source = source
+        self.speed = speed
+        self.running = True
+        self.last_timestamp = None
+        self._stop_event = threading.Event()
+
+    def wait(self):
+        if not self.running or self.source.finished():
+            return False
+        timestamp = self.source.peek_timestamp()
+        if self.speed and self.last_timestamp is not None:
+            if self._stop_event.wait(max(0.0, (timestamp - self.last_timestamp) / self.speed)):
+                return False
+        self.last_timestamp = timestamp
+        return True
+
+    def report_activity(self, bytes_per_second):
+        pass
+
+    def set_visible(self, visible):
+        pass
+
+    def stop(self):
+        self.running = False
+        self._stop_event.set()
+
+
+def create_replay(path, speed=None):
+    """Sampler and scheduler that drive SpeedThread from a recorded trace"""
+    source = ReplayCounterSource(path)
+    return NetSampler(source, clock=source.clock), ReplayScheduler(source, speed)
+
+
+def replay(path, speed_calculator, interface_filter=None, callback=None, speed=None):
+    """Run a trace through the calculation path without Qt; returns (ticks, seconds)"""
+    from collector import Collector
+
+    sampler, scheduler = create_replay(path, speed)
+    collector = Collector(speed_calculator, interface_filter, sampler, scheduler)
+    ticks = 0
+
+    def count(download, upload, interval):
+        nonlocal ticks
+        ticks += 1
+        if callback is not None:
+            callback(download, upload, interval)
+
+    collector.add_listener(count)
+    start = time.perf_counter()
+    collector.run()
+    return ticks, time.perf_counter() - start
+
+
+def main():
+    from speed_calculator import SpeedCalculator
+
+    parser = argparse.ArgumentParser(description='Record or replay network counter traces')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    record_parser = subparsers.add_parser('record', help='record live counters')
+    record_parser.add_argument('path', nargs='?')
+    record_parser.add_argument('--seconds', type=float, default=60)
+    record_parser.add_argument('--period', type=float, default=0.1)
+    replay_parser = subparsers.add_parser('replay', help='replay a trace headlessly')
+    replay_parser.add_argument('path')
+    replay_parser.add_argument('--speed', type=float, default=None,
+                               help='real-time factor (default: as fast as possible)')
+    replay_parser.add_argument('--print', action='store_true', help='print every reading')
+    args = parser.parse_args()
+
+    if args.command == 'record':
+        sampler = NetSampler()
+        recorder = TraceRecorder(args.path)
+        deadline = time.monotonic() + args.seconds
+        try:
+            while time.monotonic() < deadline:
+                recorder.record(sampler.sample())
+                time.sleep(args.period)
+        finally:
+            recorder.close()
+            sampler.close()
+        print(f'Recorded {recorder.samples} samples to {recorder.path}')
+    else:
+        callback = (lambda down, up, interval: print(f'{down[0]:8.2f} {down[1]}  {up[0]:8.2f} {up[1]}')
+                    if args.print else None)
+        ticks, elapsed = replay(args.path, SpeedCalculator(), callback=callback, speed=args.speed)
+        print(f'Replayed {ticks} ticks in {elapsed:.3f} s ({ticks / elapsed:,.0f} ticks/s)')
+
+
+if __name__ == '__main__':
+    main()
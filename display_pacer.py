@@ -0,0 +1,60 @@
+import time
+
+from speed_calculator import format_speed
+
+FRAME_BUDGET_MS = 100   # at most one display update per frame budget
+FRAME_SLACK = 0.1       # fraction of the budget a reading may come early, for tick jitter
+MAX_STALE = 1.0         # seconds an unchanged reading may go without being re-sent
+
+
+class DisplayPacer:
+    """Forwards readings to the display only when the display would change.
+
+    Sits between the Collector and the widget's queued signal, on the
+    measurement thread. A reading is compared with the last one sent after
+    formatting at display precision (plus whatever extra() returns, e.g. the
+    packet line), so jitter below the shown digits never crosses threads or
+    wakes the GUI. Readings that do change are paced to one per frame
+    budget; one held back goes out with the next tick instead. An unchanged
+    reading is re-sent every max_stale seconds, and nothing is sent while
+    the widget is hidden.
+    """
+
+    def __init__(self, listener, frame_budget_ms=FRAME_BUDGET_MS, max_stale=MAX_STALE,
+                 extra=None, clock=time.monotonic):
+        self.listener = listener
+        self.frame_budget = frame_budget_ms / 1000
+        self.max_stale = max_stale
+        self.extra = extra
+        self.clock = clock
+        self.visible = True
+        self.last_shown = None
+        self.last_sent = None
+        self.readings = 0
+        self.sent = 0
+
+    def __call__(self, download, upload, interval):
+        self.readings += 1
+        if not self.visible:
+            return
+        now = self.clock()
+        shown = (format_speed(*download), format_speed(*upload))
+        if self.extra is not None:
+            shown += (self.extra(),)
+        last = self.last_sent
+        if last is not None:
+            elapsed = now - last
+            if elapsed < self.frame_budget * (1 - FRAME_SLACK):
+                return
+            if shown == self.last_shown and elapsed < self.max_stale:
+                return
+        self.last_shown = shown
+        self.last_sent = now
+        self.sent += 1
+        self.listener(download, upload, interval)
+
+    def set_visible(self, visible):
+        """Stop sending while hidden; the first reading after showing goes out at once"""
+        self.visible = visible
+        if visible:
+            self.last_sent = None
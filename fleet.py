@@ -0,0 +1,333 @@
+"""Fleet view: agents push rates over UDP to one aggregator.
+
+Each host runs the daemon as an agent (netspeed_daemon.py --agent HOST),
+which sends one small datagram per second. The aggregator keeps a ring of
+recent samples per host and publishes the fleet in shared memory, where the
+widget's fleet view (--fleet) picks it up:
+
+    python fleet.py aggregate [--port 9178] [--print]
+    python fleet.py simulate --agents 2000      # load test on loopback
+"""
+import argparse
+import asyncio
+import logging
+import signal
+import socket
+import struct
+import sys
+import time
+from array import array
+
+from logging_setup import setup_logging
+from net_sampler import COUNTER_FIELDS
+from shared_rates import NAME_SIZE, SharedRatesPublisher, default_segment_name
+
+logger = logging.getLogger('NetSpeedMeter')
+
+DEFAULT_PORT = 9178
+FLEET_MEMORY_NAME = 'netspeedmeter-fleet'   # prefix; the segment is per user like the rates one
+FLEET_CAPACITY = 4096       # hosts published to the widget
+AGENT_PERIOD = 1.0
+HOST_HISTORY = 60           # samples kept per host
+HOST_TIMEOUT = 5.0          # seconds without a datagram before a host counts as down
+HOST_FORGET = 3600.0        # seconds before a silent host is dropped altogether
+RECEIVE_BUFFER = 4 * 1024 * 1024
+
+DATAGRAM_MAGIC = b'NS'
+DATAGRAM_VERSION = 1
+# magic, version, host name length, sequence, wall-clock time, seconds
+# covered, receive and send rates in bytes per second; the name follows
+DATAGRAM = struct.Struct('<2sBBIdfdd')
+
+
+def parse_address(text, default_port=DEFAULT_PORT):
+    """(host, port) from 'host', 'host:port', '[v6]:port' or a bare IPv6 address"""
+    if text.startswith('['):
+        host, _, port = text[1:].partition(']')
+        port = port.lstrip(':')
+    elif text.count(':') == 1:
+        host, port = text.split(':')
+    else:
+        host, port = text, ''
+    return host, int(port) if port else default_port
+
+
+def encode_datagram(name, sequence, timestamp, interval, recv_rate, sent_rate):
+    return DATAGRAM.pack(DATAGRAM_MAGIC, DATAGRAM_VERSION, len(name), sequence & 0xFFFFFFFF,
+                         timestamp, interval, recv_rate, sent_rate) + name
+
+
+class RateAgent:
+    """Collector tick listener that sends this host's rates to an aggregator.
+
+    Ticks are folded together and sent once per period as the mean rate
+    over it, so a 10 Hz sampler still costs the network one datagram a
+    second. Sending never blocks; a missing aggregator just drops datagrams.
+    """
+
+    def __init__(self, speed_calculator, host, port=DEFAULT_PORT, name=None, period=AGENT_PERIOD):
+        self.speed_calculator = speed_calculator
+        self.address = (host, port)
+        self.name = (name or socket.gethostname()).encode()[:255]
+        self.period = period
+        self.sequence = 0
+        self.recv_bytes = 0.0
+        self.sent_bytes = 0.0
+        self.seconds = 0.0
+        family = socket.getaddrinfo(host, port, type=socket.SOCK_DGRAM)[0][0]
+        self.sock = socket.socket(family, socket.SOCK_DGRAM)
+        self.sock.setblocking(False)
+        # Connected, so sends skip the address lookup
+        self.sock.connect(self.address)
+        logger.info(f"Sending rates to aggregator at {host}:{port} as {self.name.decode()}")
+
+    def update(self, table, interval):
+        self.recv_bytes += self.speed_calculator.download_stats.latest * interval
+        self.sent_bytes += self.speed_calculator.upload_stats.latest * interval
+        self.seconds += interval
+        if self.seconds >= self.period:
+            self.send(self.recv_bytes / self.seconds, self.sent_bytes / self.seconds, self.seconds)
+            self.recv_bytes = self.sent_bytes = self.seconds = 0.0
+
+    def send(self, recv_rate, sent_rate, interval):
+        self.sequence += 1
+        try:
+            self.sock.send(encode_datagram(self.name, self.sequence, time.time(), interval,
+                                           recv_rate, sent_rate))
+        except OSError:
+            # Aggregator not up yet (ICMP port unreachable) or the buffer is full
+            pass
+
+    def close(self):
+        self.sock.close()
+
+
+class HostHistory:
+    """Ring of the most recent samples from one host"""
+
+    __slots__ = ('name', 'times', 'recv', 'sent', 'count', 'sequence', 'last_seen', 'lost')
+
+    def __init__(self, name, capacity=HOST_HISTORY):
+        self.name = name
+        self.times = array('d', [0.0]) * capacity
+        self.recv = array('d', [0.0]) * capacity
+        self.sent = array('d', [0.0]) * capacity
+        self.count = 0
+        self.sequence = 0
+        self.last_seen = 0.0
+        self.lost = 0
+
+    def add(self, sequence, timestamp, recv_rate, sent_rate, now):
+        gap = (sequence - self.sequence) & 0xFFFFFFFF
+        if self.count and gap == 0:
+            return False
+        if self.count and gap >= 0x80000000:
+            # Older than what we have: reordered or duplicated on the way, unless the
+            # agent restarted, which shows as time moving on or a silence before it
+            newest = self.times[(self.count - 1) % len(self.times)]
+            if ((self.sequence - sequence) & 0xFFFFFFFF < HOST_HISTORY and timestamp <= newest
+                    and now - self.last_seen <= HOST_TIMEOUT):
+                return False
+            gap = 1
+        if self.count and gap > 1:
+            self.lost += gap - 1
+        slot = self.count % len(self.times)
+        self.times[slot] = timestamp
+        self.recv[slot] = recv_rate
+        self.sent[slot] = sent_rate
+        self.count += 1
+        self.sequence = sequence
+        self.last_seen = now
+        return True
+
+    def latest(self):
+        slot = (self.count - 1) % len(self.times)
+        return self.times[slot], self.recv[slot], self.sent[slot]
+
+    def samples(self):
+        """(timestamp, recv rate, sent rate) oldest first"""
+        capacity = len(self.times)
+        first = max(0, self.count - capacity)
+        return [(self.times[n % capacity], self.recv[n % capacity], self.sent[n % capacity])
+                for n in range(first, self.count)]
+
+
+class FleetAggregator(asyncio.DatagramProtocol):
+    """Ingests agent datagrams and keeps per-host history.
+
+    The receive path is one struct unpack and a dict lookup keyed by the raw
+    name bytes, so thousands of hosts at 1 Hz fit comfortably on one core.
+    """
+
+    def __init__(self, clock=time.monotonic):
+        self.clock = clock
+        self.hosts = {}
+        self.received = 0
+        self.malformed = 0
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+        sock = transport.get_extra_info('socket')
+        try:
+            # Room for a burst of thousands of datagrams arriving in the same tick
+            sock.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, RECEIVE_BUFFER)
+        except OSError:
+            pass
+
+    def datagram_received(self, data, addr):
+        if len(data) < DATAGRAM.size or data[:2] != DATAGRAM_MAGIC:
+            self.malformed += 1
+            return
+        _, version, name_length, sequence, timestamp, _, recv_rate, sent_rate = DATAGRAM.unpack_from(data)
+        key = data[DATAGRAM.size:DATAGRAM.size + name_length]
+        if version != DATAGRAM_VERSION or len(key) != name_length:
+            self.malformed += 1
+            return
+        host = self.hosts.get(key)
+        if host is None:
+            host = self.hosts[key] = HostHistory(key.decode(errors='replace'))
+            logger.debug(f"New host {host.name} from {addr[0]}")
+        host.add(sequence, timestamp, recv_rate, sent_rate, self.clock())
+        self.received += 1
+
+    def live_hosts(self):
+        """Hosts heard from within HOST_TIMEOUT, forgetting long-silent ones"""
+        now = self.clock()
+        live = []
+        for key, host in list(self.hosts.items()):
+            age = now - host.last_seen
+            if age <= HOST_TIMEOUT:
+                live.append(host)
+            elif age > HOST_FORGET:
+                del self.hosts[key]
+        return live
+
+    def totals(self, live=None):
+        """(live host count, total receive rate, total send rate)"""
+        if live is None:
+            live = self.live_hosts()
+        recv = sent = 0.0
+        for host in live:
+            _, host_recv, host_sent = host.latest()
+            recv += host_recv
+            sent += host_sent
+        return len(live), recv, sent
+
+
+def fleet_segment_name():
+    return default_segment_name(FLEET_MEMORY_NAME)
+
+
+def fleet_rows(hosts, capacity=FLEET_CAPACITY):
+    """Shared memory rows for the busiest hosts, heaviest first; agents send no counters"""
+    latest = [(host, *host.latest()) for host in hosts]
+    latest.sort(key=lambda item: item[2] + item[3], reverse=True)
+    counters = (0,) * len(COUNTER_FIELDS)
+    return [(host.name.encode()[:NAME_SIZE], *counters, recv, sent)
+            for host, _, recv, sent in latest[:capacity]]
+
+
+async def aggregate(host, port, publish_period=1.0, shared=True, print_totals=False,
+                    name=None, capacity=FLEET_CAPACITY):
+    """Receive agent datagrams until SIGINT/SIGTERM; returns an exit status"""
+    loop = asyncio.get_running_loop()
+    publisher = None
+    if shared:
+        # Claim the segment before the port, so a second aggregator leaves both alone
+        try:
+            publisher = SharedRatesPublisher(name=name or fleet_segment_name(), capacity=capacity)
+        except FileExistsError as e:
+            logger.error(str(e))
+            return 1
+    try:
+        transport, aggregator = await loop.create_datagram_endpoint(
+            FleetAggregator, local_addr=(host, port))
+    except OSError as e:
+        logger.error(f"Error listening on {host}:{port}: {str(e)}")
+        if publisher is not None:
+            publisher.close()
+        return 1
+    logger.info(f"Aggregating agent rates on {host}:{port}")
+
+    stop = asyncio.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(signum, stop.set)
+        except (NotImplementedError, RuntimeError):
+            pass
+    try:
+        while not stop.is_set():
+            try:
+                await asyncio.wait_for(stop.wait(), publish_period)
+            except asyncio.TimeoutError:
+                pass
+            live = aggregator.live_hosts()
+            count, recv, sent = aggregator.totals(live)
+            if publisher is not None:
+                # Only the busiest hosts fit; the header carries how many there are
+                publisher.write(time.time(), publish_period, recv, sent, fleet_rows(live, capacity), count)
+            if print_totals:
+                print(f'{count:6d} hosts  ↓ {recv / 1024:12.1f} KB/s  ↑ {sent / 1024:12.1f} KB/s  '
+                      f'({aggregator.received} datagrams)', flush=True)
+    finally:
+        transport.close()
+        if publisher is not None:
+            publisher.close()
+    return 0
+
+
+async def simulate(host, port, agents, period=AGENT_PERIOD, duration=None):
+    """Send datagrams from many synthetic agents, spread evenly over each period"""
+    loop = asyncio.get_running_loop()
+    transport, _ = await loop.create_datagram_endpoint(asyncio.DatagramProtocol, remote_addr=(host, port))
+    names = [f'sim-{n:05d}'.encode() for n in range(agents)]
+    sequence = 0
+    start = loop.time()
+    try:
+        while duration is None or loop.time() - start < duration:
+            sequence += 1
+            period_start = loop.time()
+            for n, name in enumerate(names):
+                rate = 1000.0 * (n % 100 + 1)
+                transport.sendto(encode_datagram(name, sequence, time.time(), period, rate, rate / 10))
+                if n % 100 == 99:
+                    # Pace the burst instead of overflowing the receive buffer
+                    delay = period_start + period * (n + 1) / agents - loop.time()
+                    await asyncio.sleep(max(0.0, delay))
+            await asyncio.sleep(max(0.0, period_start + period - loop.time()))
+    finally:
+        transport.close()
+    return sequence * agents
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Aggregate network rates from many hosts')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+    aggregate_parser = subparsers.add_parser('aggregate', help='receive agent datagrams')
+    aggregate_parser.add_argument('--host', default='0.0.0.0')
+    aggregate_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    aggregate_parser.add_argument('--no-shared-memory', action='store_true',
+                                  help="don't publish the fleet for the widget")
+    aggregate_parser.add_argument('--print', action='store_true', help='print fleet totals every second')
+    simulate_parser = subparsers.add_parser('simulate', help='run synthetic agents against an aggregator')
+    simulate_parser.add_argument('--host', default='127.0.0.1')
+    simulate_parser.add_argument('--port', type=int, default=DEFAULT_PORT)
+    simulate_parser.add_argument('--agents', type=int, default=1000)
+    simulate_parser.add_argument('--seconds', type=float, default=None)
+    args = parser.parse_args()
+
+    if args.command == 'aggregate':
+        setup_logging('fleet_aggregator.log')
+        return asyncio.run(aggregate(args.host, args.port, shared=not args.no_shared_memory,
+                                     print_totals=args.print))
+    try:
+        sent = asyncio.run(simulate(args.host, args.port, args.agents, duration=args.seconds))
+        print(f'Sent {sent} datagrams')
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,188 @@
+import logging
+import threading
+from array import array
+from collections import namedtuple
+
+logger = logging.getLogger('NetSpeedMeter')
+
+# Rates recorded per tick: bytes per second, then packets per second, then
+# errors and drops per second in both directions together
+HISTORY_SERIES = ('recv', 'sent', 'packets_recv', 'packets_sent', 'errors', 'drops')
+
+# (name, seconds per bucket, buckets kept)
+HISTORY_TIERS = (
+    ('second', 1, 3600),         # last hour
+    ('minute', 60, 7 * 24 * 60),  # last week
+    ('hour', 3600, 366 * 24),     # last year
+)
+
+HistoryPoint = namedtuple('HistoryPoint', 'time seconds mean min max total')
+
+
+class HistoryTier:
+    """Fixed-size ring of aggregates at one resolution.
+
+    Slots are addressed directly by bucket number modulo capacity, so a gap
+    (machine asleep, meter not running) needs no bookkeeping: a slot whose
+    stored bucket number doesn't match simply holds nothing for that time.
+    Every column is a preallocated numeric array.
+    """
+
+    def __init__(self, name, resolution, capacity, series=HISTORY_SERIES):
+        self.name = name
+        self.resolution = resolution
+        self.capacity = capacity
+        self.series = series
+        self.buckets = array('q', [-1]) * capacity
+        self.seconds = array('d', [0.0]) * capacity
+        self.totals = [array('d', [0.0]) * capacity for _ in series]
+        self.minimums = [array('d', [0.0]) * capacity for _ in series]
+        self.maximums = [array('d', [0.0]) * capacity for _ in series]
+        self.current = -1
+        self.slot = 0
+
+    def add(self, timestamp, interval, rates):
+        """Fold one tick's rates into the bucket covering timestamp"""
+        bucket = int(timestamp // self.resolution)
+        if bucket != self.current:
+            slot = bucket % self.capacity
+            if self.buckets[slot] != bucket:
+                if self.buckets[slot] > bucket:
+                    # Older than what the slot holds now, e.g. history restored
+                    # while live ticks already arrive; the ring has moved past it
+                    return
+                self._reset(slot, bucket)
+            self.current = bucket
+            self.slot = slot
+        slot = self.slot
+        self.seconds[slot] += interval
+        for k, rate in enumerate(rates):
+            self.totals[k][slot] += rate * interval
+            if rate < self.minimums[k][slot]:
+                self.minimums[k][slot] = rate
+            if rate > self.maximums[k][slot]:
+                self.maximums[k][slot] = rate
+
+    def _reset(self, slot, bucket):
+        self.buckets[slot] = bucket
+        self.seconds[slot] = 0.0
+        for k in range(len(self.series)):
+            self.totals[k][slot] = 0.0
+            self.minimums[k][slot] = float('inf')
+            self.maximums[k][slot] = float('-inf')
+
+    def retention(self):
+        return self.resolution * self.capacity
+
+    def covers(self, start, end):
+        """Whether the ring still holds buckets back to start, for a query ending at end"""
+        newest = max(self.current + 1, int(-(-end // self.resolution)))
+        return start >= (newest - self.capacity) * self.resolution
+
+    def query(self, series_index, start, end, step):
+        """Points for [start, end) merged into groups of step seconds"""
+        first = int(start // self.resolution)
+        last = int(-(-end // self.resolution))  # ceil
+        # Older buckets than the ring holds have been overwritten
+        first = max(first, last - self.capacity)
+        per_point = max(1, int(step // self.resolution))
+
+        totals = self.totals[series_index]
+        minimums = self.minimums[series_index]
+        maximums = self.maximums[series_index]
+        points = []
+        group = None
+        for bucket in range(first, last):
+            slot = bucket % self.capacity
+            # A series that got no rate in a bucket (history restored from a
+            # log that only has bytes) still has its reset maximum
+            if self.buckets[slot] != bucket or self.seconds[slot] <= 0 or maximums[slot] == float('-inf'):
+                continue
+            group_start = bucket - bucket % per_point
+            if group is None or group[0] != group_start:
+                if group is not None:
+                    points.append(self._point(group))
+                group = [group_start, 0.0, 0.0, float('inf'), float('-inf')]
+            group[1] += self.seconds[slot]
+            group[2] += totals[slot]
+            group[3] = min(group[3], minimums[slot])
+            group[4] = max(group[4], maximums[slot])
+        if group is not None:
+            points.append(self._point(group))
+        return points
+
+    def _point(self, group):
+        bucket, seconds, total, minimum, maximum = group
+        return HistoryPoint(bucket * self.resolution, seconds, total / seconds,
+                            minimum, maximum, total)
+
+    def memory_usage(self):
+        columns = [self.buckets, self.seconds, *self.totals, *self.minimums, *self.maximums]
+        return sum(column.itemsize * len(column) for column in columns)
+
+
+class HistoryStore:
+    """In-memory multi-resolution throughput history with incremental rollups.
+
+    Each tick is folded into the open bucket of every tier at once, so the
+    minute and hour rollups are always up to date without re-reading the
+    finer tiers. Timestamps are wall-clock seconds so history lines up with
+    real dates.
+    """
+
+    def __init__(self, tiers=HISTORY_TIERS, series=HISTORY_SERIES):
+        self.series = series
+        self.tiers = [HistoryTier(name, resolution, capacity, series)
+                      for name, resolution, capacity in tiers]
+        self.lock = threading.Lock()
+        logger.info(f"History store using {self.memory_usage() / 1024:.0f} KiB")
+
+    def record(self, timestamp, interval, rates):
+        """Add one tick of rates (aligned with self.series) ending at timestamp"""
+        if interval <= 0:
+            return
+        with self.lock:
+            for tier in self.tiers:
+                tier.add(timestamp, interval, rates)
+
+    def load(self, records):
+        """Replay (timestamp, seconds, total per series...) records, e.g. from HistoryLog.
+
+        Records may cover only the leading series; the others stay empty for those times.
+        """
+        count = 0
+        for timestamp, seconds, *totals in records:
+            if seconds > 0:
+                self.record(timestamp, seconds, [total / seconds for total in totals])
+                count += 1
+        return count
+
+    def tier_for(self, resolution, start=None, end=None):
+        """Tier to answer a query from.
+
+        Only tiers that still reach back to start count, so a fine resolution
+        over a long range falls back to coarser buckets instead of being cut
+        to the fine tier's retention. Of those, the coarsest one no wider than
+        the requested resolution; failing that, the finest; and when no tier
+        reaches that far, the one that keeps the most.
+        """
+        tiers = self.tiers
+        if start is not None:
+            tiers = [tier for tier in tiers if tier.covers(start, end)]
+            if not tiers:
+                return max(self.tiers, key=HistoryTier.retention)
+        candidates = [tier for tier in tiers if tier.resolution <= resolution]
+        if not candidates:
+            return min(tiers, key=lambda tier: tier.resolution)
+        return max(candidates, key=lambda tier: tier.resolution)
+
+    def query(self, series, start, end, resolution=1):
+        """Points of one series between two wall-clock times at roughly the given resolution"""
+        series_index = self.series.index(series)
+        with self.lock:
+            tier = self.tier_for(resolution, start, end)
+            step = max(resolution, tier.resolution)
+            return tier.query(series_index, start, end, step)
+
+    def memory_usage(self):
+        return sum(tier.memory_usage() for tier in self.tiers)
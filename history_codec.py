@@ -0,0 +1,195 @@
+import logging
+import os
+import struct
+from array import array
+
+logger = logging.getLogger('NetSpeedMeter')
+
+BLOCK_MAGIC = 0xC7
+BLOCK_SAMPLES = 256          # samples per independently decodable block
+BLOCK_LENGTH = struct.Struct('<I')
+
+
+def write_varint(out, value):
+    """Append an unsigned LEB128 varint to a bytearray"""
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def write_signed(out, value):
+    # Zigzag so small negative numbers stay short too
+    write_varint(out, (value << 1) if value >= 0 else ((-value << 1) - 1))
+
+
+def read_varint(data, pos):
+    result = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        result |= (byte & 0x7F) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def read_signed(data, pos):
+    value, pos = read_varint(data, pos)
+    return (value >> 1) ^ -(value & 1), pos
+
+
+class BlockEncoder:
+    """Streaming Gorilla-style encoder for (timestamp, counters) samples.
+
+    Timestamps are stored in milliseconds as a delta-of-delta, so a steady
+    sampling period costs one byte per sample. Counters are cumulative, so
+    each value is stored as the change in its per-sample delta, and a bitmap
+    marks which ones changed at all: a counter on an idle or steadily
+    saturated link costs a single bit, and only a change in traffic costs a
+    zigzag varint. Every block starts from absolute values and can be decoded
+    on its own.
+    """
+
+    def __init__(self, width, block_samples=BLOCK_SAMPLES):
+        self.width = width
+        self.mask_size = (width + 7) // 8
+        self.block_samples = block_samples
+        self._start_block()
+
+    def _start_block(self):
+        self.buffer = bytearray()
+        self.count = 0
+        self.prev_time = 0
+        self.prev_time_delta = 0
+        self.prev_values = None
+        self.prev_deltas = [0] * self.width
+
+    def add(self, timestamp, values):
+        """Add one sample; returns a finished block when one fills up, else None"""
+        out = self.buffer
+        timestamp_ms = int(round(timestamp * 1000))
+        if self.count == 0:
+            write_signed(out, timestamp_ms)
+            for value in values:
+                write_varint(out, value)
+            self.prev_values = list(values)
+        else:
+            delta = timestamp_ms - self.prev_time
+            write_signed(out, delta - self.prev_time_delta)
+            self.prev_time_delta = delta
+
+            # Bitmap of values whose delta changed, then only those values
+            prev_values = self.prev_values
+            prev_deltas = self.prev_deltas
+            mask_pos = len(out)
+            out.extend(bytes(self.mask_size))
+            for k, value in enumerate(values):
+                delta = value - prev_values[k]
+                delta_of_delta = delta - prev_deltas[k]
+                if delta_of_delta:
+                    out[mask_pos + (k >> 3)] |= 1 << (k & 7)
+                    write_signed(out, delta_of_delta)
+                    prev_deltas[k] = delta
+                prev_values[k] = value
+        self.prev_time = timestamp_ms
+        self.count += 1
+
+        if self.count >= self.block_samples:
+            return self.flush()
+        return None
+
+    def flush(self):
+        """Finish the current block, returning its bytes (or None when empty)"""
+        if not self.count:
+            return None
+        header = bytearray((BLOCK_MAGIC,))
+        write_varint(header, self.count)
+        write_varint(header, self.width)
+        block = bytes(header + self.buffer)
+        self._start_block()
+        return block
+
+
+def decode_block(data):
+    """Yield (timestamp, values) samples from one encoded block"""
+    if not data or data[0] != BLOCK_MAGIC:
+        raise ValueError("Not a compressed history block")
+    count, pos = read_varint(data, 1)
+    width, pos = read_varint(data, pos)
+
+    timestamp_ms, pos = read_signed(data, pos)
+    values = [0] * width
+    for k in range(width):
+        values[k], pos = read_varint(data, pos)
+    yield timestamp_ms / 1000, tuple(values)
+
+    mask_size = (width + 7) // 8
+    time_delta = 0
+    deltas = [0] * width
+    for _ in range(count - 1):
+        delta_of_delta, pos = read_signed(data, pos)
+        time_delta += delta_of_delta
+        timestamp_ms += time_delta
+        mask = int.from_bytes(data[pos:pos + mask_size], 'little')
+        pos += mask_size
+        for k in range(width):
+            if mask >> k & 1:
+                delta_of_delta, pos = read_signed(data, pos)
+                deltas[k] += delta_of_delta
+            values[k] += deltas[k]
+        yield timestamp_ms / 1000, tuple(values)
+
+
+class BlockFile:
+    """Append-only file of length-prefixed compressed blocks with random access by block index"""
+
+    def __init__(self, path):
+        self.path = path
+        self.offsets = array('Q')
+        self.file = open(path, 'a+b')
+        self._scan()
+
+    def _scan(self):
+        """Index existing blocks, dropping a block cut short by a crash"""
+        self.file.seek(0)
+        size = os.fstat(self.file.fileno()).st_size
+        offset = 0
+        while offset + BLOCK_LENGTH.size <= size:
+            self.file.seek(offset)
+            length, = BLOCK_LENGTH.unpack(self.file.read(BLOCK_LENGTH.size))
+            if offset + BLOCK_LENGTH.size + length > size:
+                break
+            self.offsets.append(offset)
+            offset += BLOCK_LENGTH.size + length
+        if offset < size:
+            logger.warning(f"Truncating incomplete block at {offset} in {self.path}")
+            self.file.truncate(offset)
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def append(self, block):
+        self.file.seek(0, os.SEEK_END)
+        self.offsets.append(self.file.tell())
+        self.file.write(BLOCK_LENGTH.pack(len(block)))
+        self.file.write(block)
+
+    def block(self, index):
+        """Raw bytes of the block at index"""
+        self.file.flush()
+        self.file.seek(self.offsets[index])
+        length, = BLOCK_LENGTH.unpack(self.file.read(BLOCK_LENGTH.size))
+        return self.file.read(length)
+
+    def samples(self, first_block=0):
+        """Yield every sample from first_block onwards"""
+        for index in range(first_block, len(self.offsets)):
+            yield from decode_block(self.block(index))
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
@@ -0,0 +1,306 @@
+import itertools
+import logging
+import mmap
+import os
+import struct
+import threading
+import zlib
+
+logger = logging.getLogger('NetSpeedMeter')
+
+HISTORY_DIR = os.path.join(os.path.expanduser('~'), '.netspeedmeter', 'history')
+
+SEGMENT_MAGIC = b'NSMH'
+SEGMENT_VERSION = 1
+# magic, version, record size, first timestamp
+SEGMENT_HEADER = struct.Struct('<4sHHd')
+# second start, seconds covered, received bytes, sent bytes, crc32 of the preceding fields
+RECORD = struct.Struct('<dfddI')
+RECORD_BODY_SIZE = RECORD.size - 4
+
+SEGMENT_SIZE = 4 * 1024 * 1024  # ~36 hours of one record per second
+MAX_SEGMENTS = 256              # roughly a year
+FLUSH_INTERVAL = 5.0            # seconds between msync calls
+
+
+def pack_record(buffer, offset, timestamp, seconds, recv_bytes, sent_bytes):
+    RECORD.pack_into(buffer, offset, timestamp, seconds, recv_bytes, sent_bytes, 0)
+    crc = zlib.crc32(buffer[offset:offset + RECORD_BODY_SIZE])
+    struct.pack_into('<I', buffer, offset + RECORD_BODY_SIZE, crc)
+
+
+def record_is_valid(buffer, offset):
+    crc, = struct.unpack_from('<I', buffer, offset + RECORD_BODY_SIZE)
+    return crc != 0 and crc == zlib.crc32(buffer[offset:offset + RECORD_BODY_SIZE])
+
+
+class LogSegment:
+    """One preallocated, memory-mapped segment file of fixed-size records"""
+
+    def __init__(self, path, size=SEGMENT_SIZE, first_timestamp=0.0):
+        self.path = path
+        self.readers = 0   # HistoryLog.read() generators inside the mapping, under the log's lock
+        exists = os.path.exists(path)
+        self.file = open(path, 'r+b' if exists else 'w+b')
+        if not exists or os.path.getsize(path) < size:
+            # Preallocate so appends never have to grow the file
+            self.file.truncate(size)
+        self.size = os.path.getsize(path)
+        self.map = mmap.mmap(self.file.fileno(), self.size)
+        self.capacity = (self.size - SEGMENT_HEADER.size) // RECORD.size
+
+        magic, version, record_size, timestamp = SEGMENT_HEADER.unpack_from(self.map, 0)
+        if magic == SEGMENT_MAGIC:
+            if version != SEGMENT_VERSION or record_size != RECORD.size:
+                raise ValueError(f"Unsupported history segment format in {path}")
+            self.first_timestamp = timestamp
+            self.count = self._recover()
+        else:
+            self.first_timestamp = first_timestamp
+            SEGMENT_HEADER.pack_into(self.map, 0, SEGMENT_MAGIC, SEGMENT_VERSION,
+                                     RECORD.size, first_timestamp)
+            self.count = 0
+
+    def _recover(self):
+        """Find the end of the valid records and wipe a torn record after it"""
+        count = 0
+        offset = SEGMENT_HEADER.size
+        while count < self.capacity and record_is_valid(self.map, offset):
+            count += 1
+            offset += RECORD.size
+        if count < self.capacity and any(self.map[offset:offset + RECORD.size]):
+            logger.warning(f"Discarding torn record {count} in {self.path}")
+            self.map[offset:offset + RECORD.size] = bytes(RECORD.size)
+        return count
+
+    def is_full(self):
+        return self.count >= self.capacity
+
+    def append(self, timestamp, seconds, recv_bytes, sent_bytes):
+        offset = SEGMENT_HEADER.size + self.count * RECORD.size
+        pack_record(self.map, offset, timestamp, seconds, recv_bytes, sent_bytes)
+        self.count += 1
+
+    def records(self, start=None, end=None):
+        """Yield (timestamp, seconds, recv bytes, sent bytes) in [start, end)"""
+        first = 0 if start is None else self._bisect(start)
+        base = SEGMENT_HEADER.size
+        view = memoryview(self.map)[base + first * RECORD.size:base + self.count * RECORD.size]
+        try:
+            for timestamp, seconds, recv_bytes, sent_bytes, _ in RECORD.iter_unpack(view):
+                if end is not None and timestamp >= end:
+                    break
+                yield timestamp, seconds, recv_bytes, sent_bytes
+        finally:
+            view.release()
+
+    def _bisect(self, timestamp):
+        low, high = 0, self.count
+        while low < high:
+            middle = (low + high) // 2
+            value, = struct.unpack_from('<d', self.map, SEGMENT_HEADER.size + middle * RECORD.size)
+            if value < timestamp:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def last_timestamp(self):
+        if not self.count:
+            return None
+        offset = SEGMENT_HEADER.size + (self.count - 1) * RECORD.size
+        return struct.unpack_from('<d', self.map, offset)[0]
+
+    def flush(self):
+        self.map.flush()
+
+    def close(self, trim=False):
+        """Unmap the segment, optionally trimming unused preallocated space"""
+        if self.map.closed:
+            return
+        used = SEGMENT_HEADER.size + self.count * RECORD.size
+        self.map.flush()
+        self.map.close()
+        if trim:
+            self.file.truncate(used)
+        self.file.close()
+
+
+class HistoryLog:
+    """Crash-safe append-only history on disk, one record per second.
+
+    Ticks are accumulated into the current second and written as a
+    checksummed fixed-size record straight into a memory-mapped segment, so
+    an append is a memory copy. A background thread msyncs periodically,
+    prepares the next segment before the current one fills up and deletes
+    segments beyond the retention limit. A record torn by a crash fails its
+    checksum and is wiped by the recovery scan on the next start.
+    """
+
+    def __init__(self, directory=HISTORY_DIR, segment_size=SEGMENT_SIZE,
+                 max_segments=MAX_SEGMENTS, flush_interval=FLUSH_INTERVAL):
+        self.directory = directory
+        self.segment_size = segment_size
+        self.max_segments = max_segments
+        self.flush_interval = flush_interval
+        os.makedirs(directory, exist_ok=True)
+
+        self.segment = None
+        self.next_segment = None
+        self.retired = []  # full segments waiting to be trimmed and closed
+        self.second = None
+        self.pending = [0.0, 0.0, 0.0]  # seconds, received bytes, sent bytes
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+
+        paths = self.segment_paths()
+        self.sequence = itertools.count(int(os.path.basename(paths[-1])[:-4]) + 1 if paths else 0)
+        if paths:
+            segment = LogSegment(paths[-1], segment_size)
+            if segment.is_full():
+                segment.close(trim=True)
+            else:
+                self.segment = segment
+        self.flusher = threading.Thread(target=self._flush_loop, name='HistoryLogFlusher',
+                                        daemon=True)
+        self.flusher.start()
+
+    def segment_paths(self):
+        names = sorted(name for name in os.listdir(self.directory) if name.endswith('.seg'))
+        return [os.path.join(self.directory, name) for name in names]
+
+    def _new_segment(self, timestamp):
+        # Sequence-numbered names keep segments in write order however the clock moves
+        path = os.path.join(self.directory, f'{next(self.sequence):08d}.seg')
+        return LogSegment(path, self.segment_size, timestamp)
+
+    def append(self, timestamp, interval, recv_rate, sent_rate):
+        """Add one tick; a record is written once its second is complete"""
+        second = int(timestamp)
+        if second != self.second:
+            if self.second is not None and self.pending[0] > 0:
+                self._write(self.second, *self.pending)
+            self.second = second
+            self.pending = [0.0, 0.0, 0.0]
+        pending = self.pending
+        pending[0] += interval
+        pending[1] += recv_rate * interval
+        pending[2] += sent_rate * interval
+
+    def _write(self, timestamp, seconds, recv_bytes, sent_bytes):
+        with self.lock:
+            segment = self.segment
+            if segment is None or segment.is_full():
+                if self.next_segment is not None:
+                    segment, self.next_segment = self.next_segment, None
+                else:
+                    # Background thread hasn't caught up; create it here
+                    segment = self._new_segment(timestamp)
+                if self.segment is not None:
+                    self.retired.append(self.segment)
+                self.segment = segment
+            if not segment.count:
+                segment.first_timestamp = timestamp
+                SEGMENT_HEADER.pack_into(segment.map, 0, SEGMENT_MAGIC, SEGMENT_VERSION,
+                                         RECORD.size, timestamp)
+            segment.append(timestamp, seconds, recv_bytes, sent_bytes)
+
+    def _flush_loop(self):
+        while not self.stop_event.wait(self.flush_interval):
+            try:
+                self._maintain()
+            except Exception as e:
+                logger.error(f"Error maintaining history log: {e}")
+
+    def _maintain(self):
+        with self.lock:
+            segment = self.segment
+            # Unmapping under a reader's memoryview fails; those wait for a later pass
+            retired = [old for old in self.retired if not old.readers]
+            self.retired = [old for old in self.retired if old.readers]
+            need_next = self.next_segment is None and (
+                segment is None or segment.count >= segment.capacity * 0.9)
+        # Slow work (msync, file creation, deletion) happens outside the lock
+        for old in retired:
+            old.close(trim=True)
+        if segment is not None:
+            segment.flush()
+        if need_next:
+            prepared = self._new_segment(0.0)
+            with self.lock:
+                self.next_segment = prepared
+        paths = self.segment_paths()
+        for path in paths[:max(0, len(paths) - self.max_segments)]:
+            os.remove(path)
+            logger.info(f"Removed expired history segment {path}")
+
+    def read(self, start=None, end=None):
+        """Yield (timestamp, seconds, recv bytes, sent bytes) records between two times"""
+        for path in self.segment_paths():
+            with self.lock:
+                current = self.segment if self.segment and self.segment.path == path else None
+                if current is not None:
+                    current.readers += 1
+            if current is not None:
+                try:
+                    yield from current.records(start, end)
+                finally:
+                    with self.lock:
+                        current.readers -= 1
+                continue
+            if not os.path.getsize(path):
+                continue
+            with open(path, 'rb') as f:
+                data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                segment = ReadOnlySegment(path, data)
+                if end is not None and segment.count and segment.first_timestamp >= end:
+                    break
+                yield from segment.records(start, end)
+            finally:
+                data.close()
+
+    def close(self):
+        self.stop_event.set()
+        self.flusher.join()
+        if self.second is not None and self.pending[0] > 0:
+            self._write(self.second, *self.pending)
+            self.second = None
+        with self.lock:
+            # A segment a reader is still in can't be unmapped; it goes with the reader's reference
+            for segment in self.retired:
+                if not segment.readers:
+                    segment.close(trim=True)
+            self.retired = []
+            if self.segment is not None:
+                if not self.segment.readers:
+                    self.segment.close()
+                self.segment = None
+            if self.next_segment is not None:
+                # Never written to; don't leave an empty file behind
+                self.next_segment.close()
+                os.remove(self.next_segment.path)
+                self.next_segment = None
+
+
+class ReadOnlySegment(LogSegment):
+    """Read access to a closed segment without remapping it writable"""
+
+    def __init__(self, path, data):
+        self.path = path
+        self.map = data
+        self.size = len(data)
+        self.capacity = (self.size - SEGMENT_HEADER.size) // RECORD.size
+        magic, _, _, self.first_timestamp = SEGMENT_HEADER.unpack_from(data, 0)
+        if magic != SEGMENT_MAGIC:
+            self.count = 0
+            return
+        # Closed segments are trimmed to their records, so trust the size
+        # unless the last slot is empty (the meter exited before trimming)
+        self.count = self.capacity
+        if self.count and not record_is_valid(data, SEGMENT_HEADER.size + (self.count - 1) * RECORD.size):
+            self.count = 0
+            offset = SEGMENT_HEADER.size
+            while self.count < self.capacity and record_is_valid(data, offset):
+                self.count += 1
+                offset += RECORD.size
@@ -0,0 +1,20 @@
+import logging
+import os
+from logging.handlers import RotatingFileHandler
+
+LOG_DIR = os.path.join(os.path.expanduser('~'), '.netspeedmeter')
+
+
+# Setup logging
+def setup_logging(log_name='netspeedmeter.log', level=logging.INFO):
+    os.makedirs(LOG_DIR, exist_ok=True)
+    log_file = os.path.join(LOG_DIR, log_name)
+    
+    handler = RotatingFileHandler(log_file, maxBytes=1024*1024, backupCount=5)
+    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    handler.setFormatter(formatter)
+    
+    logger = logging.getLogger('NetSpeedMeter')
+    logger.setLevel(level)
+    logger.addHandler(handler)
+    return logger
@@ -0,0 +1,220 @@
+import asyncio
+import logging
+import threading
+import time
+
+logger = logging.getLogger('NetSpeedMeter')
+
+DEFAULT_HOST = '127.0.0.1'
+DEFAULT_PORT = 9177
+METRICS_PATHS = ('/metrics', '/')
+
+OPENMETRICS_TYPE = 'application/openmetrics-text; version=1.0.0; charset=utf-8'
+PROMETHEUS_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+# (table column, metric family, help) for every exported interface counter
+COUNTER_METRICS = (
+    ('bytes_recv', 'netspeed_receive_bytes', 'Bytes received by the interface'),
+    ('bytes_sent', 'netspeed_transmit_bytes', 'Bytes sent by the interface'),
+    ('packets_recv', 'netspeed_receive_packets', 'Packets received by the interface'),
+    ('packets_sent', 'netspeed_transmit_packets', 'Packets sent by the interface'),
+    ('errin', 'netspeed_receive_errors', 'Receive errors on the interface'),
+    ('errout', 'netspeed_transmit_errors', 'Transmit errors on the interface'),
+    ('dropin', 'netspeed_receive_drops', 'Incoming packets dropped on the interface'),
+    ('dropout', 'netspeed_transmit_drops', 'Outgoing packets dropped on the interface'),
+)
+
+RATE_STATISTICS = ('latest', 'mean', 'min', 'max', 'ewma')
+
+# (family, help, (PacketRates field, direction) pairs) for the filtered totals of the last tick
+PACKET_METRICS = (
+    ('netspeed_rate_packets', 'Packets per second over the selected interfaces',
+     (('packets_recv', 'receive'), ('packets_sent', 'transmit'))),
+    ('netspeed_average_packet_size_bytes', 'Average packet size over the selected interfaces in the last sample',
+     (('size_recv', 'receive'), ('size_sent', 'transmit'))),
+    ('netspeed_rate_errors', 'Errors per second over the selected interfaces',
+     (('errors_in', 'receive'), ('errors_out', 'transmit'))),
+    ('netspeed_rate_drops', 'Dropped packets per second over the selected interfaces',
+     (('drops_in', 'receive'), ('drops_out', 'transmit'))),
+)
+
+
+def escape_label(value):
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def format_value(value):
+    if value != value:
+        return 'NaN'
+    if value in (float('inf'), float('-inf')):
+        return '+Inf' if value > 0 else '-Inf'
+    return repr(value)
+
+
+def http_response(content_type, body):
+    """(response bytes, header length) so HEAD can send just the headers"""
+    header = (f'HTTP/1.1 200 OK\r\nContent-Type: {content_type}\r\n'
+              f'Content-Length: {len(body)}\r\n\r\n').encode()
+    return header + body, len(header)
+
+
+class MetricsExporter:
+    """Serves the latest counters and rates in OpenMetrics / Prometheus text format.
+
+    The exposition is rendered once per tick on the collector thread, as
+    complete HTTP responses in both formats, and published by swapping one
+    reference. The asyncio server on its own thread only picks a response
+    and writes it, so scrapes never touch the interface table or the
+    calculator and never wait on the sampling thread.
+    """
+
+    def __init__(self, speed_calculator, host=DEFAULT_HOST, port=DEFAULT_PORT, namespaces=None):
+        self.speed_calculator = speed_calculator
+        self.namespaces = namespaces
+        self.host = host
+        self.port = port
+        self.scrapes = 0
+        self.loop = None
+        self.thread = None
+        self._started = threading.Event()
+        self._labels = {}
+        self.responses = self.render_responses([])
+
+    def render_responses(self, samples):
+        """Both exposition formats for a list of (family, type, help, sample lines)"""
+        openmetrics = []
+        prometheus = []
+        for family, metric_type, help_text, lines in samples:
+            openmetrics.append(f'# TYPE {family} {metric_type}\n# HELP {family} {help_text}\n')
+            # The classic format names counter families after their samples
+            name = family + '_total' if metric_type == 'counter' else family
+            prometheus.append(f'# HELP {name} {help_text}\n# TYPE {name} {metric_type}\n')
+            body = ''.join(lines)
+            openmetrics.append(body)
+            prometheus.append(body)
+        openmetrics.append('# EOF\n')
+        return (http_response(OPENMETRICS_TYPE, ''.join(openmetrics).encode()),
+                http_response(PROMETHEUS_TYPE, ''.join(prometheus).encode()))
+
+    def labels(self, name):
+        labels = self._labels.get(name)
+        if labels is None:
+            labels = self._labels[name] = f'{{interface="{escape_label(name)}"}}'
+        return labels
+
+    def update(self, table, interval):
+        """Collector tick listener: render the exposition for this tick"""
+        present = [i for i in range(len(table)) if table.is_present(i)]
+        labels = [self.labels(table.names[i]) for i in present]
+        samples = []
+        for field, family, help_text in COUNTER_METRICS:
+            column = getattr(table, field)
+            samples.append((family, 'counter', help_text,
+                            [f'{family}_total{label} {column[i]}\n' for i, label in zip(present, labels)]))
+
+        recv_lines = []
+        sent_lines = []
+        for i, label in zip(present, labels):
+            recv = max(table.bytes_recv[i] - table.prev_bytes_recv[i], 0) / interval
+            sent = max(table.bytes_sent[i] - table.prev_bytes_sent[i], 0) / interval
+            recv_lines.append(f'netspeed_interface_receive_rate_bytes{label} {format_value(recv)}\n')
+            sent_lines.append(f'netspeed_interface_transmit_rate_bytes{label} {format_value(sent)}\n')
+        samples.append(('netspeed_interface_receive_rate_bytes', 'gauge',
+                        'Bytes per second received over the last sample', recv_lines))
+        samples.append(('netspeed_interface_transmit_rate_bytes', 'gauge',
+                        'Bytes per second sent over the last sample', sent_lines))
+
+        if self.namespaces is not None:
+            recv_lines = []
+            sent_lines = []
+            for name, recv, sent in self.namespaces.rates:
+                label = f'{{namespace="{escape_label(name)}"}}'
+                recv_lines.append(f'netspeed_namespace_receive_rate_bytes{label} {format_value(recv)}\n')
+                sent_lines.append(f'netspeed_namespace_transmit_rate_bytes{label} {format_value(sent)}\n')
+            samples.append(('netspeed_namespace_receive_rate_bytes', 'gauge',
+                            'Bytes per second received in the network namespace (container or pod)',
+                            recv_lines))
+            samples.append(('netspeed_namespace_transmit_rate_bytes', 'gauge',
+                            'Bytes per second sent from the network namespace (container or pod)',
+                            sent_lines))
+
+        rate_lines = []
+        for direction, is_download in (('download', True), ('upload', False)):
+            stats = self.speed_calculator.get_window_stats(is_download)
+            for statistic in RATE_STATISTICS:
+                rate_lines.append(f'netspeed_rate_bytes{{direction="{direction}",statistic="{statistic}"}} '
+                                  f'{format_value(stats[statistic])}\n')
+        samples.append(('netspeed_rate_bytes', 'gauge',
+                        'Bytes per second over the selected interfaces, as smoothed for display',
+                        rate_lines))
+        packets = self.speed_calculator.get_packet_rates()
+        for family, help_text, fields in PACKET_METRICS:
+            samples.append((family, 'gauge', help_text,
+                            [f'{family}{{direction="{direction}"}} {format_value(getattr(packets, field))}\n'
+                             for field, direction in fields]))
+        samples.append(('netspeed_sample_interval_seconds', 'gauge', 'Seconds covered by the last sample',
+                        [f'netspeed_sample_interval_seconds {format_value(interval)}\n']))
+        samples.append(('netspeed_last_sample_timestamp_seconds', 'gauge', 'Wall-clock time of the last sample',
+                        [f'netspeed_last_sample_timestamp_seconds {format_value(time.time())}\n']))
+        self.responses = self.render_responses(samples)
+
+    def start(self):
+        self.thread = threading.Thread(target=self._serve, name='MetricsExporter', daemon=True)
+        self.thread.start()
+        self._started.wait()
+        return self.loop is not None
+
+    def _serve(self):
+        loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(loop)
+        try:
+            server = loop.run_until_complete(asyncio.start_server(self._handle, self.host, self.port))
+        except OSError as e:
+            logger.error(f"Error starting metrics exporter on {self.host}:{self.port}: {str(e)}")
+            loop.close()
+            self._started.set()
+            return
+        self.loop = loop
+        self._started.set()
+        logger.info(f"Serving metrics on http://{self.host}:{self.port}/metrics")
+        try:
+            loop.run_forever()
+        finally:
+            server.close()
+            tasks = asyncio.all_tasks(loop)
+            for task in tasks:
+                task.cancel()
+            loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            loop.close()
+
+    async def _handle(self, reader, writer):
+        try:
+            while True:
+                request = await reader.readuntil(b'\r\n\r\n')
+                request_line, _, headers = request.decode('latin-1').partition('\r\n')
+                parts = request_line.split()
+                if len(parts) != 3:
+                    writer.write(b'HTTP/1.1 400 Bad Request\r\nContent-Length: 0\r\nConnection: close\r\n\r\n')
+                    break
+                method, target, version = parts
+                headers = headers.lower()
+                if method not in ('GET', 'HEAD') or target.partition('?')[0] not in METRICS_PATHS:
+                    writer.write(b'HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n\r\n')
+                else:
+                    openmetrics, prometheus = self.responses
+                    response, header_length = openmetrics if 'application/openmetrics-text' in headers else prometheus
+                    writer.write(response if method == 'GET' else response[:header_length])
+                    self.scrapes += 1
+                await writer.drain()
+                if version == 'HTTP/1.0' or 'connection: close' in headers:
+                    break
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    def stop(self):
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=2)
+            self.loop = None
@@ -0,0 +1,261 @@
+"""Microburst mode: sample the byte counters at up to 1 kHz.
+
+Bursts that fill a switch buffer for a few milliseconds vanish in a 100 ms
+average. BurstSampler reads the counters on a perf_counter_ns deadline
+grid, keeps the cumulative totals in a preallocated ring, and hands
+listeners one summary per display frame (peak, p99 and mean rate, plus the
+peak over the last second) instead of every sample. Counters are only as
+fine-grained as the driver keeps them; some NICs refresh their statistics
+far less often than once a millisecond.
+
+    python microburst.py [--rate 1000] [--include 'eth*']
+"""
+import argparse
+import logging
+import threading
+import time
+from array import array
+from collections import namedtuple
+
+from counter_sources import PROC_NET_DEV_STRIDE, ProcNetDevCounterSource, create_counter_source
+from net_sampler import DEFAULT_EXCLUDE, InterfaceFilter, InterfaceTable, is_physical_interface
+
+logger = logging.getLogger('NetSpeedMeter')
+
+DEFAULT_RATE = 1000         # samples per second
+MAX_RATE = 1000
+FRAME_PERIOD = 0.1          # seconds of samples summarised per delivered frame
+PEAK_WINDOW = 1.0           # seconds behind the "peak in last second"
+RING_SECONDS = 2            # samples kept, in seconds at the configured rate
+
+# Rates in bytes per second; samples is how many readings the frame covers
+BurstFrame = namedtuple('BurstFrame', 'samples recv_peak recv_p99 recv_mean sent_peak sent_p99 sent_mean '
+                                      'recv_peak_1s sent_peak_1s missed')
+
+
+def percentile_99(values):
+    values.sort()
+    return values[int(0.99 * (len(values) - 1))]
+
+
+class BurstSampler:
+    """High-rate counter sampling with per-frame summaries.
+
+    run() blocks, so callers put it on a thread of their own (the widget
+    uses a QThread, start() uses a plain daemon thread). Each sample stores
+    the summed byte counters of the selected interfaces and a
+    perf_counter_ns timestamp into fixed arrays; nothing else is kept until
+    a frame is summarised. With the /proc/net/dev source only the two byte
+    columns of the selected interfaces are converted, skipping the
+    InterfaceTable the regular collector fills. Missed deadlines are
+    skipped, not caught up.
+    """
+
+    def __init__(self, interface_filter=None, rate=DEFAULT_RATE, frame_period=FRAME_PERIOD,
+                 source=None, clock=time.perf_counter_ns):
+        self.interface_filter = interface_filter or InterfaceFilter()
+        self.rate = min(rate, MAX_RATE)
+        self.period_ns = int(1e9 / self.rate)
+        self.frame_ns = int(frame_period * 1e9)
+        self.source = source or create_counter_source()
+        self.clock = clock
+        self.table = InterfaceTable()
+        self.procfs = isinstance(self.source, ProcNetDevCounterSource)
+        self._selected_key = None
+        self._selected = ()
+        capacity = max(int(self.rate * RING_SECONDS), 2 * int(self.rate * frame_period) + 2)
+        self.times = array('q', [0]) * capacity
+        self.recv = array('Q', [0]) * capacity
+        self.sent = array('Q', [0]) * capacity
+        self.count = 0
+        self.frame_start = 0      # ring position of the first sample in the current frame
+        self.missed = 0
+        frames = max(int(round(PEAK_WINDOW / frame_period)), 1)
+        self.recv_peaks = array('d', [0.0]) * frames
+        self.sent_peaks = array('d', [0.0]) * frames
+        self.frames = 0
+        self.listeners = []
+        self.running = True
+        self.paused = False
+        self._wake = threading.Event()
+        # Separate from _wake, which an unpause leaves set
+        self._error_wait = threading.Event()
+        self.thread = None
+
+    def add_listener(self, listener):
+        self.listeners.append(listener)
+
+    def selected(self, key, interfaces):
+        """Positions of the filtered interfaces, cached here rather than in the filter,
+        which the widget shares with the main collector and its table.
+
+        key identifies the interface list; interfaces() returns (name, physical)
+        pairs and is only called when the key or the filter changed.
+        """
+        f = self.interface_filter
+        key = (key, f.include, f.exclude, f.physical_only)
+        if key != self._selected_key:
+            self._selected = tuple(i for i, (name, physical) in enumerate(interfaces())
+                                   if f.matches(name, physical))
+            if self._selected_key is not None:
+                # Totals over a different set of interfaces don't difference with the old ones
+                self.frame_start = self.count
+            self._selected_key = key
+        return self._selected
+
+    def read_totals(self):
+        """Summed (bytes received, bytes sent) of the selected interfaces"""
+        recv = sent = 0
+        if self.procfs:
+            tokens = self.source.read_tokens()
+            raw_names = tokens[::PROC_NET_DEV_STRIDE]
+            selected = self.selected(raw_names, lambda: [
+                (name, is_physical_interface(name)) for name in (raw.decode(errors='replace') for raw in raw_names)])
+            for i in selected:
+                base = i * PROC_NET_DEV_STRIDE
+                recv += int(tokens[base + 1])
+                sent += int(tokens[base + 9])
+            return recv, sent
+        table = self.table
+        table.begin_tick(0.0)
+        self.source.read(table)
+        table.end_tick()
+        bytes_recv, bytes_sent = table.bytes_recv, table.bytes_sent
+        for i in self.selected(table.generation, lambda: zip(table.names, table.physical)):
+            recv += bytes_recv[i]
+            sent += bytes_sent[i]
+        return recv, sent
+
+    def sample(self):
+        """Read the counters once and append the selected interfaces' totals to the ring"""
+        now = self.clock()
+        recv, sent = self.read_totals()
+        slot = self.count % len(self.times)
+        self.times[slot] = now
+        self.recv[slot] = recv
+        self.sent[slot] = sent
+        self.count += 1
+
+    def frame(self):
+        """Summarise the samples since the last frame, or None if there are too few"""
+        first, last = self.frame_start, self.count - 1
+        capacity = len(self.times)
+        if last - first < 1:
+            return None
+        first = max(first, self.count - capacity)
+        times, recv, sent = self.times, self.recv, self.sent
+        recv_rates = []
+        sent_rates = []
+        previous = first % capacity
+        for n in range(first + 1, last + 1):
+            slot = n % capacity
+            elapsed = (times[slot] - times[previous]) / 1e9
+            # A counter reset (interface re-created) shows up as a drop; skip it
+            recv_rates.append(max(recv[slot] - recv[previous], 0) / elapsed)
+            sent_rates.append(max(sent[slot] - sent[previous], 0) / elapsed)
+            previous = slot
+        first_slot, last_slot = first % capacity, last % capacity
+        elapsed = (times[last_slot] - times[first_slot]) / 1e9
+        recv_mean = max(recv[last_slot] - recv[first_slot], 0) / elapsed
+        sent_mean = max(sent[last_slot] - sent[first_slot], 0) / elapsed
+        # The last sample of this frame is the first of the next one
+        self.frame_start = last
+
+        recv_peak = max(recv_rates)
+        sent_peak = max(sent_rates)
+        slot = self.frames % len(self.recv_peaks)
+        self.recv_peaks[slot] = recv_peak
+        self.sent_peaks[slot] = sent_peak
+        self.frames += 1
+        missed, self.missed = self.missed, 0
+        return BurstFrame(len(recv_rates), recv_peak, percentile_99(recv_rates), recv_mean,
+                          sent_peak, percentile_99(sent_rates), sent_mean,
+                          max(self.recv_peaks), max(self.sent_peaks), missed)
+
+    def run(self):
+        next_sample = next_frame = None
+        while self.running:
+            if self.paused:
+                self._wake.wait()
+                self._wake.clear()
+                next_sample = next_frame = None
+                # Samples from before the pause would smear into one long interval
+                self.frame_start = self.count
+                self.recv_peaks[:] = array('d', [0.0]) * len(self.recv_peaks)
+                self.sent_peaks[:] = array('d', [0.0]) * len(self.sent_peaks)
+                continue
+            now = self.clock()
+            if next_sample is None:
+                next_sample = now
+                next_frame = now + self.frame_ns
+            delay = next_sample - now
+            if delay > 0:
+                time.sleep(delay / 1e9)
+            try:
+                self.sample()
+                now = self.clock()
+                if now >= next_frame:
+                    next_frame += self.frame_ns
+                    if next_frame <= now:
+                        next_frame = now + self.frame_ns
+                    summary = self.frame()
+                    if summary is not None:
+                        for listener in self.listeners:
+                            listener(summary)
+            except Exception as e:
+                logger.error(f"Error in microburst sampling: {str(e)}")
+                self._error_wait.wait(1)
+                next_sample = None
+                continue
+            next_sample += self.period_ns
+            if next_sample <= now:
+                # Overran one or more slots; stay on the grid
+                skipped = (now - next_sample) // self.period_ns + 1
+                next_sample += skipped * self.period_ns
+                self.missed += skipped
+        self.source.close()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name='BurstSampler', daemon=True)
+        self.thread.start()
+
+    def set_paused(self, paused):
+        """Stop sampling while nobody is looking, without tearing the thread down"""
+        self.paused = paused
+        if not paused:
+            self._wake.set()
+
+    def stop(self):
+        self.running = False
+        self._wake.set()
+        self._error_wait.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Print per-second microburst peaks')
+    parser.add_argument('--rate', type=int, default=DEFAULT_RATE, help=f'samples per second (max {MAX_RATE})')
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB')
+    parser.add_argument('--exclude', action='append', default=None, metavar='GLOB')
+    args = parser.parse_args()
+
+    exclude = DEFAULT_EXCLUDE if args.exclude is None else args.exclude
+    sampler = BurstSampler(InterfaceFilter(args.include, exclude), args.rate, frame_period=1.0)
+
+    def print_frame(frame):
+        print(f'↓ peak {frame.recv_peak / 1024:10.1f} p99 {frame.recv_p99 / 1024:10.1f} '
+              f'mean {frame.recv_mean / 1024:10.1f} KB/s   ↑ peak {frame.sent_peak / 1024:10.1f} '
+              f'p99 {frame.sent_p99 / 1024:10.1f} mean {frame.sent_mean / 1024:10.1f} KB/s   '
+              f'({frame.samples} samples, {frame.missed} missed)', flush=True)
+
+    sampler.add_listener(print_frame)
+    try:
+        sampler.run()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,248 @@
+"""Per network namespace traffic on container hosts (Linux only).
+
+Every container or pod has its own network namespace, and reading its
+/proc/<pid>/net/dev through one of its processes gives that namespace's
+own interface counters, so traffic can be split per container instead of
+being summed over every veth on the host.
+"""
+import logging
+import os
+import re
+import select
+import time
+
+from counter_sources import ProcNetDevCounterSource
+from net_sampler import DEFAULT_EXCLUDE, InterfaceFilter, InterfaceTable
+
+logger = logging.getLogger('NetSpeedMeter')
+
+PROC = '/proc'
+NETNS_DIR = '/var/run/netns'    # namespaces named by `ip netns add`
+RESCAN_PERIOD = 30.0            # seconds between full rescans when nothing signals a change
+
+# Container ids as they appear in cgroup paths under systemd and cgroupfs,
+# for Docker, containerd, CRI-O and Podman
+CONTAINER_ID = re.compile(r'(?:docker|cri-containerd|crio|libpod)[-/]([0-9a-f]{12,64})')
+POD_UID = re.compile(r'pod([0-9a-f]{8}[-_][0-9a-f]{4}[-_][0-9a-f]{4}[-_][0-9a-f]{4}[-_][0-9a-f]{12})')
+
+
+def cgroup_label(proc, pid):
+    """Short container or pod name from a process's cgroup, or None"""
+    try:
+        with open(f'{proc}/{pid}/cgroup') as f:
+            cgroup = f.read()
+    except OSError:
+        return None
+    match = POD_UID.search(cgroup)
+    if match:
+        return 'pod-' + match.group(1).replace('_', '-')
+    match = CONTAINER_ID.search(cgroup)
+    if match:
+        return match.group(1)[:12]
+    return None
+
+
+class NetNamespace:
+    """One namespace's counter source and its own InterfaceTable"""
+
+    __slots__ = ('inode', 'label', 'pid', 'pidfd', 'source', 'table', 'filter', 'recv_rate', 'sent_rate')
+
+    def __init__(self, inode, label, pid, pidfd, source, interface_filter):
+        self.inode = inode
+        self.label = label
+        self.pid = pid
+        self.pidfd = pidfd
+        self.source = source
+        self.table = InterfaceTable()
+        self.filter = interface_filter
+        self.recv_rate = 0.0
+        self.sent_rate = 0.0
+
+    def close(self):
+        if self.source is not None:
+            self.source.close()
+            self.source = None
+        if self.pidfd is not None:
+            os.close(self.pidfd)
+            self.pidfd = None
+
+
+class NamespaceCounters:
+    """Collector tick listener that splits traffic per network namespace.
+
+    Namespaces are found by walking /proc/*/ns/net (plus the names under
+    /var/run/netns), which is far too slow to repeat every tick on a node
+    running hundreds of pods. The walk is cached and only redone when
+    something suggests the set changed: the host grew an interface (a new
+    pod's veth), the process a namespace is read through exited (watched
+    with pidfds, one poll() per tick for all of them), /var/run/netns
+    changed, or RESCAN_PERIOD passed. In between, each tick is one pread of
+    every namespace's net/dev through a descriptor kept open since the walk.
+    Those descriptors pin their namespace, which is why exits are noticed
+    right away rather than at the next rescan.
+
+    The host namespace only counts physical interfaces, since its veths
+    carry the containers' traffic a second time. Namespaces pinned only by
+    a name under /var/run/netns, with no process inside, would need setns()
+    to read and are skipped.
+    """
+
+    def __init__(self, proc=PROC, netns_dir=NETNS_DIR, exclude=DEFAULT_EXCLUDE,
+                 rescan_period=RESCAN_PERIOD, clock=time.monotonic):
+        self.proc = proc
+        self.netns_dir = netns_dir
+        self.exclude = exclude
+        self.rescan_period = rescan_period
+        self.clock = clock
+        self.namespaces = {}      # namespace inode -> NetNamespace
+        self.host_inode = self.namespace_inode(os.getpid())
+        self.rates = []           # [(label, recv rate, sent rate)] busiest first
+        self.scans = 0
+        self._last_scan = None
+        self._host_generation = None
+        self._netns_mtime = None
+        self._stale = False
+        self._exits = select.poll()
+        self._pidfds = {}         # pidfd -> namespace inode
+
+    def namespace_inode(self, pid):
+        try:
+            return os.stat(f'{self.proc}/{pid}/ns/net').st_ino
+        except OSError:
+            return None
+
+    def named_namespaces(self):
+        """{namespace inode: name} for namespaces under /var/run/netns"""
+        names = {}
+        try:
+            with os.scandir(self.netns_dir) as entries:
+                for entry in entries:
+                    try:
+                        names[entry.stat().st_ino] = entry.name
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+        return names
+
+    def netns_mtime(self):
+        try:
+            return os.stat(self.netns_dir).st_mtime_ns
+        except OSError:
+            return None
+
+    def watch(self, pid):
+        """pidfd that becomes readable when pid exits, or None where unsupported"""
+        try:
+            pidfd = os.pidfd_open(pid)
+        except (AttributeError, OSError):
+            return None
+        self._exits.register(pidfd, select.POLLIN)
+        return pidfd
+
+    def drop(self, namespace):
+        if namespace.pidfd is not None:
+            self._exits.unregister(namespace.pidfd)
+            del self._pidfds[namespace.pidfd]
+        namespace.close()
+
+    def needs_scan(self, host_table):
+        if self._last_scan is None or self._stale:
+            return True
+        if self._pidfds and self._exits.poll(0):
+            return True
+        if host_table is not None and host_table.generation != self._host_generation:
+            return True
+        if self.netns_mtime() != self._netns_mtime:
+            return True
+        return self.clock() - self._last_scan >= self.rescan_period
+
+    def scan(self, host_table=None):
+        """Walk /proc for namespaces, keeping the sources of ones already known"""
+        self.scans += 1
+        self._last_scan = self.clock()
+        self._host_generation = host_table.generation if host_table is not None else None
+        self._netns_mtime = self.netns_mtime()
+        self._stale = False
+
+        members = {}   # namespace inode -> lowest pid inside it
+        with os.scandir(self.proc) as entries:
+            for entry in entries:
+                if not entry.name.isdigit():
+                    continue
+                pid = int(entry.name)
+                inode = self.namespace_inode(pid)
+                if inode is not None and (inode not in members or pid < members[inode]):
+                    members[inode] = pid
+        names = self.named_namespaces()
+
+        for inode, namespace in list(self.namespaces.items()):
+            if members.get(inode) != namespace.pid:
+                # Gone, or its process exited and another one is left to read it through
+                self.drop(namespace)
+                if inode not in members:
+                    del self.namespaces[inode]
+        for inode, pid in members.items():
+            namespace = self.namespaces.get(inode)
+            if namespace is not None and namespace.source is not None:
+                continue
+            if inode == self.host_inode:
+                label = 'host'
+            else:
+                label = names.get(inode) or cgroup_label(self.proc, pid) or f'netns-{inode}'
+            try:
+                source = ProcNetDevCounterSource(f'{self.proc}/{pid}/net/dev')
+            except OSError:
+                continue  # Exited since we looked
+            pidfd = self.watch(pid)
+            if pidfd is not None:
+                self._pidfds[pidfd] = inode
+            if namespace is None:
+                interface_filter = InterfaceFilter(exclude=self.exclude, physical_only=inode == self.host_inode)
+                self.namespaces[inode] = NetNamespace(inode, label, pid, pidfd, source, interface_filter)
+                logger.debug(f"Tracking network namespace {label} through pid {pid}")
+            else:
+                namespace.label, namespace.pid, namespace.pidfd, namespace.source = label, pid, pidfd, source
+        logger.info(f"Found {len(self.namespaces)} network namespaces")
+
+    def sample(self, namespace, now):
+        table = namespace.table
+        table.begin_tick(now)
+        try:
+            namespace.source.read(table)
+        except OSError:
+            table.updated = 0
+        if not table.updated:
+            # The namespace is gone
+            self.drop(namespace)
+            self._stale = True
+            return
+        table.end_tick()
+        interval = table.interval()
+        if not interval:
+            return
+        recv = sent = 0
+        for i in namespace.filter.indices(table):
+            if table.is_present(i):
+                recv += max(table.bytes_recv[i] - table.prev_bytes_recv[i], 0)
+                sent += max(table.bytes_sent[i] - table.prev_bytes_sent[i], 0)
+        namespace.recv_rate = recv / interval
+        namespace.sent_rate = sent / interval
+
+    def update(self, table=None, interval=None):
+        """Tick listener: sample every namespace, rescanning first if the set may have changed"""
+        if self.needs_scan(table):
+            self.scan(table)
+        now = self.clock()
+        for namespace in list(self.namespaces.values()):
+            if namespace.source is not None:
+                self.sample(namespace, now)
+        rates = [(namespace.label, namespace.recv_rate, namespace.sent_rate)
+                 for namespace in self.namespaces.values() if namespace.source is not None]
+        rates.sort(key=lambda rate: rate[1] + rate[2], reverse=True)
+        self.rates = rates
+
+    def close(self):
+        for namespace in self.namespaces.values():
+            self.drop(namespace)
+        self.namespaces.clear()
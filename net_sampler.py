@@ -0,0 +1,168 @@
+import fnmatch
+import logging
+import os
+import sys
+import time
+from array import array
+
+from counter_sources import create_counter_source
+
+logger = logging.getLogger('NetSpeedMeter')
+
+# Cumulative counters kept per interface, named after psutil's fields
+COUNTER_FIELDS = (
+    'bytes_recv', 'bytes_sent', 'packets_recv', 'packets_sent',
+    'errin', 'errout', 'dropin', 'dropout',
+)
+
+# Loopback interfaces are excluded by default so local traffic isn't counted
+DEFAULT_EXCLUDE = ('lo', 'lo0', 'Loopback*')
+
+# Name prefixes of virtual interfaces, used where sysfs can't tell us
+VIRTUAL_PREFIXES = (
+    'lo', 'veth', 'docker', 'br-', 'virbr', 'vmnet', 'vboxnet', 'tun', 'tap',
+    'wg', 'cali', 'flannel', 'cni', 'kube', 'vEthernet', 'Loopback', 'isatap',
+    'Teredo', 'utun', 'awdl', 'llw', 'bridge', 'gif', 'stf', 'anpi',
+)
+
+
+def is_physical_interface(name):
+    """Best-effort check whether an interface is backed by real hardware"""
+    if sys.platform.startswith('linux') and os.path.isdir('/sys/class/net'):
+        return os.path.exists(f'/sys/class/net/{name}/device')
+    return not name.startswith(VIRTUAL_PREFIXES)
+
+
+class InterfaceTable:
+    """Per-interface counters stored in flat arrays indexed by a stable interface index.
+
+    An interface keeps its index for the lifetime of the table, so the only
+    per-interface allocation happens the first time a NIC shows up. Each tick
+    swaps the current and previous arrays instead of copying them. An
+    interface that appears mid-run has its previous counters primed from its
+    first reading, so its lifetime totals never show up as one tick's delta.
+    """
+
+    def __init__(self):
+        self.names = []          # index -> interface name
+        self.index = {}          # interface name -> index
+        self.physical = bytearray()
+        self.seen = array('Q')   # tick number an interface was last reported
+        # Current and previous value of every counter, e.g. bytes_recv / prev_bytes_recv
+        for field in COUNTER_FIELDS:
+            setattr(self, field, array('Q'))
+            setattr(self, 'prev_' + field, array('Q'))
+        self.timestamp = 0.0
+        self.prev_timestamp = 0.0
+        self.tick = 0
+        self.updated = 0         # interfaces reported during the current tick
+        self.generation = 0      # bumped whenever the interface set changes
+        self.added = []          # indices registered since the last end_tick()
+
+    def __len__(self):
+        return len(self.names)
+
+    def add_interface(self, name):
+        """Register a new interface and return its index"""
+        i = len(self.names)
+        self.names.append(name)
+        self.index[name] = i
+        self.physical.append(1 if is_physical_interface(name) else 0)
+        self.seen.append(0)
+        for field in COUNTER_FIELDS:
+            getattr(self, field).append(0)
+            getattr(self, 'prev_' + field).append(0)
+        self.added.append(i)
+        self.generation += 1
+        logger.info(f"Tracking network interface {name} (index {i})")
+        return i
+
+    def begin_tick(self, timestamp):
+        """Rotate current counters into the previous slot before a new read"""
+        for field in COUNTER_FIELDS:
+            prev_field = 'prev_' + field
+            current = getattr(self, field)
+            setattr(self, field, getattr(self, prev_field))
+            setattr(self, prev_field, current)
+        self.prev_timestamp = self.timestamp
+        self.timestamp = timestamp
+        self.tick += 1
+        self.updated = 0
+
+    def end_tick(self):
+        """Prime new interfaces and carry forward counters of those that weren't reported"""
+        if self.added:
+            for field in COUNTER_FIELDS:
+                current, previous = getattr(self, field), getattr(self, 'prev_' + field)
+                for i in self.added:
+                    previous[i] = current[i]
+            self.added.clear()
+        if self.updated == len(self.names):
+            return
+        tick = self.tick
+        seen = self.seen
+        for i in range(len(self.names)):
+            if seen[i] != tick:
+                for field in COUNTER_FIELDS:
+                    getattr(self, field)[i] = getattr(self, 'prev_' + field)[i]
+
+    def is_present(self, i):
+        return self.seen[i] == self.tick
+
+    def interval(self):
+        """Seconds between the last two reads, or 0 before the second read"""
+        if self.tick < 2:
+            return 0.0
+        return self.timestamp - self.prev_timestamp
+
+
+class InterfaceFilter:
+    """Selects a subset of interfaces by include/exclude globs and a physical-only flag"""
+
+    def __init__(self, include=None, exclude=DEFAULT_EXCLUDE, physical_only=False):
+        self._cache_key = None
+        self._indices = ()
+        self.configure(include, exclude, physical_only)
+
+    def configure(self, include=None, exclude=DEFAULT_EXCLUDE, physical_only=False):
+        self.include = tuple(include or ())
+        self.exclude = tuple(exclude or ())
+        self.physical_only = physical_only
+        self._cache_key = None
+
+    def matches(self, name, physical=True):
+        if self.physical_only and not physical:
+            return False
+        if self.include and not any(fnmatch.fnmatchcase(name, p) for p in self.include):
+            return False
+        return not any(fnmatch.fnmatchcase(name, p) for p in self.exclude)
+
+    def indices(self, table):
+        """Indices of matching interfaces, recomputed only when the table changes"""
+        key = (id(table), table.generation)
+        if key != self._cache_key:
+            self._indices = tuple(
+                i for i, name in enumerate(table.names)
+                if self.matches(name, table.physical[i])
+            )
+            self._cache_key = key
+        return self._indices
+
+
+class NetSampler:
+    """Collects all interface counters into an InterfaceTable once per tick"""
+
+    def __init__(self, source=None, clock=time.monotonic):
+        self.source = source or create_counter_source()
+        self.clock = clock
+        self.table = InterfaceTable()
+
+    def sample(self):
+        table = self.table
+        table.begin_tick(self.clock())
+        self.source.read(table)
+        table.end_tick()
+        return table
+
+    def close(self):
+        self.source.close()
@@ -0,0 +1,172 @@
+"""Headless network speed collector.
+
+Runs the same sampling, calculation and history pipeline as the widget
+without importing Qt, so it works on servers, containers and over SSH.
+
+    python netspeed_daemon.py [--print] [--source procfs] [--include 'eth*']
+"""
+import argparse
+import functools
+import signal
+import sys
+
+from collector import Collector
+from counter_sources import COUNTER_SOURCES, create_counter_source
+from fleet import DEFAULT_PORT as FLEET_PORT, RateAgent, parse_address
+from history import HistoryStore
+from history_log import HistoryLog
+from logging_setup import setup_logging
+from metrics_exporter import DEFAULT_HOST, MetricsExporter
+from namespaces import NamespaceCounters
+from net_sampler import DEFAULT_EXCLUDE, InterfaceFilter, NetSampler
+from scheduler import AdaptiveScheduler
+from shared_rates import SharedRatesPublisher
+from speed_calculator import SMOOTHING_MODES, SpeedCalculator
+
+logger = setup_logging('netspeed_daemon.log')
+
+# Bytes per unit for a fixed --unit; without one, readings scale automatically
+UNIT_BYTES = {'KB/s': 1024, 'MB/s': 1024 * 1024}
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description='Headless network speed collector')
+    parser.add_argument('--period', type=float, default=1.0,
+                        help='sampling period in seconds while there is traffic (default: 1)')
+    parser.add_argument('--idle-period', type=float, default=None,
+                        help='sampling period once the link is idle (default: same as --period)')
+    parser.add_argument('--source', choices=['auto', *COUNTER_SOURCES], default='auto',
+                        help='where interface counters are read from')
+    parser.add_argument('--include', action='append', default=[], metavar='GLOB',
+                        help='only count matching interfaces (repeatable)')
+    parser.add_argument('--exclude', action='append', default=None, metavar='GLOB',
+                        help=f'skip matching interfaces (repeatable, default: {" ".join(DEFAULT_EXCLUDE)})')
+    parser.add_argument('--physical-only', action='store_true', help='skip virtual interfaces')
+    parser.add_argument('--unit', choices=tuple(UNIT_BYTES), default=None,
+                        help='fixed unit for --print (default: KB/s or MB/s, whichever fits)')
+    parser.add_argument('--smoothing', choices=SMOOTHING_MODES, default='instant')
+    parser.add_argument('--no-history', action='store_true', help="don't write the on-disk history log")
+    parser.add_argument('--print', action='store_true', help='print every reading to stdout')
+    parser.add_argument('--packets', action='store_true',
+                        help='with --print, also print packet, error and drop rates')
+    parser.add_argument('--metrics-port', type=int, default=0,
+                        help='serve OpenMetrics on this port (default: off)')
+    parser.add_argument('--metrics-host', default=DEFAULT_HOST,
+                        help=f'address to serve metrics on (default: {DEFAULT_HOST})')
+    parser.add_argument('--shared-memory', action='store_true',
+                        help='publish live rates in shared memory for other local processes')
+    parser.add_argument('--agent', metavar='HOST[:PORT]',
+                        help=f'send rates to a fleet aggregator (default port {FLEET_PORT})')
+    parser.add_argument('--agent-name', help='name to report to the aggregator (default: hostname)')
+    parser.add_argument('--namespaces', action='store_true',
+                        help='also split traffic per network namespace (containers, pods; Linux)')
+    return parser.parse_args(argv)
+
+
+def create_collector(args):
+    idle_period = args.idle_period or args.period
+    # Nobody looks at a daemon, so there is no separate hidden rate
+    scheduler = AdaptiveScheduler(fast_period=args.period, slow_period=idle_period,
+                                  hidden_period=idle_period)
+    exclude = DEFAULT_EXCLUDE if args.exclude is None else args.exclude
+    speed_calculator = SpeedCalculator(smoothing=args.smoothing)
+    history = history_log = None
+    if not args.no_history:
+        history = HistoryStore()
+        history_log = HistoryLog()
+    # Per-interface quantiles only feed the widget's tooltip
+    return Collector(speed_calculator,
+                     InterfaceFilter(args.include, exclude, args.physical_only),
+                     NetSampler(create_counter_source(args.source)),
+                     scheduler, history, history_log, interface_quantiles=False)
+
+
+def in_unit(speed, unit=None):
+    """A (value, unit) pair re-expressed in a fixed unit, or as it is without one"""
+    value, current = speed
+    if unit is None or unit == current:
+        return speed
+    return value * UNIT_BYTES[current] / UNIT_BYTES[unit], unit
+
+
+def print_reading(download, upload, interval, unit=None):
+    download, upload = in_unit(download, unit), in_unit(upload, unit)
+    print(f'↓ {download[0]:8.2f} {download[1]:<5} ↑ {upload[0]:8.2f} {upload[1]:<5}', flush=True)
+
+
+def print_packets(speed_calculator):
+    packets = speed_calculator.get_packet_rates()
+    print(f'    packets/s ↓ {packets.packets_recv:10.1f} ↑ {packets.packets_sent:10.1f}   '
+          f'avg size ↓ {packets.size_recv:6.0f} B ↑ {packets.size_sent:6.0f} B   '
+          f'errors/s {packets.errors_in + packets.errors_out:.1f}   '
+          f'drops/s ↓ {packets.drops_in:.1f} ↑ {packets.drops_out:.1f}', flush=True)
+
+
+def print_namespaces(namespaces, speed_calculator, unit=None):
+    for name, recv, sent in namespaces.rates:
+        download = in_unit(speed_calculator.convert_rate(recv), unit)
+        upload = in_unit(speed_calculator.convert_rate(sent), unit)
+        print(f'    {name:<40} ↓ {download[0]:8.2f} {download[1]:<5} ↑ {upload[0]:8.2f} {upload[1]:<5}', flush=True)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    collector = create_collector(args)
+    if args.print:
+        collector.add_listener(functools.partial(print_reading, unit=args.unit))
+        if args.packets:
+            collector.add_listener(lambda download, upload, interval: print_packets(collector.speed_calculator))
+    namespaces = None
+    if args.namespaces:
+        namespaces = NamespaceCounters()
+        # Ahead of the exporter, which renders the namespace rates of the same tick
+        collector.add_tick_listener(namespaces.update)
+        if args.print:
+            collector.add_listener(
+                lambda download, upload, interval: print_namespaces(namespaces, collector.speed_calculator, args.unit))
+    agent = None
+    if args.agent:
+        host, port = parse_address(args.agent)
+        agent = RateAgent(collector.speed_calculator, host, port, args.agent_name)
+        collector.add_tick_listener(agent.update)
+    exporter = None
+    if args.metrics_port:
+        exporter = MetricsExporter(collector.speed_calculator, args.metrics_host, args.metrics_port, namespaces)
+        if not exporter.start():
+            collector.close()
+            return 1
+        collector.add_tick_listener(exporter.update)
+    publisher = None
+    if args.shared_memory:
+        try:
+            publisher = SharedRatesPublisher(collector.speed_calculator)
+        except FileExistsError as e:
+            logger.error(str(e))
+            if exporter is not None:
+                exporter.stop()
+            collector.close()
+            return 1
+        collector.add_tick_listener(publisher.publish)
+
+    def shutdown(signum, frame):
+        logger.info(f"Received signal {signum}, stopping")
+        collector.stop()
+
+    signal.signal(signal.SIGINT, shutdown)
+    signal.signal(signal.SIGTERM, shutdown)
+    logger.info(f"Daemon started (source {collector.sampler.source.name}, period {args.period} s)")
+    collector.run()
+    if exporter is not None:
+        exporter.stop()
+    if publisher is not None:
+        publisher.close()
+    if agent is not None:
+        agent.close()
+    if namespaces is not None:
+        namespaces.close()
+    logger.info("Daemon stopped")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
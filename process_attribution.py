@@ -0,0 +1,243 @@
+import logging
+import os
+import threading
+import time
+from collections import namedtuple
+
+from sock_diag import SockDiag
+
+logger = logging.getLogger('NetSpeedMeter')
+
+PROC = '/proc'
+SOCKET_TABLES = ('tcp', 'tcp6', 'udp', 'udp6')
+TCP_ESTABLISHED = b'01'
+SOCKET_PREFIX = 'socket:['
+
+DEFAULT_PERIOD = 2.0
+DEFAULT_CPU_BUDGET = 0.02   # fraction of one core the scanner may use
+DEFAULT_TOP = 10
+
+# sockets counts the process's connections that moved data this round
+ProcessRate = namedtuple('ProcessRate', 'pid name recv_rate sent_rate sockets')
+
+
+def read_active_sockets(proc=PROC):
+    """Inodes of sockets that can carry traffic: established TCP and bound UDP"""
+    inodes = set()
+    for table in SOCKET_TABLES:
+        try:
+            with open(os.path.join(proc, 'net', table), 'rb') as f:
+                data = f.read()
+        except OSError:
+            continue
+        tcp = table.startswith('tcp')
+        # Skip the header; fields are sl, local, remote, state, ..., inode (10th)
+        for line in data.split(b'\n')[1:]:
+            fields = line.split(None, 10)
+            if len(fields) < 10 or (tcp and fields[3] != TCP_ESTABLISHED):
+                continue
+            inode = int(fields[9])
+            if inode:
+                inodes.add(inode)
+    return inodes
+
+
+class SocketOwners:
+    """Socket inode -> pid map, kept up to date with as little /proc walking as possible.
+
+    Resolving an owner means listing /proc/<pid>/fd and reading every link,
+    so pids are only scanned when there is something to find: new pids are
+    scanned once when they appear, and existing ones only while active
+    sockets remain unowned, starting with pids that already own sockets and
+    resuming round-robin from where the last refresh ran out of time.
+    Processes we may not inspect are remembered and skipped, and so are
+    sockets that a complete pass couldn't place (owned by such processes).
+    """
+
+    def __init__(self, proc=PROC):
+        self.proc = proc
+        self.owners = {}         # inode -> pid
+        self.pid_sockets = {}    # pid -> set of socket inodes
+        self.known = set()       # pids scanned at least once
+        self.inaccessible = set()
+        self.orphans = set()     # active inodes a full pass found no owner for
+        self.cursor = 0
+        self.scans = 0
+
+    def list_pids(self):
+        pids = set()
+        with os.scandir(self.proc) as entries:
+            for entry in entries:
+                if entry.name.isdigit():
+                    pids.add(int(entry.name))
+        return pids
+
+    def scan(self, pid):
+        """Re-read one process's socket descriptors"""
+        self.scans += 1
+        self.known.add(pid)
+        sockets = set()
+        fd_dir = f'{self.proc}/{pid}/fd'
+        try:
+            with os.scandir(fd_dir) as entries:
+                for entry in entries:
+                    try:
+                        target = os.readlink(entry.path)
+                    except OSError:
+                        continue
+                    if target.startswith(SOCKET_PREFIX):
+                        sockets.add(int(target[len(SOCKET_PREFIX):-1]))
+        except PermissionError:
+            self.inaccessible.add(pid)
+        except OSError:
+            pass  # Exited while we looked
+        for inode in self.pid_sockets.get(pid, ()):
+            if self.owners.get(inode) == pid:
+                del self.owners[inode]
+        if sockets:
+            self.pid_sockets[pid] = sockets
+            for inode in sockets:
+                self.owners[inode] = pid
+        else:
+            self.pid_sockets.pop(pid, None)
+
+    def refresh(self, active, deadline, clock=time.thread_time):
+        """Resolve owners of the active inodes until clock() passes deadline"""
+        pids = self.list_pids()
+        for pid in self.known - pids:
+            for inode in self.pid_sockets.pop(pid, ()):
+                if self.owners.get(inode) == pid:
+                    del self.owners[inode]
+        self.known &= pids
+        self.inaccessible &= pids
+
+        for pid in sorted(pids - self.known):
+            self.scan(pid)
+            if clock() > deadline:
+                return False
+
+        self.orphans &= active
+        unknown = active.difference(self.owners, self.orphans)
+        if not unknown:
+            return True
+        # Owners of sockets tend to open more of them
+        hot = [pid for pid in self.pid_sockets if pid not in self.inaccessible]
+        rest = sorted(pids - self.inaccessible - set(hot))
+        if self.cursor >= len(rest):
+            self.cursor = 0
+        candidates = hot + rest[self.cursor:] + rest[:self.cursor]
+        for n, pid in enumerate(candidates):
+            self.scan(pid)
+            unknown.difference_update(self.pid_sockets.get(pid, ()))
+            if not unknown:
+                return True
+            if clock() > deadline:
+                if n >= len(hot):
+                    self.cursor += n - len(hot) + 1
+                return False
+        self.orphans |= unknown
+        return True
+
+
+class ProcessAttribution:
+    """Per-process TCP throughput on Linux, listed as top talkers.
+
+    /proc/net/tcp has no byte counters, so per-socket bytes come from a
+    NETLINK_SOCK_DIAG dump (tcp_info bytes received and acked) and each
+    socket's delta since the previous round is credited to the process that
+    owns it according to SocketOwners. Loopback connections are left out by
+    default since they never reach an interface. Rounds run on their own
+    thread and are paced to stay within cpu_budget of one core.
+    """
+
+    def __init__(self, period=DEFAULT_PERIOD, cpu_budget=DEFAULT_CPU_BUDGET, top=DEFAULT_TOP,
+                 include_loopback=False, proc=PROC):
+        self.period = period
+        self.cpu_budget = cpu_budget
+        self.top = top
+        self.include_loopback = include_loopback
+        self.proc = proc
+        self.owners = SocketOwners(proc)
+        self.diag = SockDiag()
+        self.counters = {}   # inode -> (bytes received, bytes acked) at the last round
+        self.names = {}      # pid -> command name
+        self.top_talkers = []
+        self.unowned = (0.0, 0.0)
+        self.thread = None
+        self._stop_event = threading.Event()
+
+    def start(self):
+        self.thread = threading.Thread(target=self._run, name='ProcessAttribution', daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self.thread is not None:
+            self.thread.join(timeout=2)
+            self.thread = None
+        self.diag.close()
+
+    def _run(self):
+        last = time.monotonic()
+        wait = self.period
+        while not self._stop_event.wait(wait):
+            now = time.monotonic()
+            started = time.thread_time()
+            try:
+                self.attribute(now - last, started + self.cpu_budget * (now - last))
+            except Exception as e:
+                logger.error(f"Error attributing traffic to processes: {str(e)}")
+            last = now
+            # Stretch the next wait if this round overran its share
+            wait = max(self.period, (time.thread_time() - started) / self.cpu_budget)
+
+    def process_name(self, pid):
+        name = self.names.get(pid)
+        if name is None:
+            try:
+                with open(f'{self.proc}/{pid}/comm', 'rb') as f:
+                    name = f.read().strip().decode(errors='replace')
+            except OSError:
+                name = str(pid)
+            self.names[pid] = name
+        return name
+
+    def attribute(self, elapsed, deadline):
+        """One round: dump socket counters, refresh owners and total the deltas per process"""
+        counters = self.diag.tcp_bytes(self.include_loopback)
+        previous = self.counters
+        self.counters = counters
+        active = read_active_sockets(self.proc)
+        active.intersection_update(counters)
+        self.owners.refresh(active, deadline)
+        owners = self.owners.owners
+
+        totals = {}   # pid -> [received, sent, sockets]
+        unowned_recv = unowned_sent = 0
+        for inode, (received, acked) in counters.items():
+            before = previous.get(inode)
+            if before is None:
+                continue
+            recv = received - before[0]
+            sent = acked - before[1]
+            if not recv and not sent:
+                continue
+            pid = owners.get(inode)
+            if pid is None:
+                unowned_recv += recv
+                unowned_sent += sent
+                continue
+            total = totals.get(pid)
+            if total is None:
+                total = totals[pid] = [0, 0, 0]
+            total[0] += recv
+            total[1] += sent
+            total[2] += 1
+        for pid in set(self.names) - set(self.owners.pid_sockets):
+            del self.names[pid]
+
+        rates = [ProcessRate(pid, self.process_name(pid), recv / elapsed, sent / elapsed, sockets)
+                 for pid, (recv, sent, sockets) in totals.items()]
+        rates.sort(key=lambda rate: rate.recv_rate + rate.sent_rate, reverse=True)
+        self.top_talkers = rates[:self.top]
+        self.unowned = (unowned_recv / elapsed, unowned_sent / elapsed)
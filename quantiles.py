@@ -0,0 +1,261 @@
+import math
+import threading
+from array import array
+
+# (name, seconds, slices): a window forgets its oldest slice at a time
+QUANTILE_WINDOWS = (
+    ('1 min', 60, 6),
+    ('1 h', 3600, 12),
+    ('24 h', 24 * 3600, 24),
+)
+QUANTILES = (0.5, 0.95, 0.99)
+MAX_SERIES = 256            # per-interface series kept; interfaces beyond it are not tracked
+EXPIRY_PERIOD = 60.0        # seconds between sweeps for series idle longer than the longest window
+
+RELATIVE_ERROR = 0.05       # of every reported quantile
+MAX_RATE = 1e12             # bytes per second; faster rates land in the top bucket
+GAMMA = (1 + RELATIVE_ERROR) / (1 - RELATIVE_ERROR)
+LOG_GAMMA = math.log(GAMMA)
+# Bucket 0 holds rates under 1 B/s (idle), bucket k >= 1 rates in (GAMMA^(k-1), GAMMA^k]
+BUCKETS = int(math.ceil(math.log(MAX_RATE) / LOG_GAMMA)) + 2
+
+
+def rate_bucket(rate):
+    if rate < 1.0:
+        return 0
+    return min(int(math.ceil(math.log(rate) / LOG_GAMMA)) + 1, BUCKETS - 1)
+
+
+def bucket_bounds(bucket):
+    """(low, high) such that low < rate <= high exactly for rates in the bucket"""
+    if bucket == 0:
+        return float('-inf'), math.nextafter(1.0, 0.0)
+    if bucket == BUCKETS - 1:
+        return GAMMA ** (bucket - 2), float('inf')
+    low = GAMMA ** (bucket - 2) if bucket > 1 else math.nextafter(1.0, 0.0)
+    return low, GAMMA ** (bucket - 1)
+
+
+def bucket_value(bucket):
+    """Representative rate of a bucket, within RELATIVE_ERROR of anything in it"""
+    if bucket == 0:
+        return 0.0
+    return 2 * GAMMA ** (bucket - 1) / (GAMMA + 1)
+
+
+class SlidingHistogram:
+    """Time-weighted log histogram of rates over a sliding window.
+
+    The window is split into slices, each with its own sparse histogram
+    ({bucket: seconds}), and a running histogram holds their sum. Adding a
+    sample touches one bucket of the current slice and of the sum; when
+    time moves into a new slice the oldest one is subtracted from the sum
+    and cleared, once per slice rather than per sample. Rates cluster in a
+    handful of buckets (an idle interface uses one), so memory follows how
+    varied the traffic was and never exceeds BUCKETS entries per slice.
+    """
+
+    __slots__ = ('slice_seconds', 'slices', 'counts', 'slice_ids', 'current', 'slot')
+
+    def __init__(self, seconds, slices):
+        self.slice_seconds = seconds / slices
+        self.slices = [{} for _ in range(slices)]
+        self.counts = {}
+        self.slice_ids = array('q', [-1]) * slices
+        self.current = -1
+        self.slot = 0
+
+    def add(self, timestamp, bucket, weight):
+        slice_id = int(timestamp // self.slice_seconds)
+        if slice_id != self.current:
+            self.advance(slice_id)
+        current = self.slices[self.slot]
+        current[bucket] = current.get(bucket, 0.0) + weight
+        counts = self.counts
+        counts[bucket] = counts.get(bucket, 0.0) + weight
+
+    def advance(self, slice_id):
+        """Expire every slice that fell out of the window by slice_id"""
+        capacity = len(self.slices)
+        counts = self.counts
+        for n, expired in enumerate(self.slice_ids):
+            if 0 <= expired <= slice_id - capacity:
+                old = self.slices[n]
+                for bucket, weight in old.items():
+                    remaining = counts[bucket] - weight
+                    if remaining > 1e-9:
+                        counts[bucket] = remaining
+                    else:
+                        del counts[bucket]
+                old.clear()
+                self.slice_ids[n] = -1
+        self.slot = slice_id % capacity
+        self.slice_ids[self.slot] = slice_id
+        self.current = slice_id
+
+    def quantiles(self, now, fractions=QUANTILES):
+        """Rates at the given fractions of the window's time, or None when it is empty"""
+        self.advance(int(now // self.slice_seconds))
+        counts = self.counts
+        total = sum(counts.values())
+        if total <= 0:
+            return None
+        buckets = sorted(counts)
+        results = []
+        cumulative = 0.0
+        k = 0
+        for fraction in fractions:
+            target = fraction * total
+            while k < len(buckets) - 1 and cumulative + counts[buckets[k]] < target:
+                cumulative += counts[buckets[k]]
+                k += 1
+            results.append(bucket_value(buckets[k]))
+        return tuple(results)
+
+
+class RateQuantiles:
+    """One rate series (an interface's download, say) over every QUANTILE_WINDOWS window.
+
+    Consecutive samples in the same bucket are the norm (an idle link stays
+    in bucket 0 for hours), so a run of them is only summed up here and
+    written to the histograms once the bucket changes, a slice boundary is
+    crossed or someone asks for quantiles. A tick in the same bucket as the
+    last one costs two comparisons and an add, without even taking the log.
+    """
+
+    __slots__ = ('windows', 'histograms', 'pending_bucket', 'pending_weight', 'pending_timestamp',
+                 'pending_end', 'pending_low', 'pending_high')
+
+    def __init__(self, windows=QUANTILE_WINDOWS):
+        self.windows = {name: SlidingHistogram(seconds, slices) for name, seconds, slices in windows}
+        self.histograms = tuple(self.windows.values())
+        self.pending_bucket = -1
+        self.pending_weight = 0.0
+        self.pending_timestamp = 0.0
+        self.pending_end = 0.0
+        self.pending_low = self.pending_high = 0.0
+
+    def add(self, timestamp, rate, interval):
+        if self.pending_low < rate <= self.pending_high and timestamp < self.pending_end:
+            self.pending_weight += interval
+            return
+        self.flush()
+        bucket = rate_bucket(rate)
+        self.pending_bucket = bucket
+        self.pending_low, self.pending_high = bucket_bounds(bucket)
+        self.pending_weight = interval
+        self.pending_timestamp = timestamp
+        # The run stays within one slice of every window
+        self.pending_end = min((timestamp // histogram.slice_seconds + 1) * histogram.slice_seconds
+                               for histogram in self.histograms)
+
+    def flush(self):
+        if self.pending_bucket >= 0:
+            for histogram in self.histograms:
+                histogram.add(self.pending_timestamp, self.pending_bucket, self.pending_weight)
+            self.pending_bucket = -1
+
+    def quantiles(self, window, now):
+        self.flush()
+        return self.windows[window].quantiles(now)
+
+
+class QuantileTracker:
+    """Streaming p50/p95/p99 per interface and direction, plus the filtered total.
+
+    Samples are weighted by their interval, so the quantiles are over time
+    rather than over ticks and a faster sampling period doesn't skew them.
+    The collector thread adds while the GUI thread queries, and queries
+    expire old slices too, so both go through one lock. Interfaces come
+    and go (container veths, VPN tunnels), so a series without samples for
+    longer than the longest window is dropped, and at most max_series
+    interfaces are tracked at once.
+    """
+
+    TOTAL = ''
+
+    def __init__(self, windows=QUANTILE_WINDOWS, max_series=MAX_SERIES):
+        self.window_specs = windows
+        self.max_series = max_series
+        self.series = {}      # interface name ('' for the total) -> (download, upload) RateQuantiles
+        self.updated = {}     # interface name (not the total) -> timestamp of its last sample
+        self.retention = max(seconds for _, seconds, _ in windows)
+        self.next_expiry = float('-inf')
+        self.last_timestamp = None
+        self.lock = threading.Lock()
+
+    def add(self, name, timestamp, recv_rate, sent_rate, interval):
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                series = self.new_series(name, timestamp)
+            if series is not None:
+                series[0].add(timestamp, recv_rate, interval)
+                series[1].add(timestamp, sent_rate, interval)
+                if name != self.TOTAL:
+                    self.updated[name] = timestamp
+            self.tick(timestamp)
+
+    def add_table(self, table, indices, interval):
+        """One tick of each listed interface of an InterfaceTable, under a single lock"""
+        recv_now, recv_prev = table.bytes_recv, table.prev_bytes_recv
+        sent_now, sent_prev = table.bytes_sent, table.prev_bytes_sent
+        names = table.names
+        timestamp = table.timestamp
+        with self.lock:
+            all_series = self.series
+            updated = self.updated
+            for i in indices:
+                name = names[i]
+                series = all_series.get(name)
+                if series is None:
+                    series = self.new_series(name, timestamp)
+                    if series is None:
+                        continue
+                # Same reset/wrap rule as SpeedCalculator.calculate_rates
+                series[0].add(timestamp, max(recv_now[i] - recv_prev[i], 0) / interval, interval)
+                series[1].add(timestamp, max(sent_now[i] - sent_prev[i], 0) / interval, interval)
+                updated[name] = timestamp
+            self.tick(timestamp)
+
+    def new_series(self, name, timestamp):
+        """A new (download, upload) pair, or None when max_series interfaces are all still active"""
+        if name != self.TOTAL and len(self.updated) >= self.max_series:
+            idlest = min(self.updated, key=self.updated.get)
+            # Every one sampled within the last sweep period: refuse the newcomer rather than churn
+            if timestamp - self.updated[idlest] < EXPIRY_PERIOD:
+                return None
+            self.drop(idlest)
+        series = self.series[name] = (RateQuantiles(self.window_specs), RateQuantiles(self.window_specs))
+        return series
+
+    def tick(self, timestamp):
+        self.last_timestamp = timestamp
+        if timestamp >= self.next_expiry:
+            self.expire(timestamp)
+
+    def expire(self, now):
+        """Drop interfaces without samples for longer than the longest window; every quantile would be None"""
+        self.next_expiry = now + EXPIRY_PERIOD
+        cutoff = now - self.retention
+        for name in [name for name, timestamp in self.updated.items() if timestamp < cutoff]:
+            self.drop(name)
+
+    def drop(self, name):
+        del self.series[name]
+        del self.updated[name]
+
+    def interfaces(self):
+        with self.lock:
+            return [name for name in self.series if name != self.TOTAL]
+
+    def summary(self, name=TOTAL, now=None):
+        """{window: (download quantiles, upload quantiles)}, each a QUANTILES tuple or None"""
+        with self.lock:
+            series = self.series.get(name)
+            if series is None:
+                return {}
+            if now is None:
+                now = self.last_timestamp
+            return {window: (series[0].quantiles(window, now), series[1].quantiles(window, now))
+                    for window, _, _ in self.window_specs}
@@ -0,0 +1,134 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger('NetSpeedMeter')
+
+
+class AdaptiveScheduler:
+    """Ticks on a monotonic deadline grid and slows down when nothing is happening.
+
+    Deadlines advance by whole periods from the first tick, so time spent
+    sampling never accumulates as drift and a late wake-up skips the missed
+    slots instead of firing a burst of catch-up ticks. The period drops to
+    slow_period after idle_after seconds below idle_threshold bytes/s and to
+    hidden_period while the widget is hidden; the first busy sample or
+    showing the widget snaps it back to fast_period immediately.
+    """
+
+    def __init__(self, fast_period=0.1, slow_period=1.0, hidden_period=2.0,
+                 idle_threshold=2048, idle_after=5.0, report_interval=600,
+                 clock=time.monotonic):
+        self.fast_period = fast_period
+        self.slow_period = slow_period
+        self.hidden_period = hidden_period
+        self.idle_threshold = idle_threshold  # bytes per second
+        self.idle_after = idle_after
+        self.report_interval = report_interval
+        self.clock = clock
+
+        self.period = fast_period
+        self.visible = True
+        self.running = True
+        self.next_deadline = None
+        self.last_tick = None
+        self.last_activity = clock()
+        self._wake_event = threading.Event()
+        self.reset_stats()
+
+    def reset_stats(self):
+        self.ticks = 0
+        self.missed = 0
+        self.jitter_last = 0.0
+        self.jitter_max = 0.0
+        self.jitter_total = 0.0
+        self.stats_since = self.clock()
+
+    def jitter_stats(self):
+        """Scheduling jitter (seconds late) since the last reset"""
+        return {
+            'ticks': self.ticks,
+            'missed': self.missed,
+            'period': self.period,
+            'last': self.jitter_last,
+            'mean': self.jitter_total / self.ticks if self.ticks else 0.0,
+            'max': self.jitter_max,
+        }
+
+    def wait(self):
+        """Sleep until the next deadline; returns False once stopped"""
+        now = self.clock()
+        if self.next_deadline is None:
+            self.next_deadline = now
+
+        delay = self.next_deadline - now
+        woken = self._wake_event.wait(delay) if delay > 0 else self._wake_event.is_set()
+        if not self.running:
+            return False
+
+        now = self.clock()
+        if woken:
+            # Period changed while sleeping; tick now and restart the grid here
+            self._wake_event.clear()
+            self.next_deadline = now
+        else:
+            jitter = now - self.next_deadline
+            self.jitter_last = jitter
+            self.jitter_total += jitter
+            if jitter > self.jitter_max:
+                self.jitter_max = jitter
+
+        self.ticks += 1
+        self.last_tick = self.next_deadline
+        self.next_deadline += self.period
+        if self.next_deadline <= now:
+            # Overran one or more slots (slow read, suspend); stay on the grid
+            skipped = int((now - self.next_deadline) // self.period) + 1
+            self.next_deadline += skipped * self.period
+            self.missed += skipped
+
+        if now - self.stats_since >= self.report_interval:
+            self._report()
+        return True
+
+    def report_activity(self, bytes_per_second):
+        """Feed the latest throughput so the scheduler can back off or snap back"""
+        now = self.clock()
+        if bytes_per_second >= self.idle_threshold:
+            self.last_activity = now
+        self._update_period(now)
+
+    def set_visible(self, visible):
+        self.visible = visible
+        self._update_period(self.clock())
+
+    def _update_period(self, now):
+        if not self.visible:
+            period = self.hidden_period
+        elif now - self.last_activity >= self.idle_after:
+            period = self.slow_period
+        else:
+            period = self.fast_period
+        if period == self.period:
+            return
+
+        speeding_up = period < self.period
+        self.period = period
+        if speeding_up:
+            # Cut a long sleep short rather than waiting out the slow period
+            self._wake_event.set()
+        elif self.last_tick is not None:
+            self.next_deadline = self.last_tick + period
+
+    def _report(self):
+        stats = self.jitter_stats()
+        logger.info(
+            f"Sampling: {stats['ticks']} ticks, {stats['missed']} missed, "
+            f"period {stats['period'] * 1000:.0f} ms, jitter mean "
+            f"{stats['mean'] * 1000:.2f} ms max {stats['max'] * 1000:.2f} ms"
+        )
+        self.reset_stats()
+
+    def stop(self):
+        self.running = False
+        self._wake_event.set()
@@ -3,6 +3,13 @@ from PyQt5.QtWidgets import (QDialog, QLabel, QVBoxLayout, QPushButton,
 from PyQt5.QtCore import Qt, QPoint
 from PyQt5.QtGui import QColor
 
+# Smoothing choices shown in the dialog, from most responsive to most stable
+SMOOTHING_OPTIONS = {
+    'Instant': 'instant',
+    'Smooth (EWMA)': 'ewma',
+    'Window Average': 'window',
+}
+
 class SettingsDialog(QDialog):
     def __init__(self, parent=None):
         super().__init__(parent, Qt.FramelessWindowHint)
@@ -67,6 +74,10 @@ class SettingsDialog(QDialog):
         theme_layout.addWidget(self.theme_combo)
         layout.addLayout(theme_layout)
 
+        if getattr(parent, 'custom_colors', None):
+            # Start from the saved custom theme so picking one colour keeps the other
+            self.custom_colors = dict(parent.custom_colors)
+
         # Colors section
         colors_layout = QHBoxLayout()
         self.bg_color_button = QPushButton('Background Color')
@@ -106,6 +117,22 @@ class SettingsDialog(QDialog):
         layout.addWidget(self.unit_label)
         layout.addWidget(self.unit_input)
 
+        # Smoothing settings
+        self.smoothing_label = QLabel('Smoothing:')
+        self.smoothing_input = QComboBox()
+        self.smoothing_input.addItems(list(SMOOTHING_OPTIONS))
+        self.smoothing_input.setCurrentText(
+            {mode: text for text, mode in SMOOTHING_OPTIONS.items()}[parent.speed_calculator.smoothing])
+        layout.addWidget(self.smoothing_label)
+        layout.addWidget(self.smoothing_input)
+
+        self.add_section_header("Interfaces", layout)
+
+        # Interface selection
+        self.physical_only_checkbox = QCheckBox("Physical Interfaces Only")
+        self.physical_only_checkbox.setChecked(parent.interface_filter.physical_only)
+        layout.addWidget(self.physical_only_checkbox)
+
         # Apply button
         layout.addSpacing(10)
         self.apply_button = QPushButton('Apply')
@@ -161,6 +188,10 @@ class SettingsDialog(QDialog):
         
         self.parent().set_text_size(text_size)
         self.parent().speed_calculator.set_unit(unit)
+        self.parent().speed_calculator.set_smoothing(SMOOTHING_OPTIONS[self.smoothing_input.currentText()])
+        interface_filter = self.parent().interface_filter
+        self.parent().set_interface_filter(interface_filter.include, interface_filter.exclude,
+                                           self.physical_only_checkbox.isChecked())
         self.parent().toggle_colored_arrows(self.colored_arrows_checkbox.isChecked())
         self.parent().update_unit_labels()
         self.close()
@@ -0,0 +1,90 @@
+import logging
+
+from PyQt5.QtCore import QObject, QSettings, QTimer
+from PyQt5.QtWidgets import QApplication
+
+logger = logging.getLogger('NetSpeedMeter')
+
+SAVE_DELAY_MS = 2000   # quiet time after the last change before writing to disk
+
+
+class SettingsStore(QObject):
+    """QSettings kept in memory and written in batches.
+
+    Reads are served from memory once a key has been read or set. Changes
+    are only marked dirty; the whole batch goes to disk in one sync() after
+    SAVE_DELAY_MS without further changes, at flush(), and when the
+    application quits. Dragging the window therefore does no disk I/O, and
+    a settling period ends in a single write. File-based settings are
+    written to a temporary file and renamed over the old one, so a crash
+    mid-write leaves the previous settings intact.
+    """
+
+    def __init__(self, settings, parent=None):
+        super().__init__(parent)
+        self.settings = settings
+        self.settings.setAtomicSyncRequired(True)
+        self.values = {}    # key -> value, as read or last set
+        self.dirty = set()
+        self.writes = 0
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(SAVE_DELAY_MS)
+        self._timer.timeout.connect(self.flush)
+        app = QApplication.instance()
+        if app is not None:
+            app.aboutToQuit.connect(self.flush)
+
+    def contains(self, key):
+        return key in self.values or self.settings.contains(key)
+
+    def value(self, key, default=None, type=None):
+        if key in self.values:
+            return self.values[key]
+        if not self.settings.contains(key):
+            return default
+        value = self.settings.value(key, default, type=type) if type is not None else self.settings.value(key, default)
+        self.values[key] = value
+        return value
+
+    def get_bool(self, key, default=False):
+        return self.value(key, default, bool)
+
+    def get_int(self, key, default=0):
+        return self.value(key, default, int)
+
+    def get_float(self, key, default=0.0):
+        return self.value(key, default, float)
+
+    def get_str(self, key, default=''):
+        return self.value(key, default, str)
+
+    def get_list(self, key, default=()):
+        return list(self.value(key, list(default), list))
+
+    def set(self, key, value):
+        """Change a setting in memory; it is written once changes settle"""
+        if isinstance(value, (list, tuple)):
+            value = list(value)
+        if key in self.values and self.values[key] == value:
+            return
+        self.values[key] = value
+        self.dirty.add(key)
+        self._timer.start()
+
+    def flush(self):
+        """Write pending changes now, in one sync"""
+        self._timer.stop()
+        if not self.dirty:
+            return
+        try:
+            for key in self.dirty:
+                self.settings.setValue(key, self.values[key])
+            self.settings.sync()
+            if self.settings.status() != QSettings.NoError:
+                logger.error(f"Error writing settings: status {self.settings.status()}")
+                return
+            self.dirty.clear()
+            self.writes += 1
+        except Exception as e:
+            logger.error(f"Error writing settings: {str(e)}")
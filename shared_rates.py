@@ -0,0 +1,278 @@
+"""Live rates published in shared memory for other local processes.
+
+The meter writes the latest per-interface counters and rates into a
+multiprocessing.shared_memory segment once per tick; status bars and agents
+attach with SharedRatesReader and read a consistent snapshot straight from
+the mapping, without syscalls, locks or waking the meter. Each user gets a
+segment of their own, and a publisher never takes over a segment whose
+publisher is still running.
+
+    reader = SharedRatesReader()
+    download, upload = reader.rates()      # bytes per second
+    snapshot = reader.snapshot()           # everything, per interface
+"""
+import getpass
+import itertools
+import logging
+import os
+import struct
+import time
+from collections import namedtuple
+from multiprocessing import shared_memory
+
+import psutil
+
+from net_sampler import COUNTER_FIELDS
+
+logger = logging.getLogger('NetSpeedMeter')
+
+SHARED_MEMORY_NAME = 'netspeedmeter'   # prefix; the default segment is per user
+SHARED_MAGIC = b'NSMR'
+SHARED_VERSION = 3
+DEFAULT_CAPACITY = 64      # interfaces; the rest are left out
+NAME_SIZE = 64             # Windows adapter names run long
+
+# magic, version, entry size, sequence, capacity, interface count,
+# timestamp, interval, smoothed download and upload rates, publisher pid,
+# entries before capping to the capacity (e.g. every host of a large fleet)
+HEADER = struct.Struct('<4sHHQIIddddQQ')
+SEQUENCE = struct.Struct('<Q')
+SEQUENCE_OFFSET = 8
+RATES = struct.Struct('<dd')
+RATES_OFFSET = 40
+# Retries that spin before the reader starts yielding the CPU to the writer
+SPIN_READS = 64
+
+# name, every counter in COUNTER_FIELDS, receive and send rates
+ENTRY = struct.Struct(f'<{NAME_SIZE}s{len(COUNTER_FIELDS)}Qdd')
+
+# Segments published by this process; a stale segment can carry our pid after a restart in a container
+_published = set()
+
+InterfaceSnapshot = namedtuple('InterfaceSnapshot', ('name', *COUNTER_FIELDS, 'recv_rate', 'sent_rate'))
+RatesSnapshot = namedtuple('RatesSnapshot', 'sequence timestamp interval download upload interfaces total')
+
+
+def segment_size(capacity):
+    return HEADER.size + capacity * ENTRY.size
+
+
+def default_segment_name(prefix=SHARED_MEMORY_NAME):
+    """A segment name scoped to the current user, so users don't collide"""
+    try:
+        user = str(os.getuid())
+    except AttributeError:  # Windows
+        user = ''.join(c for c in getpass.getuser() if c.isalnum())
+    return f'{prefix}-{user}'
+
+
+def segment_owner(name):
+    """Pid of the publisher recorded in an existing segment, or None if it isn't ours"""
+    shm = attach(name)
+    try:
+        magic, version, entry_size = HEADER.unpack_from(shm.buf)[:3]
+        if magic != SHARED_MAGIC or version != SHARED_VERSION or entry_size != ENTRY.size:
+            return None
+        return HEADER.unpack_from(shm.buf)[10]
+    finally:
+        shm.close()
+
+
+class SharedRatesPublisher:
+    """Writes each tick into the shared segment under a seqlock.
+
+    The sequence number is odd while a write is in progress and bumped to
+    the next even number once it's complete. Readers copy the segment and
+    keep the copy only if the sequence was even and unchanged around it, so
+    the writer never waits for anybody.
+
+    Raises FileExistsError when another live process already publishes
+    under the same name.
+    """
+
+    def __init__(self, speed_calculator=None, name=None, capacity=DEFAULT_CAPACITY):
+        self.speed_calculator = speed_calculator
+        self.name = name or default_segment_name()
+        self.capacity = capacity
+        self.sequence = 0
+        self.pid = os.getpid()
+        self.shm = self._create(segment_size(capacity))
+        _published.add(self.name)
+        self.buf = self.shm.buf
+        HEADER.pack_into(self.buf, 0, SHARED_MAGIC, SHARED_VERSION, ENTRY.size, 0, capacity, 0,
+                         0.0, 0.0, 0.0, 0.0, self.pid, 0)
+        self._names = {}
+        logger.info(f"Publishing rates in shared memory '{self.name}' ({self.shm.size} bytes)")
+
+    def _create(self, size):
+        try:
+            return shared_memory.SharedMemory(self.name, create=True, size=size)
+        except FileExistsError:
+            owner = segment_owner(self.name)
+            if owner is None:
+                raise FileExistsError(f"Shared memory segment '{self.name}' exists and isn't "
+                                      f"a version {SHARED_VERSION} rates segment")
+            if self.name in _published or (owner != self.pid and psutil.pid_exists(owner)):
+                raise FileExistsError(f"Shared memory segment '{self.name}' is in use by process {owner}")
+            # Left behind by a meter that didn't shut down cleanly
+            logger.warning(f"Replacing stale shared memory segment '{self.name}' of process {owner}")
+            stale = shared_memory.SharedMemory(self.name)
+            stale.close()
+            stale.unlink()
+            return shared_memory.SharedMemory(self.name, create=True, size=size)
+
+    def encoded_name(self, name):
+        encoded = self._names.get(name)
+        if encoded is None:
+            encoded = self._names[name] = name.encode()[:NAME_SIZE]
+        return encoded
+
+    def publish(self, table, interval):
+        """Collector tick listener: write this tick's counters and rates"""
+        stats = self.speed_calculator
+        columns = [getattr(table, field) for field in COUNTER_FIELDS]
+        rows = []
+        for i in range(len(table)):
+            if not table.is_present(i):
+                continue
+            recv = max(table.bytes_recv[i] - table.prev_bytes_recv[i], 0) / interval
+            sent = max(table.bytes_sent[i] - table.prev_bytes_sent[i], 0) / interval
+            rows.append((self.encoded_name(table.names[i]), *[column[i] for column in columns], recv, sent))
+        self.write(time.time(), interval, stats.download_stats.value(stats.smoothing),
+                   stats.upload_stats.value(stats.smoothing), rows)
+
+    def write(self, timestamp, interval, download, upload, rows, total=None):
+        """Publish rows of (encoded name, *counters, recv rate, sent rate) as one snapshot.
+
+        total is how many entries there are altogether, when rows holds only
+        some of them; by default the number of rows, before capping.
+        """
+        buf = self.buf
+        if total is None:
+            total = len(rows)
+        rows = rows[:self.capacity]
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+        HEADER.pack_into(buf, 0, SHARED_MAGIC, SHARED_VERSION, ENTRY.size, self.sequence,
+                         self.capacity, len(rows), timestamp, interval, download, upload, self.pid, total)
+        offset = HEADER.size
+        for row in rows:
+            ENTRY.pack_into(buf, offset, *row)
+            offset += ENTRY.size
+        self.sequence += 1
+        SEQUENCE.pack_into(buf, SEQUENCE_OFFSET, self.sequence)
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.buf = None
+        self.shm.close()
+        try:
+            self.shm.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm = None
+        _published.discard(self.name)
+
+
+def yield_cpu():
+    if hasattr(os, 'sched_yield'):
+        os.sched_yield()
+    else:
+        time.sleep(0)
+
+
+def attach(name):
+    """Map an existing segment without letting this process's resource tracker remove it"""
+    try:
+        return shared_memory.SharedMemory(name, track=False)
+    except TypeError:  # track= is new in Python 3.13
+        shm = shared_memory.SharedMemory(name)
+        if name in _published:
+            # Our own segment: its registration belongs to the publisher
+            return shm
+        try:
+            from multiprocessing import resource_tracker
+            resource_tracker.unregister(shm._name, 'shared_memory')
+        except Exception:
+            pass
+        return shm
+
+
+class SharedRatesReader:
+    """Reads consistent snapshots of what SharedRatesPublisher last wrote.
+
+    Polling is cheap: while the sequence number hasn't moved the previous
+    snapshot is returned as is, so checking costs one 8-byte read. A read
+    that races a write is retried, spinning at first and then yielding the
+    CPU, which matters when the writer was preempted mid-write; after
+    timeout seconds the writer is assumed dead and TimeoutError is raised.
+    """
+
+    def __init__(self, name=None, timeout=0.5):
+        name = name or default_segment_name()
+        self.shm = attach(name)
+        self.buf = self.shm.buf
+        self.timeout = timeout
+        self._deadline = 0.0
+        magic, version, entry_size = HEADER.unpack_from(self.buf)[:3]
+        if magic != SHARED_MAGIC or version != SHARED_VERSION or entry_size != ENTRY.size:
+            self.close()
+            raise ValueError(f"Shared memory segment '{name}' isn't a version {SHARED_VERSION} rates segment")
+        self.last = None
+        self.contended_reads = 0
+
+    def sequence(self):
+        return SEQUENCE.unpack_from(self.buf, SEQUENCE_OFFSET)[0]
+
+    def _backoff(self, attempt):
+        """Wait a little before retrying a contended read"""
+        self.contended_reads += 1
+        if attempt < SPIN_READS:
+            return
+        if attempt == SPIN_READS:
+            self._deadline = time.perf_counter() + self.timeout
+        elif time.perf_counter() > self._deadline:
+            raise TimeoutError("No consistent read; the publisher may have died mid-write")
+        yield_cpu()
+
+    def rates(self):
+        """Smoothed (download, upload) in bytes per second"""
+        buf = self.buf
+        for attempt in itertools.count():
+            before = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0]
+            if not before & 1:
+                rates = RATES.unpack_from(buf, RATES_OFFSET)
+                if SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0] == before:
+                    return rates
+            self._backoff(attempt)
+
+    def snapshot(self):
+        """The latest RatesSnapshot, reusing the previous one if nothing was published since"""
+        buf = self.buf
+        for attempt in itertools.count():
+            before = SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0]
+            if before & 1:
+                self._backoff(attempt)
+                continue
+            if self.last is not None and self.last.sequence == before:
+                return self.last
+            # Copy first and only decode a copy that's known to be whole
+            count = min(HEADER.unpack_from(buf)[5], (len(buf) - HEADER.size) // ENTRY.size)
+            data = bytes(buf[:HEADER.size + count * ENTRY.size])
+            if SEQUENCE.unpack_from(buf, SEQUENCE_OFFSET)[0] != before:
+                self._backoff(attempt)
+                continue
+            _, _, _, sequence, _, _, timestamp, interval, download, upload, _, total = HEADER.unpack_from(data)
+            interfaces = []
+            for name, *values in ENTRY.iter_unpack(data[HEADER.size:]):
+                interfaces.append(InterfaceSnapshot(name.rstrip(b'\0').decode(errors='replace'), *values))
+            self.last = RatesSnapshot(sequence, timestamp, interval, download, upload, interfaces, total)
+            return self.last
+
+    def close(self):
+        if self.shm is None:
+            return
+        self.buf = None
+        self.shm.close()
+        self.shm = None
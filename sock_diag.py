@@ -0,0 +1,322 @@
+import os
+import socket
+import struct
+from array import array
+
+NETLINK_SOCK_DIAG = 4
+SOCK_DIAG_BY_FAMILY = 20
+NLM_F_REQUEST = 0x1
+NLM_F_DUMP = 0x300
+NLMSG_ERROR = 2
+NLMSG_DONE = 3
+INET_DIAG_INFO = 2
+TCP_SYN_RECV = 3
+TCP_TIME_WAIT = 6
+TCP_LISTEN = 10
+# Socket states that can still move bytes; request and time-wait sockets carry no tcp_info
+CONNECTED_STATES = ~((1 << TCP_LISTEN) | (1 << TCP_SYN_RECV) | (1 << TCP_TIME_WAIT)) & 0xFFFFFFFF
+
+NLMSGHDR = struct.Struct('=IHHII')
+# family, protocol, extensions, pad, states, then the socket id:
+# ports (big-endian), addresses, interface, cookie
+INET_DIAG_REQ_V2 = struct.Struct('=BBBxI4s16s16sI8s')
+# family, state, timer, retransmits, sport, dport, src, dst, interface,
+# cookie, expires, receive queue, send queue, uid, inode
+INET_DIAG_MSG = struct.Struct('=BBBB2s2s16s16sI8sIIIII')
+RTATTR = struct.Struct('=HH')
+# tcp_info.tcpi_bytes_acked and tcpi_bytes_received (Linux 4.1+)
+TCP_INFO_BYTES = struct.Struct('=QQ')
+TCP_INFO_BYTES_OFFSET = 120
+
+# Byte offsets into inet_diag_msg
+MSG_DPORT = 6
+MSG_DST = 24
+MSG_INODE = 68
+INODE = struct.Struct('=I')
+
+RECEIVE_BUFFER = 256 * 1024
+ENDPOINT_SLACK = 4          # endpoints kept per live socket before idle ones are pruned
+
+IPV6_LOOPBACK = bytes(15) + b'\x01'
+IPV4_MAPPED = bytes(10) + b'\xff\xff'
+
+
+def align(length):
+    return (length + 3) & ~3
+
+
+def is_loopback(family, address):
+    """Whether a 16-byte inet_diag address is loopback"""
+    if family == socket.AF_INET:
+        return address[0] == 127
+    return address == IPV6_LOOPBACK or (address[:12] == IPV4_MAPPED and address[12] == 127)
+
+
+def tcp_info_bytes(buffer, attributes, end, hint=-1):
+    """Offset of the tcp_info byte counters within one message's attributes, or -1.
+
+    hint is where tcp_info sat relative to the attributes in the previous
+    message; the kernel emits the same attributes for every socket of a
+    dump, so checking there first usually saves walking the list.
+    """
+    if hint >= 0 and attributes + hint + RTATTR.size <= end:
+        length, kind = RTATTR.unpack_from(buffer, attributes + hint)
+        if kind == INET_DIAG_INFO and length >= RTATTR.size + TCP_INFO_BYTES_OFFSET + TCP_INFO_BYTES.size:
+            return attributes + hint + RTATTR.size + TCP_INFO_BYTES_OFFSET
+    while attributes + RTATTR.size <= end:
+        length, kind = RTATTR.unpack_from(buffer, attributes)
+        if length < RTATTR.size:
+            break
+        if kind == INET_DIAG_INFO and length >= RTATTR.size + TCP_INFO_BYTES_OFFSET + TCP_INFO_BYTES.size:
+            return attributes + RTATTR.size + TCP_INFO_BYTES_OFFSET
+        attributes += align(length)
+    return -1
+
+
+def format_endpoint(family, address, port):
+    if family == socket.AF_INET:
+        return f'{socket.inet_ntop(family, address[:4])}:{port}'
+    if address[:12] == IPV4_MAPPED:
+        return f'{socket.inet_ntop(socket.AF_INET, address[12:])}:{port}'
+    return f'[{socket.inet_ntop(family, address)}]:{port}'
+
+
+class SockDiag:
+    """Bulk TCP socket dumps over NETLINK_SOCK_DIAG (Linux only).
+
+    One dump per address family returns every TCP socket with its tcp_info,
+    which unlike /proc/net/tcp carries per-socket byte counters.
+    """
+
+    def __init__(self):
+        self.sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW | socket.SOCK_CLOEXEC, NETLINK_SOCK_DIAG)
+        self.sock.bind((0, 0))
+        self.buffer = bytearray(RECEIVE_BUFFER)
+        self.sequence = 0
+
+    def dump(self, family, states=~(1 << TCP_LISTEN) & 0xFFFFFFFF):
+        """Yield (message offset, attributes offset, message end) for each socket in the dump"""
+        self.sequence += 1
+        request = INET_DIAG_REQ_V2.pack(family, socket.IPPROTO_TCP, 1 << (INET_DIAG_INFO - 1), states,
+                                        b'', b'', b'', 0, b'')
+        header = NLMSGHDR.pack(NLMSGHDR.size + len(request), SOCK_DIAG_BY_FAMILY,
+                               NLM_F_REQUEST | NLM_F_DUMP, self.sequence, 0)
+        self.sock.send(header + request)
+        view = memoryview(self.buffer)
+        while True:
+            n = self.sock.recv_into(view)
+            offset = 0
+            while offset + NLMSGHDR.size <= n:
+                length, kind, _, sequence, _ = NLMSGHDR.unpack_from(self.buffer, offset)
+                if length < NLMSGHDR.size:
+                    return
+                if sequence != self.sequence:
+                    # Left over from a dump whose generator was abandoned, its DONE included
+                    offset += align(length)
+                    continue
+                if kind == NLMSG_DONE:
+                    return
+                if kind == NLMSG_ERROR:
+                    error, = struct.unpack_from('=i', self.buffer, offset + NLMSGHDR.size)
+                    if error:
+                        raise OSError(-error, os.strerror(-error))
+                    return
+                body = offset + NLMSGHDR.size
+                yield body, body + INET_DIAG_MSG.size, offset + length
+                offset += align(length)
+
+    def tcp_bytes(self, include_loopback=True):
+        """{inode: (bytes received, bytes acked)} for every TCP socket not listening"""
+        counters = {}
+        buffer = self.buffer
+        for family in (socket.AF_INET, socket.AF_INET6):
+            hint = -1
+            for body, attributes, end in self.dump(family):
+                message = INET_DIAG_MSG.unpack_from(buffer, body)
+                if not include_loopback and is_loopback(family, message[7]):
+                    continue
+                info = tcp_info_bytes(buffer, attributes, end, hint)
+                if info >= 0:
+                    hint = info - attributes - RTATTR.size - TCP_INFO_BYTES_OFFSET
+                    acked, received = TCP_INFO_BYTES.unpack_from(buffer, info)
+                    counters[message[14]] = (received, acked)
+        return counters
+
+    def close(self):
+        self.sock.close()
+
+
+class TcpEndpoints:
+    """Per remote endpoint TCP traffic between two dumps (Linux only).
+
+    Sockets live in slots of flat arrays indexed through an inode -> slot
+    dict, so a steady-state update allocates nothing per socket beyond the
+    integers it unpacks: each message is one dict lookup, a delta against
+    the slot's previous counters and an add into its endpoint's totals.
+    Remote addresses are only sliced out of the buffer for sockets seen for
+    the first time and formatted only for endpoints that get reported.
+    Sockets that appear between two dumps are credited with all their
+    bytes, so short connections in a burst still show up.
+
+    by_port=False aggregates per remote address instead of address:port,
+    which suits servers whose clients connect from ephemeral ports.
+    """
+
+    def __init__(self, diag=None, include_loopback=False, by_port=True):
+        self.diag = diag or SockDiag()
+        self.include_loopback = include_loopback
+        self.by_port = by_port
+        self.slots = {}                 # inode -> slot
+        self.free = []
+        self.inodes = array('Q')
+        self.received = array('Q')      # counters at the last dump
+        self.acked = array('Q')
+        self.endpoint = array('l')      # endpoint id of each slot
+        self.seen = array('Q')          # update that last saw the slot
+        self.endpoint_ids = {}          # (family, address, port) -> endpoint id
+        self.endpoint_keys = []
+        self.endpoint_names = []
+        self.endpoint_recv = array('Q')  # bytes in the last update
+        self.endpoint_sent = array('Q')
+        self.generation = 0
+        self.sockets = 0
+
+    def _endpoint_id(self, family, buffer, body):
+        address = bytes(buffer[body + MSG_DST:body + MSG_DST + 16])
+        port = int.from_bytes(buffer[body + MSG_DPORT:body + MSG_DPORT + 2], 'big') if self.by_port else 0
+        key = (family, address, port)
+        endpoint = self.endpoint_ids.get(key)
+        if endpoint is None:
+            endpoint = self.endpoint_ids[key] = len(self.endpoint_keys)
+            self.endpoint_keys.append(key)
+            self.endpoint_names.append(None)
+            self.endpoint_recv.append(0)
+            self.endpoint_sent.append(0)
+        return endpoint
+
+    def update(self):
+        """Dump every TCP socket and total the bytes each endpoint moved since the last update"""
+        if len(self.endpoint_keys) > ENDPOINT_SLACK * max(len(self.slots), 64):
+            self._prune()
+        self.generation += 1
+        generation = self.generation
+        first = generation == 1
+        endpoint_recv = self.endpoint_recv
+        endpoint_sent = self.endpoint_sent
+        endpoint_recv[:] = array('Q', bytes(8 * len(endpoint_recv)))
+        endpoint_sent[:] = array('Q', bytes(8 * len(endpoint_sent)))
+        slots = self.slots
+        inodes, received, acked = self.inodes, self.received, self.acked
+        endpoints, seen = self.endpoint, self.seen
+        buffer = self.diag.buffer
+        count = 0
+        for family in (socket.AF_INET, socket.AF_INET6):
+            hint = -1
+            for body, attributes, end in self.diag.dump(family, CONNECTED_STATES):
+                if not self.include_loopback and is_loopback(family, buffer[body + MSG_DST:body + MSG_DST + 16]):
+                    continue
+                info = tcp_info_bytes(buffer, attributes, end, hint)
+                if info < 0:
+                    continue
+                hint = info - attributes - RTATTR.size - TCP_INFO_BYTES_OFFSET
+                acked_now, received_now = TCP_INFO_BYTES.unpack_from(buffer, info)
+                inode, = INODE.unpack_from(buffer, body + MSG_INODE)
+                slot = slots.get(inode)
+                if slot is None:
+                    endpoint = self._endpoint_id(family, buffer, body)
+                    if self.free:
+                        slot = self.free.pop()
+                        inodes[slot] = inode
+                        endpoints[slot] = endpoint
+                    else:
+                        slot = len(inodes)
+                        inodes.append(inode)
+                        received.append(0)
+                        acked.append(0)
+                        endpoints.append(endpoint)
+                        seen.append(0)
+                    slots[inode] = slot
+                    recv = 0 if first else received_now
+                    sent = 0 if first else acked_now
+                else:
+                    endpoint = endpoints[slot]
+                    # A reused inode restarts its counters
+                    recv = max(received_now - received[slot], 0)
+                    sent = max(acked_now - acked[slot], 0)
+                received[slot] = received_now
+                acked[slot] = acked_now
+                seen[slot] = generation
+                endpoint_recv[endpoint] += recv
+                endpoint_sent[endpoint] += sent
+                count += 1
+        if count < len(slots):
+            for inode, slot in [item for item in slots.items() if seen[item[1]] != generation]:
+                del slots[inode]
+                self.free.append(slot)
+        self.sockets = count
+
+    def _prune(self):
+        """Forget endpoints no live socket points at and renumber the rest"""
+        live = sorted({self.endpoint[slot] for slot in self.slots.values()})
+        renumber = {old: new for new, old in enumerate(live)}
+        for slot in self.slots.values():
+            self.endpoint[slot] = renumber[self.endpoint[slot]]
+        self.endpoint_keys = [self.endpoint_keys[old] for old in live]
+        self.endpoint_names = [self.endpoint_names[old] for old in live]
+        self.endpoint_recv = array('Q', (self.endpoint_recv[old] for old in live))
+        self.endpoint_sent = array('Q', (self.endpoint_sent[old] for old in live))
+        self.endpoint_ids = {key: n for n, key in enumerate(self.endpoint_keys)}
+
+    def endpoint_name(self, endpoint):
+        name = self.endpoint_names[endpoint]
+        if name is None:
+            family, address, port = self.endpoint_keys[endpoint]
+            name = format_endpoint(family, address, port)
+            if not self.by_port:
+                name = name.rpartition(':')[0]
+            self.endpoint_names[endpoint] = name
+        return name
+
+    def top(self, count=10):
+        """[(endpoint, bytes received, bytes sent)] for the busiest endpoints of the last update"""
+        recv, sent = self.endpoint_recv, self.endpoint_sent
+        busy = [n for n in range(len(recv)) if recv[n] or sent[n]]
+        busy.sort(key=lambda n: recv[n] + sent[n], reverse=True)
+        return [(self.endpoint_name(n), recv[n], sent[n]) for n in busy[:count]]
+
+    def close(self):
+        self.diag.close()
+
+
+def main():
+    import argparse
+    import time
+
+    parser = argparse.ArgumentParser(description='Live TCP traffic per remote endpoint')
+    parser.add_argument('--period', type=float, default=1.0)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--by-address', action='store_true', help='group remote ports of the same address')
+    parser.add_argument('--include-loopback', action='store_true')
+    args = parser.parse_args()
+
+    endpoints = TcpEndpoints(include_loopback=args.include_loopback, by_port=not args.by_address)
+    last = time.monotonic()
+    endpoints.update()
+    try:
+        while True:
+            time.sleep(args.period)
+            now = time.monotonic()
+            endpoints.update()
+            elapsed, last = now - last, now
+            print(f'--- {endpoints.sockets} sockets, {len(endpoints.endpoint_keys)} endpoints', flush=True)
+            for name, recv, sent in endpoints.top(args.top):
+                print(f'{name:>47}  ↓ {recv / elapsed / 1024:10.1f} KB/s  ↑ {sent / elapsed / 1024:10.1f} KB/s',
+                      flush=True)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        endpoints.close()
+
+
+if __name__ == '__main__':
+    main()
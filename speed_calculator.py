@@ -1,21 +1,130 @@
 import logging
-from collections import deque
-from time import time
+from collections import deque, namedtuple
+from time import monotonic
+
+from quantiles import QuantileTracker
 
 logger = logging.getLogger('NetSpeedMeter')
 
+# How get_current_speeds() smooths the displayed rate
+SMOOTHING_MODES = ('instant', 'window', 'ewma')
+
+# Per-second packet, error and drop rates over the selected interfaces, and
+# the average packet size in bytes (0 when no packets moved)
+PacketRates = namedtuple('PacketRates', 'packets_recv packets_sent size_recv size_sent '
+                                        'errors_in errors_out drops_in drops_out')
+NO_PACKETS = PacketRates(0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)
+# Table counters summed for PacketRates, in the order calculate_packet_rates() uses them
+PACKET_COLUMNS = ('packets_recv', 'packets_sent', 'bytes_recv', 'bytes_sent',
+                  'errin', 'errout', 'dropin', 'dropout')
+
+
+def format_speed(speed, unit):
+    """A (value, unit) pair as the widget shows it, at display precision"""
+    if speed < 0.1:
+        return f'0.00 {unit}'
+    elif speed < 10:
+        return f'{speed:.2f} {unit}'
+    elif speed < 100:
+        return f'{speed:.1f} {unit}'
+    else:
+        return f'{speed:.0f} {unit}'
+
+
+class RollingStats:
+    """Throughput statistics over a sliding time window, maintained incrementally.
+
+    Every sample is an (end timestamp, bytes/s, interval) triple. The mean is
+    weighted by time, i.e. total bytes over total seconds in the window, and
+    min/max come from monotonic deques, so both adding and querying are O(1)
+    amortized. The EWMA decays by elapsed time rather than per sample, which
+    keeps its half-life meaningful when the sampling period changes.
+    """
+
+    def __init__(self, window=1.0, half_life=0.5):
+        self.window = window
+        self.half_life = half_life
+        self.samples = deque()   # (timestamp, rate, interval)
+        self.window_bytes = 0.0
+        self.window_time = 0.0
+        self._max = deque()      # (timestamp, rate), rates decreasing
+        self._min = deque()      # (timestamp, rate), rates increasing
+        self.ewma = 0.0
+        self.latest = 0.0
+        self.last_timestamp = None
+
+    def add(self, timestamp, rate, interval):
+        self.samples.append((timestamp, rate, interval))
+        self.window_bytes += rate * interval
+        self.window_time += interval
+        self.latest = rate
+        self.last_timestamp = timestamp
+
+        while self._max and self._max[-1][1] <= rate:
+            self._max.pop()
+        self._max.append((timestamp, rate))
+        while self._min and self._min[-1][1] >= rate:
+            self._min.pop()
+        self._min.append((timestamp, rate))
+
+        if self.half_life > 0:
+            alpha = 1 - 0.5 ** (interval / self.half_life)
+            self.ewma += alpha * (rate - self.ewma)
+        else:
+            self.ewma = rate
+
+        self.expire(timestamp)
+
+    def expire(self, now):
+        """Drop samples that ended before the window"""
+        cutoff = now - self.window
+        samples = self.samples
+        while samples and samples[0][0] <= cutoff:
+            _, rate, interval = samples.popleft()
+            self.window_bytes -= rate * interval
+            self.window_time -= interval
+        if not samples:
+            # Reset instead of letting float error accumulate
+            self.window_bytes = 0.0
+            self.window_time = 0.0
+        while self._max and self._max[0][0] <= cutoff:
+            self._max.popleft()
+        while self._min and self._min[0][0] <= cutoff:
+            self._min.popleft()
+
+    def mean(self):
+        return self.window_bytes / self.window_time if self.window_time > 0 else 0.0
+
+    def minimum(self):
+        return self._min[0][1] if self._min else 0.0
+
+    def maximum(self):
+        return self._max[0][1] if self._max else 0.0
+
+    def value(self, mode):
+        """Smoothed rate for one of SMOOTHING_MODES"""
+        if mode == 'window':
+            return self.mean()
+        if mode == 'ewma':
+            return self.ewma
+        return self.latest
+
+
 class SpeedCalculator:
-    def __init__(self, unit='KB/s'):
+    def __init__(self, unit='KB/s', smoothing='instant', window=1.0, half_life=0.5):
         self.unit = unit
         self.bytes_in_kb = 1024
         self.bytes_in_mb = 1024 * 1024
         # Remove conversion factors as we'll handle conversion dynamically
         
         self.validate_unit(unit)
-        self.sample_buffer_size = 10  # Increased from 5
-        self.download_samples = deque(maxlen=self.sample_buffer_size)
-        self.upload_samples = deque(maxlen=self.sample_buffer_size)
-        self.last_measurement_time = time()
+        self.smoothing = smoothing
+        self.download_stats = RollingStats(window, half_life)
+        self.upload_stats = RollingStats(window, half_life)
+        # Tail behaviour the smoothed speeds hide, per interface and in total
+        self.quantiles = QuantileTracker()
+        self.packet_rates = NO_PACKETS
+        self.last_measurement_time = monotonic()
         self.min_interval = 0.1  # Minimum interval between measurements
 
     def validate_unit(self, unit):
@@ -38,8 +147,15 @@ class SpeedCalculator:
                 return 0, 'KB/s'
                 
             # Calculate raw bytes per second
-            bytes_per_second = bytes_diff / interval
-            
+            return self.convert_rate(bytes_diff / interval)
+                
+        except Exception as e:
+            logger.error(f"Error calculating speed: {e}")
+            return 0, 'KB/s'
+
+    def convert_rate(self, bytes_per_second):
+        """Convert a rate in bytes per second to a (value, unit) pair"""
+        try:
             # Convert to KB/s
             speed_in_kb = bytes_per_second / 1024
             
@@ -50,58 +166,141 @@ class SpeedCalculator:
                 return speed_in_kb, 'KB/s'
                 
         except Exception as e:
-            logger.error(f"Error calculating speed: {e}")
+            logger.error(f"Error converting speed: {e}")
             return 0, 'KB/s'
 
-    def add_sample(self, bytes_diff, is_download=True):
+    def calculate_rates(self, table, interface_filter=None):
+        """Aggregate receive/send rates in bytes per second over a subset of interfaces"""
+        interval = table.interval()
+        if interval <= 0:
+            return 0.0, 0.0
+
+        indices = interface_filter.indices(table) if interface_filter else range(len(table))
+        recv_now, recv_prev = table.bytes_recv, table.prev_bytes_recv
+        sent_now, sent_prev = table.bytes_sent, table.prev_bytes_sent
+        recv = sent = 0
+        for i in indices:
+            # Counters going backwards mean a reset or wrap; count nothing for that tick
+            diff = recv_now[i] - recv_prev[i]
+            if diff > 0:
+                recv += diff
+            diff = sent_now[i] - sent_prev[i]
+            if diff > 0:
+                sent += diff
+        return recv / interval, sent / interval
+
+    def add_interface_quantiles(self, table, interface_filter=None):
+        """Feed one tick of per-interface rates to the quantile tracker"""
+        interval = table.interval()
+        if interval <= 0:
+            return
+        indices = interface_filter.indices(table) if interface_filter else range(len(table))
+        self.quantiles.add_table(table, indices, interval)
+
+    def calculate_packet_rates(self, table, interface_filter=None):
+        """PacketRates over a subset of interfaces, from counters the tick already read"""
+        interval = table.interval()
+        if interval <= 0:
+            return NO_PACKETS
+
+        indices = interface_filter.indices(table) if interface_filter else range(len(table))
+        columns = [(getattr(table, field), getattr(table, 'prev_' + field)) for field in PACKET_COLUMNS]
+        totals = []
+        for now, prev in columns:
+            total = 0
+            for i in indices:
+                # Same reset/wrap rule as the byte counters
+                diff = now[i] - prev[i]
+                if diff > 0:
+                    total += diff
+            totals.append(total)
+        packets_recv, packets_sent, bytes_recv, bytes_sent = totals[:4]
+        rates = PacketRates(
+            packets_recv / interval, packets_sent / interval,
+            bytes_recv / packets_recv if packets_recv else 0.0,
+            bytes_sent / packets_sent if packets_sent else 0.0,
+            *(total / interval for total in totals[4:]))
+        self.packet_rates = rates
+        return rates
+
+    def interface_rates(self, table, interface_filter=None):
+        """Per-interface (name, receive rate, send rate) in bytes per second"""
+        interval = table.interval()
+        if interval <= 0:
+            return []
+
+        indices = interface_filter.indices(table) if interface_filter else range(len(table))
+        rates = []
+        for i in indices:
+            recv = max(table.bytes_recv[i] - table.prev_bytes_recv[i], 0)
+            sent = max(table.bytes_sent[i] - table.prev_bytes_sent[i], 0)
+            rates.append((table.names[i], recv / interval, sent / interval))
+        return rates
+
+    def set_smoothing(self, mode, window=None, half_life=None):
+        """Choose how displayed speeds are smoothed"""
+        if mode not in SMOOTHING_MODES:
+            raise ValueError(f"Unsupported smoothing: {mode}. "
+                             f"Supported modes are: {', '.join(SMOOTHING_MODES)}")
+        self.smoothing = mode
+        for stats in (self.download_stats, self.upload_stats):
+            if window is not None:
+                stats.window = window
+            if half_life is not None:
+                stats.half_life = half_life
+
+    def add_sample(self, bytes_diff, is_download=True, interval=None, timestamp=None):
         """Add a new sample with automatic unit selection"""
-        current_time = time()
-        interval = current_time - self.last_measurement_time
-        
-        if interval < self.min_interval:
+        current_time = monotonic() if timestamp is None else timestamp
+        if interval is None:
+            interval = current_time - self.last_measurement_time
+            if interval < self.min_interval:
+                return None
+            self.last_measurement_time = current_time
+
+        if bytes_diff < 0 or interval <= 0:
             return None
-            
-        speed, unit = self.calculate_speed(bytes_diff, interval)
-        sample = (current_time, speed, unit)
-        
-        if is_download:
-            self.download_samples.append(sample)
-        else:
-            self.upload_samples.append(sample)
-            
-        self.last_measurement_time = current_time
-        return speed, unit
 
-    def get_weighted_average(self, samples):
-        """Calculate weighted average"""
-        if not samples:
-            return 0, 'KB/s'
-            
-        total_weight = 0
-        weighted_sum = 0
-        current_time = time()
-        
-        # Use simpler averaging for more accurate readings
-        recent_samples = [s for s in samples if (current_time - s[0]) <= 1.0]
-        
-        if not recent_samples:
-            return 0, 'KB/s'
-            
-        for _, speed, unit in recent_samples:
-            # Convert all speeds to KB/s for averaging
-            speed_in_kb = speed * 1024 if unit == 'MB/s' else speed
-            weighted_sum += speed_in_kb
-            total_weight += 1
-            
-        avg_speed = weighted_sum / total_weight
-        
-        # Convert back to appropriate unit
-        if avg_speed >= 1024:
-            return avg_speed / 1024, 'MB/s'
-        return avg_speed, 'KB/s'
+        rate = bytes_diff / interval
+        stats = self.download_stats if is_download else self.upload_stats
+        stats.add(current_time, rate, interval)
+        return self.convert_rate(rate)
+
+    def add_rates(self, recv_rate, sent_rate, interval, timestamp=None):
+        """Add one tick of receive/send rates in bytes per second"""
+        current_time = monotonic() if timestamp is None else timestamp
+        self.download_stats.add(current_time, recv_rate, interval)
+        self.upload_stats.add(current_time, sent_rate, interval)
+        self.quantiles.add(QuantileTracker.TOTAL, current_time, recv_rate, sent_rate, interval)
+
+    def get_weighted_average(self, stats):
+        """Smoothed speed of a RollingStats according to the smoothing mode"""
+        return self.convert_rate(stats.value(self.smoothing))
 
     def get_current_speeds(self):
         """Get current speeds with units"""
-        download_speed, download_unit = self.get_weighted_average(self.download_samples)
-        upload_speed, upload_unit = self.get_weighted_average(self.upload_samples)
-        return (download_speed, download_unit), (upload_speed, upload_unit)
\ No newline at end of file
+        download_speed, download_unit = self.get_weighted_average(self.download_stats)
+        upload_speed, upload_unit = self.get_weighted_average(self.upload_stats)
+        return (download_speed, download_unit), (upload_speed, upload_unit)
+
+    def get_quantiles(self, interface=None):
+        """{window: (download, upload)} p50/p95/p99 in bytes per second, None for an empty window.
+
+        Without an interface name the quantiles are of the filtered total.
+        """
+        return self.quantiles.summary(interface or QuantileTracker.TOTAL)
+
+    def get_packet_rates(self):
+        """PacketRates of the last tick"""
+        return self.packet_rates
+
+    def get_window_stats(self, is_download=True):
+        """Mean/min/max/EWMA over the window in bytes per second"""
+        stats = self.download_stats if is_download else self.upload_stats
+        return {
+            'mean': stats.mean(),
+            'min': stats.minimum(),
+            'max': stats.maximum(),
+            'ewma': stats.ewma,
+            'latest': stats.latest,
+        }
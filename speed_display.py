@@ -0,0 +1,188 @@
+from PyQt5.QtCore import QPointF, QRect, QSize, Qt
+from PyQt5.QtGui import QColor, QFont, QFontMetricsF, QPainter, QPixmap
+from PyQt5.QtWidgets import QSizePolicy, QWidget
+
+# Widest reading format_speed() produces for one unit; the widget reserves
+# room for it so a changing reading never resizes the layout
+RESERVED_TEXT = '0000 KB/s'
+CACHED_STYLES = 8     # glyph caches kept per widget, e.g. for switching themes back and forth
+
+
+class GlyphCache:
+    """Characters pre-rendered to pixmaps for one font and colour.
+
+    Digits, the decimal point and the unit letters are all a reading is
+    made of, so after the first few updates drawing a reading is a handful
+    of pixmap blits with no text shaping at all.
+    """
+
+    def __init__(self, font, color, pixel_ratio=1.0):
+        self.font = QFont(font)
+        self.metrics = QFontMetricsF(self.font)
+        self.color = QColor(color)
+        self.pixel_ratio = pixel_ratio
+        self.height = int(self.metrics.height() + 0.999)
+        self.ascent = self.metrics.ascent()
+        self.glyphs = {}     # character -> QPixmap
+        self.advances = {}   # character -> width in pixels
+
+    def advance(self, char):
+        width = self.advances.get(char)
+        if width is None:
+            width = self.advances[char] = self.metrics.horizontalAdvance(char)
+        return width
+
+    def glyph(self, char):
+        pixmap = self.glyphs.get(char)
+        if pixmap is None:
+            ratio = self.pixel_ratio
+            width = max(int(self.advance(char) + 0.999), 1)
+            pixmap = QPixmap(int(width * ratio + 0.999), int(self.height * ratio + 0.999))
+            pixmap.setDevicePixelRatio(ratio)
+            pixmap.fill(Qt.transparent)
+            painter = QPainter(pixmap)
+            painter.setFont(self.font)
+            painter.setPen(self.color)
+            painter.drawText(QPointF(0, self.ascent), char)
+            painter.end()
+            self.glyphs[char] = pixmap
+        return pixmap
+
+    def width(self, text):
+        return sum(self.advance(char) for char in text)
+
+
+class SpeedDisplay(QWidget):
+    """One speed reading (an arrow and a value) painted from a glyph cache.
+
+    Replaces a rich-text QLabel: setting a value doesn't build or parse
+    HTML, colours and sizes don't go through style sheets, and only the
+    characters from the first one that changed onwards are repainted. A
+    value equal to the one shown costs a string comparison. Glyphs are
+    rendered for the window's screen, and re-rendered when it moves to a
+    screen with another scale.
+    """
+
+    def __init__(self, arrow, text='', parent=None):
+        super().__init__(parent)
+        self.arrow = arrow
+        self.value = text
+        self.font_size = 25
+        self.text_color = '#E0E0E0'
+        self.arrow_color = None   # None draws the arrow in the text colour
+        self.cache = None
+        self.arrow_cache = None
+        self.caches = {}          # (font size, colour, pixel ratio) -> GlyphCache
+        self.offsets = []         # x of every value character, then the end of the value
+        self.reserved_width = 0
+        self.screen_window = None  # QWindow whose screenChanged is connected
+        self.setSizePolicy(QSizePolicy.Preferred, QSizePolicy.Fixed)
+        self.rebuild()
+
+    def text(self):
+        return f'{self.arrow} {self.value}'
+
+    def set_value(self, text):
+        """Show a new value, repainting only what changed"""
+        old = self.value
+        if text == old:
+            return
+        self.value = text
+        first = 0
+        for first, (a, b) in enumerate(zip(old, text)):
+            if a != b:
+                break
+        else:
+            first = min(len(old), len(text))
+        old_end = self.offsets[-1]
+        self.layout_value()
+        if self.offsets[-1] > self.reserved_width:
+            self.reserved_width = self.offsets[-1]
+            self.updateGeometry()
+        left = int(self.offsets[first])
+        right = int(max(old_end, self.offsets[-1]) + 1.999)
+        self.update(QRect(left, 0, right - left, self.height()))
+
+    def set_font_size(self, size):
+        if size != self.font_size:
+            self.font_size = size
+            self.rebuild()
+
+    def set_text_color(self, color):
+        if color != self.text_color:
+            self.text_color = color
+            self.rebuild()
+
+    def set_arrow_color(self, color):
+        if color != self.arrow_color:
+            self.arrow_color = color
+            self.rebuild()
+
+    def rebuild(self):
+        """Switch to the glyph caches for the current font size and colours"""
+        self.cache = self.glyph_cache(self.text_color)
+        self.arrow_cache = self.glyph_cache(self.arrow_color or self.text_color)
+        self.layout_value()
+        self.reserved_width = max(self.offsets[-1], self.offsets[0] + self.cache.width(RESERVED_TEXT))
+        self.updateGeometry()
+        self.update()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        # The native window only exists once shown, and can be recreated
+        window = self.window().windowHandle()
+        if window is not None and window is not self.screen_window:
+            window.screenChanged.connect(self.screen_changed)
+            self.screen_window = window
+        self.screen_changed()
+
+    def screen_changed(self, screen=None):
+        """Re-render the glyphs if the pixel ratio they were made for no longer applies"""
+        if self.cache.pixel_ratio != self.devicePixelRatioF():
+            self.rebuild()
+
+    def glyph_cache(self, color):
+        ratio = self.devicePixelRatioF()
+        key = (self.font_size, color, ratio)
+        cache = self.caches.get(key)
+        if cache is None:
+            if len(self.caches) >= CACHED_STYLES:
+                self.caches.clear()
+            font = QFont(self.font())
+            font.setPixelSize(max(self.font_size, 1))
+            cache = self.caches[key] = GlyphCache(font, color, ratio)
+        return cache
+
+    def layout_value(self):
+        cache = self.cache
+        x = self.arrow_cache.advance(self.arrow) + cache.advance(' ')
+        offsets = [x]
+        for char in self.value:
+            x += cache.advance(char)
+            offsets.append(x)
+        self.offsets = offsets
+
+    def sizeHint(self):
+        return QSize(int(self.reserved_width + 1.999), self.cache.height)
+
+    def minimumSizeHint(self):
+        return self.sizeHint()
+
+    def paintEvent(self, event):
+        left = event.rect().left()
+        right = event.rect().right() + 1
+        y = (self.height() - self.cache.height) / 2
+        painter = QPainter(self)
+        if left < self.offsets[0]:
+            painter.drawPixmap(QPointF(0, y), self.arrow_cache.glyph(self.arrow))
+        glyph = self.cache.glyph
+        offsets = self.offsets
+        for n, char in enumerate(self.value):
+            x = offsets[n]
+            if offsets[n + 1] < left:
+                continue
+            if x > right:
+                break
+            if char != ' ':
+                painter.drawPixmap(QPointF(x, y), glyph(char))
+        painter.end()
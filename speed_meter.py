@@ -1,43 +1,43 @@
 import sys
-import psutil
+import argparse
 import time
 import logging
-from logging.handlers import RotatingFileHandler
 import os
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QVBoxLayout, 
                             QPushButton, QDialog, QComboBox, QColorDialog, QHBoxLayout,
                             QMenu, QSizePolicy, QLayout, QSystemTrayIcon, QStyle)
 from PyQt5.QtCore import QTimer, Qt, QThread, pyqtSignal, QPoint, QSettings
 from PyQt5.QtGui import QFont, QMouseEvent
-from speed_calculator import SpeedCalculator
-import winreg
-
-# Setup logging
-def setup_logging():
-    log_dir = os.path.join(os.path.expanduser('~'), '.netspeedmeter')
-    os.makedirs(log_dir, exist_ok=True)
-    log_file = os.path.join(log_dir, 'netspeedmeter.log')
-    
-    handler = RotatingFileHandler(log_file, maxBytes=1024*1024, backupCount=5)
-    formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
-    handler.setFormatter(formatter)
-    
-    logger = logging.getLogger('NetSpeedMeter')
-    logger.setLevel(logging.INFO)
-    logger.addHandler(handler)
-    return logger
+from speed_calculator import SpeedCalculator, format_speed
+from net_sampler import InterfaceFilter, DEFAULT_EXCLUDE
+from settings_dialog import SettingsDialog
+from collector import Collector
+from history import HistoryStore
+from history_log import HistoryLog
+from counter_trace import TraceRecorder, create_replay
+from metrics_exporter import DEFAULT_HOST, MetricsExporter
+from shared_rates import SharedRatesPublisher, SharedRatesReader
+from fleet import HOST_TIMEOUT, fleet_segment_name
+from process_attribution import DEFAULT_CPU_BUDGET, ProcessAttribution
+from microburst import DEFAULT_RATE as BURST_RATE, BurstSampler
+from speed_display import SpeedDisplay
+from display_pacer import FRAME_BUDGET_MS, MAX_STALE, DisplayPacer
+from settings_store import SettingsStore
+from themes import ThemeCache, ThemedPanel
+from window_layering import WINDOW_FLAGS, WindowLayering
+from logging_setup import setup_logging
+
+try:
+    import winreg
+except ImportError:  # Autostart through the registry only exists on Windows
+    winreg = None
 
 logger = setup_logging()
 
 class DraggableWidget(QWidget):
     def __init__(self):
         super().__init__()
-        self.setWindowFlags(
-            Qt.FramelessWindowHint | 
-            Qt.WindowStaysOnTopHint | 
-            Qt.Tool |
-            Qt.SubWindow  # Add SubWindow flag
-        )
+        self.setWindowFlags(WINDOW_FLAGS)
         self.setAttribute(Qt.WA_TranslucentBackground)
         self.dragging = False  # Add dragging attribute here
 
@@ -58,11 +58,6 @@ class DraggableWidget(QWidget):
             self.dragging = False  # Reset dragging state
             self.setCursor(Qt.ArrowCursor)
             event.accept()
-            # Save position after drag is complete
-            if isinstance(self, SpeedMeter):  # Only save if it's the SpeedMeter
-                self.settings.setValue('pos_x', self.pos().x())
-                self.settings.setValue('pos_y', self.pos().y())
-                self.settings.sync()
 
     def contextMenuEvent(self, event):
         if event.reason() == event.Mouse:
@@ -95,217 +90,86 @@ class DraggableWidget(QWidget):
         # Make main widget pass through mouse events
         self.main_widget.setAttribute(Qt.WA_TransparentForMouseEvents)
 
-    def showEvent(self, event):
-        """Override show event to ensure window stays on top"""
-        super().showEvent(event)
-        self.setWindowFlags(
-            Qt.FramelessWindowHint | 
-            Qt.WindowStaysOnTopHint | 
-            Qt.Tool |
-            Qt.SubWindow  # Add SubWindow flag
-        )
-        self.show()
-        self.raise_()  # Bring window to top
-        self.activateWindow()  # Activate window
-
 class SpeedThread(QThread):
     # Change signal type to handle tuples with speed and unit
     speed_signal = pyqtSignal(tuple, tuple, float)
 
-    def __init__(self, speed_calculator):
+    def __init__(self, speed_calculator, interface_filter=None, sampler=None, scheduler=None,
+                 history=None, history_log=None, recorder=None,
+                 frame_budget_ms=FRAME_BUDGET_MS, max_stale=MAX_STALE, extra=None):
         super().__init__()
-        self.speed_calculator = speed_calculator
-        self.running = True
-        self.current_interval = 0.5  # Reduced interval for more frequent updates
-        self.last_bytes_recv = 0
-        self.last_bytes_sent = 0
-        self.last_measurement_time = time.time()
-        self.min_sleep = 0.1  # Reduced minimum sleep time
+        # All measurement work lives in the Qt-free collector; this thread
+        # only runs it and turns the readings that change the display into a queued signal
+        self.collector = Collector(speed_calculator, interface_filter, sampler, scheduler,
+                                   history, history_log, recorder)
+        self.pacer = DisplayPacer(self.speed_signal.emit, frame_budget_ms, max_stale, extra)
+        self.collector.add_listener(self.pacer)
+
+    @property
+    def recorder(self):
+        return self.collector.recorder
+
+    @recorder.setter
+    def recorder(self, recorder):
+        self.collector.recorder = recorder
 
     def run(self):
-        while self.running:
-            try:
-                current_time = time.time()
-                counters = psutil.net_io_counters()
-                
-                # Calculate byte differences
-                bytes_recv_diff = counters.bytes_recv - self.last_bytes_recv
-                bytes_sent_diff = counters.bytes_sent - self.last_bytes_sent
-                interval = current_time - self.last_measurement_time
-                
-                # Only update if there's actual data
-                if bytes_recv_diff >= 0 and bytes_sent_diff >= 0 and interval > 0:
-                    # Update stored values before calculating speed
-                    self.last_bytes_recv = counters.bytes_recv
-                    self.last_bytes_sent = counters.bytes_sent
-                    self.last_measurement_time = current_time
-                    
-                    # Calculate speeds
-                    download = self.speed_calculator.calculate_speed(bytes_recv_diff, interval)
-                    upload = self.speed_calculator.calculate_speed(bytes_sent_diff, interval)
-                    
-                    # Emit signal with speed data
-                    self.speed_signal.emit(download, upload, interval)
-                
-                time.sleep(self.min_sleep)
-                
-            except Exception as e:
-                logger.error(f"Error in speed measurement: {str(e)}")
-                time.sleep(1)
+        self.collector.run()
+
+    def set_visible(self, visible):
+        self.collector.set_visible(visible)
+        self.pacer.set_visible(visible)
 
     def stop(self):
-        self.running = False
-
-class SettingsDialog(QDialog):
-    def __init__(self, parent=None):
-        super().__init__(parent, Qt.FramelessWindowHint)
-        self.setWindowTitle('Settings')
-        self.setFixedWidth(300)
-        self.setStyleSheet("""
-            QDialog {
-                background-color: white;
-                border: 1px solid #cccccc;
-                border-radius: 10px;
-            }
-            QLabel {
-                font-size: 14px;
-                color: #333333;
-            }
-            QComboBox {
-                padding: 5px;
-                border: 1px solid #cccccc;
-                border-radius: 5px;
-                background-color: white;
-                min-height: 25px;
-            }
-            QPushButton {
-                padding: 8px;
-                background-color: #f0f0f0;
-                border: none;
-                border-radius: 5px;
-            }
-            QPushButton:hover {
-                background-color: #e0e0e0;
-            }
-        """)
-        
-        # Main layout
-        layout = QVBoxLayout(self)
-        layout.setContentsMargins(20, 20, 20, 20)
-        layout.setSpacing(10)
-
-        # Header with close button
-        header_layout = QHBoxLayout()
-        title_label = QLabel("Settings")
-        title_label.setStyleSheet("font-size: 16px; font-weight: bold;")
-        close_button = QPushButton("×")
-        close_button.setFixedSize(30, 30)
-        close_button.setStyleSheet("""
-            QPushButton {
-                font-size: 20px;
-                background-color: transparent;
-            }
-            QPushButton:hover {
-                background-color: #ffebeb;
-                color: #ff4444;
-            }
-        """)
-        close_button.clicked.connect(self.close)
-        header_layout.addWidget(title_label)
-        header_layout.addWidget(close_button)
-        layout.addLayout(header_layout)
-
-        # Text size settings
-        self.text_size_label = QLabel('Text Size:')
-        layout.addWidget(self.text_size_label)
-        
-        self.text_size_input = QComboBox()
-        self.text_size_input.addItems(['Small', 'Medium', 'Large'])
-        self.text_size_input.setCurrentText('Medium')
-        layout.addWidget(self.text_size_input)
-
-        # Unit settings
-        self.unit_label = QLabel('Unit of Measurement:')
-        layout.addWidget(self.unit_label)
-        
-        # Update unit options to only show byte-based units
-        self.unit_input = QComboBox()
-        self.unit_input.addItems(['MB/s', 'KB/s'])
-        layout.addWidget(self.unit_input)
-
-        # Background color settings
-        self.bg_color_button = QPushButton('Choose Background Color')
-        layout.addWidget(self.bg_color_button)
-        self.bg_color_button.clicked.connect(self.choose_background_color)
-
-        # Add some spacing
-        layout.addSpacing(10)
-
-        # Apply button
-        self.apply_button = QPushButton('Apply')
-        self.apply_button.setStyleSheet("""
-            QPushButton {
-                background-color: #007bff;
-                color: white;
-                padding: 10px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #0056b3;
-            }
-        """)
-        self.apply_button.clicked.connect(self.apply_settings)
-        layout.addWidget(self.apply_button)
+        self.collector.stop()
 
-        # Make dialog draggable
-        self.dragging = False
-        self.offset = QPoint()
+class BurstThread(QThread):
+    # One summary per display frame, however fast the sampler runs
+    frame_signal = pyqtSignal(object)
 
-    def mousePressEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            self.dragging = True
-            self.offset = event.pos()
+    def __init__(self, interface_filter, rate=BURST_RATE):
+        super().__init__()
+        self.sampler = BurstSampler(interface_filter, rate)
+        self.sampler.add_listener(self.frame_signal.emit)
 
-    def mouseMoveEvent(self, event):
-        if self.dragging:
-            self.move(self.mapToParent(event.pos() - self.offset))
+    def run(self):
+        self.sampler.run()
 
-    def mouseReleaseEvent(self, event):
-        if event.button() == Qt.LeftButton:
-            self.dragging = False
-
-    def choose_background_color(self):
-        color = QColorDialog.getColor()
-        if color.isValid():
-            self.parent().setStyleSheet(f"""
-                QWidget#mainWidget {{
-                    background-color: {color.name()};
-                    border-radius: 10px;
-                }}
-            """)
+    def set_visible(self, visible):
+        self.sampler.set_paused(not visible)
 
-    def apply_settings(self):
-        text_size = {'Small': 25, 'Medium': 30, 'Large': 40}[self.text_size_input.currentText()]
-        unit = self.unit_input.currentText()
-        
-        self.parent().set_text_size(text_size)
-        self.parent().speed_calculator.set_unit(unit)
-        self.parent().update_unit_labels()
-        self.close()
+    def stop(self):
+        self.sampler.stop()
 
 class SpeedMeter(DraggableWidget):
-    def __init__(self):
+    def __init__(self, replay_path=None, replay_speed=1.0, metrics_port=None, shared_memory=None,
+                 fleet_view=None, burst_mode=None):
         try:
             super().__init__()
+            self.replay_path = replay_path
+            self.replay_speed = replay_speed
+            self.metrics_port = metrics_port
+            self.metrics_exporter = None
+            self.shared_memory = shared_memory
+            self.rates_publisher = None
+            self.fleet_reader = None
+            self.attribution = None
+            self.burst_thread = None
             self.speed_calculator = SpeedCalculator()
+            self.interface_filter = InterfaceFilter()
+            self.history = HistoryStore()
+            # A replayed trace must not end up in the real history
+            self.history_log = self.open_history_log() if replay_path is None else None
             self.speed_thread = None
             self.hover_opacity = 1.0
             self.normal_opacity = 0.8
             self.opacity = self.normal_opacity
             self.current_theme = 'dark'  # Changed default theme to dark
+            self.theme_cache = ThemeCache()
+            self.theme = None
+            self.custom_colors = None  # {'bg': ..., 'text': ...} of the custom theme
             self.current_font_size = 30
-            self.last_update = time.time()
-            self.update_threshold = 0.1  # Minimum time between updates in seconds
+            self.last_speed_data = ((0, 'KB/s'), (0, 'KB/s'), 0)
             self.unit_suffix = '/s'  # This won't be used anymore as unit comes from speed_calculator
             self.bytes_in_kb = 1024
             self.bytes_in_mb = 1024 * 1024
@@ -313,12 +177,27 @@ class SpeedMeter(DraggableWidget):
             self.download_color = '#ff4444'  # Red for download
             self.upload_color = '#4CAF50'    # Green for upload
             self.show_colored_arrows = True
-            self.settings = QSettings('NetSpeedMeter', 'Settings')
+            self.settings = SettingsStore(QSettings('NetSpeedMeter', 'Settings'), self)
             self.allow_close = False  # Add flag to control actual closing
+            # Stays on top by reacting to stacking changes, not by resetting flags on a timer
+            self.layering = WindowLayering(self)
             
-            # Initialize only speed labels
-            self.download_label = QLabel('↓ 0 ' + self.speed_calculator.unit)
-            self.upload_label = QLabel('↑ 0 ' + self.speed_calculator.unit)
+            # Initialize only speed labels, painted rather than rich-text QLabels
+            self.download_label = SpeedDisplay('↓', '0 ' + self.speed_calculator.unit)
+            self.upload_label = SpeedDisplay('↑', '0 ' + self.speed_calculator.unit)
+            self.small_label_style = None
+            # Totals from the fleet aggregator, when the fleet view is on
+            self.fleet_label = QLabel('')
+            self.fleet_label.hide()
+            self.fleet_timer = QTimer(self)
+            self.fleet_timer.timeout.connect(self.update_fleet_view)
+            # Peak rate over the last second, when microburst mode is on
+            self.burst_label = QLabel('')
+            self.burst_label.hide()
+            # Packets per second and average size, when packet stats are on
+            self.packet_label = QLabel('')
+            self.packet_label.hide()
+            self.show_packet_stats = False
             
             self.initUI()
             self.load_position()  # Load position before showing
@@ -330,14 +209,20 @@ class SpeedMeter(DraggableWidget):
             # Load position before showing
             self.load_position()
 
-            # Ensure window stays on top even after losing focus
-            self.set_always_on_top()
             self.show()
-            self.raise_()
-            self.activateWindow()
 
             # Add recovery mechanism for settings
             self.load_settings()
+            if fleet_view is None:
+                fleet_view = self.settings.get_bool('fleet_view', False)
+            self.set_fleet_view(fleet_view)
+            if burst_mode is None:
+                burst_mode = self.settings.get_bool('burst_mode', False)
+            # Replays have no live counters to sample
+            self.set_burst_mode(burst_mode and replay_path is None)
+            self.set_packet_stats(self.settings.get_bool('packet_stats', False))
+            if sys.platform.startswith('linux'):
+                self.set_process_attribution(self.settings.get_bool('process_attribution', False))
             
             # Add startup management
             self.startup_registry_path = r"Software\Microsoft\Windows\CurrentVersion\Run"
@@ -348,28 +233,10 @@ class SpeedMeter(DraggableWidget):
                 self.toggle_startup(True)  # Enable autostart
             self.load_startup_setting()
             
-            # Add timer to periodically check and ensure window stays on top
-            self.always_on_top_timer = QTimer(self)
-            self.always_on_top_timer.timeout.connect(self.ensure_on_top)
-            self.always_on_top_timer.start(1000)  # Check every second
-            
         except Exception as e:
             logger.error(f"Error initializing SpeedMeter: {str(e)}")
             raise
 
-    def ensure_on_top(self):
-        """Periodically called to ensure window stays on top"""
-        if self.isVisible():
-            self.setWindowFlags(
-                Qt.FramelessWindowHint | 
-                Qt.WindowStaysOnTopHint | 
-                Qt.Tool |
-                Qt.SubWindow
-            )
-            self.show()
-            self.raise_()
-            self.activateWindow()
-
     def initUI(self):
         self.setWindowTitle('Internet Speed Meter')
         self.setSizePolicy(QSizePolicy.Minimum, QSizePolicy.Minimum)
@@ -381,7 +248,7 @@ class SpeedMeter(DraggableWidget):
         main_layout.setSizeConstraint(QLayout.SetMinAndMaxSize)
         
         # Create and setup main widget with background
-        self.main_widget = QWidget()
+        self.main_widget = ThemedPanel(opacity=self.opacity)
         self.main_widget.setObjectName("mainWidget")
         self.setupMainWidget()  # Add this line to make widget pass through events
         widget_layout = QVBoxLayout(self.main_widget)
@@ -391,6 +258,9 @@ class SpeedMeter(DraggableWidget):
         # Add only speed labels
         widget_layout.addWidget(self.download_label)
         widget_layout.addWidget(self.upload_label)
+        widget_layout.addWidget(self.packet_label)
+        widget_layout.addWidget(self.burst_label)
+        widget_layout.addWidget(self.fleet_label)
 
         # Add main widget to main layout
         main_layout.addWidget(self.main_widget)
@@ -398,116 +268,383 @@ class SpeedMeter(DraggableWidget):
         # Apply theme and styles
         self.apply_theme(self.current_theme)
         self.set_text_size(self.current_font_size)
+        self.apply_arrow_colors()
 
     def apply_theme(self, theme_name, custom_colors=None):
+        """Switch to a compiled theme; custom colours are compiled on first use and cached"""
+        if theme_name == 'custom':
+            if custom_colors:
+                self.custom_colors = dict(custom_colors)
+            custom_colors = self.custom_colors
+        theme = self.theme_cache.get(theme_name, custom_colors, self.text_color)
+        if theme is None:
+            return  # Custom theme picked before any colour was chosen
         self.current_theme = theme_name
-        opacity = int(self.opacity * 255)
-        
-        if theme_name == 'light':
-            bg_color = f'rgba(240, 240, 240, {opacity})'
-            text_color = '#333333'
-        elif theme_name == 'dark':
-            bg_color = f'rgba(0, 0, 0, {opacity})'
-            text_color = '#E0E0E0'
-        elif theme_name == 'custom' and custom_colors:
-            # Fix the rgba syntax for custom colors
-            r, g, b = int(custom_colors["bg"][1:3], 16), int(custom_colors["bg"][3:5], 16), int(custom_colors["bg"][5:7], 16)
-            bg_color = f'rgba({r}, {g}, {b}, {opacity})'
-            text_color = custom_colors.get("text", self.text_color)  # Use custom text color if provided
-        
-        self.main_widget.setStyleSheet(f"""
-            QWidget#mainWidget {{
-                background-color: {bg_color};
-                border-radius: 10px;
-                border: 1px solid rgba(255, 255, 255, 0.1);
-            }}
-        """)
-        
-        self.set_text_color(text_color)
+        self.theme = theme
+        self.main_widget.set_theme(theme)
+        self.set_text_color(theme.text)
 
     def set_text_color(self, color):
         self.text_color = color
-        style = f'font-size: {self.current_font_size-5}px; color: {self.text_color};'
-        self.download_label.setStyleSheet(style)
-        self.upload_label.setStyleSheet(style)
+        for label in (self.download_label, self.upload_label):
+            label.set_font_size(self.current_font_size - 5)
+            label.set_text_color(self.text_color)
+        self.set_small_label_style(self.text_color)
+
+    def set_small_label_style(self, color):
+        """Colour and size the secondary QLabels through their palette and font, not style sheets"""
+        style = (self.fleet_font_size(), color)
+        if style != self.small_label_style:
+            self.small_label_style = style
+            palette = self.theme_cache.text_palette(color)
+            font = QFont(self.fleet_label.font())
+            font.setPixelSize(style[0])
+            for label in (self.packet_label, self.burst_label, self.fleet_label):
+                label.setPalette(palette)
+                label.setFont(font)
+
+    def apply_arrow_colors(self):
+        colored = self.show_colored_arrows
+        self.download_label.set_arrow_color(self.download_color if colored else None)
+        self.upload_label.set_arrow_color(self.upload_color if colored else None)
 
     def set_opacity(self, value):
-        self.opacity = value / 100.0
-        self.apply_theme(self.current_theme)
+        """Background opacity while the pointer is elsewhere, in percent"""
+        self.opacity = self.normal_opacity = value / 100.0
+        self.main_widget.set_opacity(self.opacity)
 
     def set_text_size(self, size):
         self.current_font_size = size
-        style = f'font-size: {size-5}px; color: #008000;'
-        self.download_label.setStyleSheet(style)
-        self.upload_label.setStyleSheet(style)
+        for label in (self.download_label, self.upload_label):
+            label.set_font_size(size - 5)
+        # Sizes change, colours stay with the theme
+        self.set_small_label_style(self.text_color)
+
+    def fleet_font_size(self):
+        return max(self.current_font_size // 2, 9)
 
     def update_unit_labels(self):
-        try:
-            current_download = float(self.download_label.text().split()[1])
-            current_upload = float(self.upload_label.text().split()[1])
-        except (ValueError, IndexError):
-            return
-        
-        self.download_label.setText(f'↓ {self.format_speed(current_download)}')
-        self.upload_label.setText(f'↑ {self.format_speed(current_upload)}')
+        """Re-render the labels from the last received speeds"""
+        self.update_speed_labels(*self.last_speed_data)
 
     def start_measuring(self):
         if self.speed_thread is None or not self.speed_thread.isRunning():
-            self.speed_thread = SpeedThread(self.speed_calculator)
+            sampler = scheduler = None
+            if self.replay_path is not None:
+                sampler, scheduler = create_replay(self.replay_path, self.replay_speed)
+            self.speed_thread = SpeedThread(self.speed_calculator, self.interface_filter,
+                                            sampler=sampler, scheduler=scheduler,
+                                            history=self.history, history_log=self.history_log,
+                                            frame_budget_ms=self.settings.get_int('frame_budget_ms', FRAME_BUDGET_MS),
+                                            max_stale=self.settings.get_float('max_stale', MAX_STALE),
+                                            extra=self.packet_reading)
+            self.speed_thread.set_visible(self.isVisible())
             self.speed_thread.speed_signal.connect(self.update_speed_labels)
+            if self.start_metrics_exporter():
+                self.speed_thread.collector.add_tick_listener(self.metrics_exporter.update)
+            if self.start_rates_publisher():
+                self.speed_thread.collector.add_tick_listener(self.rates_publisher.publish)
             self.speed_thread.start()
 
+    def start_metrics_exporter(self):
+        """Serve metrics for scraping when a port is configured (0 disables it)"""
+        if self.metrics_exporter is None:
+            port = self.metrics_port
+            if port is None:
+                port = self.settings.get_int('metrics_port', 0)
+            if not port:
+                return False
+            host = self.settings.get_str('metrics_host', DEFAULT_HOST)
+            exporter = MetricsExporter(self.speed_calculator, host, port)
+            if not exporter.start():
+                return False
+            self.metrics_exporter = exporter
+        return True
+
+    def stop_metrics_exporter(self):
+        if self.metrics_exporter is not None:
+            self.metrics_exporter.stop()
+            self.metrics_exporter = None
+
+    def start_rates_publisher(self):
+        """Publish live rates in shared memory for other local processes when enabled"""
+        if self.rates_publisher is None:
+            enabled = self.shared_memory
+            if enabled is None:
+                enabled = self.settings.get_bool('shared_memory', False)
+            if not enabled:
+                return False
+            try:
+                self.rates_publisher = SharedRatesPublisher(self.speed_calculator)
+            except Exception as e:
+                logger.error(f"Error creating shared memory segment: {str(e)}")
+                return False
+        return True
+
+    def stop_rates_publisher(self):
+        if self.rates_publisher is not None:
+            self.rates_publisher.close()
+            self.rates_publisher = None
+
+    def toggle_recording(self):
+        """Start or stop dumping the raw counter stream to a trace file"""
+        if self.speed_thread is None:
+            return
+        try:
+            recorder = self.speed_thread.recorder
+            if recorder is None:
+                self.speed_thread.recorder = TraceRecorder()
+                self.record_action.setText('Stop Recording Trace')
+            else:
+                self.speed_thread.recorder = None
+                recorder.close()
+                self.record_action.setText('Record Counter Trace')
+                self.tray_icon.showMessage('Internet Speed Meter',
+                                           f'Trace saved to {recorder.path}')
+        except Exception as e:
+            logger.error(f"Error toggling trace recording: {str(e)}")
+
+    def open_history_log(self):
+        try:
+            return HistoryLog()
+        except Exception as e:
+            logger.error(f"Error opening history log, history won't be saved: {str(e)}")
+            return None
+
     def format_speed(self, speed, unit):
         """Format speed with proper precision"""
-        if speed < 0.1:
-            return f'0.00 {unit}'
-        elif speed < 10:
-            return f'{speed:.2f} {unit}'
-        elif speed < 100:
-            return f'{speed:.1f} {unit}'
-        else:
-            return f'{speed:.0f} {unit}'
+        return format_speed(speed, unit)
 
     def update_speed_labels(self, download_data, upload_data, elapsed_time):
+        # Only readings that change the display arrive here, paced by the speed thread
         try:
-            current_time = time.time()
-            if current_time - self.last_update < self.update_threshold:
-                return
-                
-            self.last_update = current_time
-            
+            self.last_speed_data = (download_data, upload_data, elapsed_time)
             download_speed, download_unit = download_data
             upload_speed, upload_unit = upload_data
             
-            download_text = self.format_speed_label((download_speed, download_unit), 'down')
-            upload_text = self.format_speed_label((upload_speed, upload_unit), 'up')
-            
-            self.download_label.setText(download_text)
-            self.upload_label.setText(upload_text)
+            # Arrows and their colours are drawn by the display widgets
+            self.download_label.set_value(self.format_speed(download_speed, download_unit))
+            self.upload_label.set_value(self.format_speed(upload_speed, upload_unit))
+            if self.show_packet_stats:
+                self.update_packet_label()
         except Exception as e:
             logger.error(f"Error updating speed labels: {str(e)}")
-            self.download_label.setText("↓ Error")
-            self.upload_label.setText("↑ Error")
-
-    def format_speed_label(self, speed_data, direction='down'):
-        """Format speed label with colored or plain arrows"""
-        speed, unit = speed_data
-        speed_text = self.format_speed(speed, unit)
-        arrow = '↓' if direction == 'down' else '↑'
-        
-        if self.show_colored_arrows:
-            color = self.download_color if direction == 'down' else self.upload_color
-            return f'<span style="color: {color}">{arrow}</span> {speed_text}'
-        return f'{arrow} {speed_text}'
+            self.download_label.set_value("Error")
+            self.upload_label.set_value("Error")
+
+    def format_packets(self, rate):
+        """Compact packets (or errors, drops) per second"""
+        if rate >= 1e6:
+            return f'{rate / 1e6:.1f}M'
+        if rate >= 1e4:
+            return f'{rate / 1e3:.0f}k'
+        if rate >= 1e3:
+            return f'{rate / 1e3:.1f}k'
+        return f'{rate:.0f}'
+
+    def packet_reading(self):
+        """The packet line as shown, or None when it is off; called on the speed thread"""
+        if not self.show_packet_stats:
+            return None
+        return self.packet_text(self.speed_calculator.get_packet_rates())
+
+    def packet_text(self, packets):
+        text = (f'↓ {self.format_packets(packets.packets_recv)} pkt/s {packets.size_recv:.0f} B  '
+                f'↑ {self.format_packets(packets.packets_sent)} pkt/s {packets.size_sent:.0f} B')
+        errors = packets.errors_in + packets.errors_out
+        drops = packets.drops_in + packets.drops_out
+        if errors or drops:
+            text += f'  ⚠ {self.format_packets(errors)} err/s {self.format_packets(drops)} drop/s'
+        return text
+
+    def update_packet_label(self):
+        packets = self.speed_calculator.get_packet_rates()
+        self.packet_label.setText(self.packet_text(packets))
+        self.packet_label.setToolTip(
+            f'Average packet size ↓ {packets.size_recv:.0f} B  ↑ {packets.size_sent:.0f} B\n'
+            f'Errors ↓ {packets.errors_in:.1f}/s  ↑ {packets.errors_out:.1f}/s\n'
+            f'Drops ↓ {packets.drops_in:.1f}/s  ↑ {packets.drops_out:.1f}/s')
+
+    def set_packet_stats(self, enabled):
+        """Show packets per second, average packet size and any errors or drops"""
+        self.show_packet_stats = enabled
+        if hasattr(self, 'packet_action'):
+            self.packet_action.setChecked(enabled)
+        if enabled:
+            self.update_packet_label()
+            self.packet_label.show()
+        else:
+            self.packet_label.hide()
+        self.adjustSize()
+
+    def toggle_packet_stats(self, enabled):
+        self.set_packet_stats(enabled)
+        self.settings.set('packet_stats', enabled)
+
+    def quantile_tooltip(self):
+        """Download/upload percentiles over the last minute, hour and day"""
+        try:
+            def speeds(quantiles):
+                if quantiles is None:
+                    return 'no data'
+                return ' / '.join(self.format_speed(*self.speed_calculator.convert_rate(rate))
+                                  for rate in quantiles)
+
+            lines = ['p50 / p95 / p99']
+            for window, (download, upload) in self.speed_calculator.get_quantiles().items():
+                lines.append(f'{window}  ↓ {speeds(download)}  ↑ {speeds(upload)}')
+            interfaces = self.speed_calculator.quantiles.interfaces()
+            if len(interfaces) > 1:
+                lines.append('')
+                for name in interfaces[:8]:
+                    download, upload = self.speed_calculator.get_quantiles(name)['1 min']
+                    lines.append(f'{name} (1 min)  ↓ {speeds(download)}  ↑ {speeds(upload)}')
+            return '\n'.join(lines)
+        except Exception as e:
+            logger.error(f"Error building quantile tooltip: {str(e)}")
+            return ''
 
     def toggle_colored_arrows(self, enabled):
         """Toggle colored arrows on/off"""
         self.show_colored_arrows = enabled
-        self.update_speed_labels(
-            float(self.download_label.text().split()[1]), 
-            float(self.upload_label.text().split()[1]), 
-            0
-        )
+        self.apply_arrow_colors()
+        self.update_unit_labels()
+
+    def set_interface_filter(self, include=None, exclude=DEFAULT_EXCLUDE, physical_only=False):
+        """Choose which interfaces contribute to the displayed speeds"""
+        self.interface_filter.configure(include, exclude, physical_only)
+
+    def set_fleet_view(self, enabled):
+        """Show the fleet totals published by a local aggregator (fleet.py aggregate)"""
+        self.fleet_view = enabled
+        if hasattr(self, 'fleet_action'):
+            self.fleet_action.setChecked(enabled)
+        if enabled:
+            self.fleet_label.setText('Fleet: waiting for aggregator')
+            self.fleet_label.show()
+            self.update_fleet_view()
+            self.fleet_timer.start(1000)
+        else:
+            self.fleet_timer.stop()
+            self.fleet_label.hide()
+            self.close_fleet_reader()
+        self.adjustSize()
+
+    def toggle_fleet_view(self, enabled):
+        self.set_fleet_view(enabled)
+        self.settings.set('fleet_view', enabled)
+
+    def close_fleet_reader(self):
+        if self.fleet_reader is not None:
+            self.fleet_reader.close()
+            self.fleet_reader = None
+
+    def update_fleet_view(self):
+        try:
+            if self.fleet_reader is None:
+                try:
+                    self.fleet_reader = SharedRatesReader(fleet_segment_name())
+                except (FileNotFoundError, ValueError):
+                    return
+            snapshot = self.fleet_reader.snapshot()
+            if time.time() - snapshot.timestamp > HOST_TIMEOUT:
+                # The aggregator stopped; a new one creates a fresh segment
+                self.close_fleet_reader()
+                self.fleet_label.setText('Fleet: waiting for aggregator')
+                self.fleet_label.setToolTip('')
+                return
+            download = self.format_speed(*self.speed_calculator.convert_rate(snapshot.download))
+            upload = self.format_speed(*self.speed_calculator.convert_rate(snapshot.upload))
+            self.fleet_label.setText(f'{snapshot.total} hosts  ↓ {download}  ↑ {upload}')
+            busiest = [f'{host.name}: ↓ {self.format_speed(*self.speed_calculator.convert_rate(host.recv_rate))}'
+                       f'  ↑ {self.format_speed(*self.speed_calculator.convert_rate(host.sent_rate))}'
+                       for host in snapshot.interfaces[:10]]
+            self.fleet_label.setToolTip('\n'.join(busiest))
+        except Exception as e:
+            logger.error(f"Error updating fleet view: {str(e)}")
+            self.close_fleet_reader()
+
+    def set_burst_mode(self, enabled):
+        """Sample at up to 1 kHz and show the peak rate of the last second"""
+        self.burst_mode = enabled
+        if hasattr(self, 'burst_action'):
+            self.burst_action.setChecked(enabled)
+        if enabled and self.burst_thread is None:
+            try:
+                rate = self.settings.get_int('burst_rate', BURST_RATE)
+                self.burst_thread = BurstThread(self.interface_filter, rate)
+                self.burst_thread.frame_signal.connect(self.update_burst_label)
+                self.burst_thread.set_visible(self.isVisible())
+                self.burst_thread.start()
+                self.burst_label.setText('Peak: measuring')
+                self.burst_label.show()
+            except Exception as e:
+                logger.error(f"Error starting microburst sampling: {str(e)}")
+                self.burst_thread = None
+        elif not enabled and self.burst_thread is not None:
+            self.stop_burst_thread()
+            self.burst_label.hide()
+        self.adjustSize()
+
+    def toggle_burst_mode(self, enabled):
+        self.set_burst_mode(enabled)
+        self.settings.set('burst_mode', enabled)
+
+    def stop_burst_thread(self):
+        if self.burst_thread is not None:
+            self.burst_thread.stop()
+            self.burst_thread.wait()
+            self.burst_thread = None
+
+    def update_burst_label(self, frame):
+        try:
+            def speed(rate):
+                return self.format_speed(*self.speed_calculator.convert_rate(rate))
+
+            self.burst_label.setText(f'Peak 1s  ↓ {speed(frame.recv_peak_1s)}  ↑ {speed(frame.sent_peak_1s)}')
+            self.burst_label.setToolTip(
+                f'Last {frame.samples} samples\n'
+                f'↓ peak {speed(frame.recv_peak)}  p99 {speed(frame.recv_p99)}  mean {speed(frame.recv_mean)}\n'
+                f'↑ peak {speed(frame.sent_peak)}  p99 {speed(frame.sent_p99)}  mean {speed(frame.sent_mean)}')
+        except Exception as e:
+            logger.error(f"Error updating burst label: {str(e)}")
+
+    def set_process_attribution(self, enabled):
+        """Start or stop attributing TCP traffic to processes (Linux)"""
+        if enabled and self.attribution is None:
+            try:
+                budget = self.settings.get_float('attribution_cpu_budget', DEFAULT_CPU_BUDGET)
+                self.attribution = ProcessAttribution(cpu_budget=budget)
+                self.attribution.start()
+            except Exception as e:
+                logger.error(f"Error starting process attribution: {str(e)}")
+                self.attribution = None
+        elif not enabled and self.attribution is not None:
+            self.attribution.stop()
+            self.attribution = None
+
+    def toggle_process_attribution(self, enabled):
+        self.set_process_attribution(enabled)
+        self.settings.set('process_attribution', enabled)
+
+    def update_talkers_menu(self):
+        """Refill the top talkers menu each time it opens"""
+        menu = self.talkers_menu
+        menu.clear()
+        toggle = menu.addAction('Attribute Traffic to Processes')
+        toggle.setCheckable(True)
+        toggle.setChecked(self.attribution is not None)
+        toggle.triggered.connect(self.toggle_process_attribution)
+        if self.attribution is None:
+            return
+        menu.addSeparator()
+        talkers = self.attribution.top_talkers
+        if not talkers:
+            menu.addAction('No TCP traffic yet').setEnabled(False)
+        for talker in talkers:
+            download = self.format_speed(*self.speed_calculator.convert_rate(talker.recv_rate))
+            upload = self.format_speed(*self.speed_calculator.convert_rate(talker.sent_rate))
+            menu.addAction(f'{talker.name} ({talker.pid})  ↓ {download}  ↑ {upload}').setEnabled(False)
 
     def open_settings(self):
         dialog = SettingsDialog(self)
@@ -515,39 +652,54 @@ class SpeedMeter(DraggableWidget):
 
     def closeEvent(self, event):
         try:
-            # Stop the always-on-top timer before closing
-            self.always_on_top_timer.stop()
             # Save settings before closing
-            self.settings.setValue('font_size', self.current_font_size)
-            self.settings.setValue('opacity', self.opacity)
-            self.settings.setValue('theme', self.current_theme)
-            self.settings.setValue('colored_arrows', self.show_colored_arrows)
-            self.settings.sync()
+            self.settings.set('font_size', self.current_font_size)
+            self.settings.set('opacity', self.normal_opacity)
+            self.settings.set('theme', self.current_theme)
+            if self.custom_colors:
+                self.settings.set('custom_bg', self.custom_colors['bg'])
+                self.settings.set('custom_text', self.custom_colors.get('text', self.text_color))
+            self.settings.set('colored_arrows', self.show_colored_arrows)
+            self.settings.set('smoothing', self.speed_calculator.smoothing)
+            self.settings.set('smoothing_window', self.speed_calculator.download_stats.window)
+            self.settings.set('smoothing_half_life', self.speed_calculator.download_stats.half_life)
+            self.settings.set('interface_include', list(self.interface_filter.include))
+            self.settings.set('interface_exclude', list(self.interface_filter.exclude))
+            self.settings.set('physical_only', self.interface_filter.physical_only)
+            self.settings.flush()
             
             if self.allow_close:  # Fixed syntax error here
                 # Stop thread and remove tray icon before closing
                 if self.speed_thread is not None:
                     self.speed_thread.stop()
                     self.speed_thread.wait()
+                self.stop_metrics_exporter()
+                self.stop_rates_publisher()
+                self.close_fleet_reader()
+                self.set_process_attribution(False)
+                self.stop_burst_thread()
+                self.layering.stop()
                 if hasattr(self, 'tray_icon'):
                     self.tray_icon.hide()
                 event.accept()
             else:
-                # Just minimize to tray and ensure it stays on top when shown again
+                # Just minimize to tray; showing it again puts it back on top
                 self.hide()
-                self.set_always_on_top()
                 event.ignore()
         except Exception as e:
             logger.error(f"Error during application close: {str(e)}")
             event.accept()
 
     def enterEvent(self, event):
+        # Hover fades the background instead of switching style sheets
         self.opacity = self.hover_opacity
-        self.apply_theme(self.current_theme)
+        self.main_widget.fade_to(self.opacity)
+        # Worked out on hover only; the tooltip shows a moment later
+        self.setToolTip(self.quantile_tooltip())
 
     def leaveEvent(self, event):
         self.opacity = self.normal_opacity
-        self.apply_theme(self.current_theme)
+        self.main_widget.fade_to(self.opacity)
 
     def setup_tray(self):
         """Setup system tray icon and menu"""
@@ -577,6 +729,21 @@ class SpeedMeter(DraggableWidget):
         show_action.triggered.connect(self.show_and_raise)  # Use new method
         settings_action = self.tray_menu.addAction('Settings')
         settings_action.triggered.connect(self.open_settings)
+        self.record_action = self.tray_menu.addAction('Record Counter Trace')
+        self.record_action.triggered.connect(self.toggle_recording)
+        self.fleet_action = self.tray_menu.addAction('Fleet View')
+        self.fleet_action.setCheckable(True)
+        self.fleet_action.triggered.connect(self.toggle_fleet_view)
+        self.burst_action = self.tray_menu.addAction('Microburst Mode')
+        self.burst_action.setCheckable(True)
+        self.burst_action.triggered.connect(self.toggle_burst_mode)
+        self.packet_action = self.tray_menu.addAction('Packet Stats')
+        self.packet_action.setCheckable(True)
+        self.packet_action.setChecked(self.show_packet_stats)
+        self.packet_action.triggered.connect(self.toggle_packet_stats)
+        if sys.platform.startswith('linux'):
+            self.talkers_menu = self.tray_menu.addMenu('Top Talkers')
+            self.talkers_menu.aboutToShow.connect(self.update_talkers_menu)
         self.tray_menu.addSeparator()
         quit_action = self.tray_menu.addAction('Quit')
         quit_action.triggered.connect(self.quit_application)
@@ -590,9 +757,7 @@ class SpeedMeter(DraggableWidget):
         # Changed to handle single click and double click
         if reason in (QSystemTrayIcon.Trigger, QSystemTrayIcon.DoubleClick):
             if not self.isVisible():
-                self.show()
-                self.raise_()
-                self.activateWindow()
+                self.show_and_raise()
             else:
                 self.hide()
 
@@ -600,12 +765,18 @@ class SpeedMeter(DraggableWidget):
         """Properly quit the application"""
         try:
             # Save settings before quitting
-            self.settings.sync()
+            self.settings.flush()
             
             # Stop the speed measurement thread
             if self.speed_thread is not None:
-                self.speed_thread.running = False
+                self.speed_thread.stop()
                 self.speed_thread.wait()
+            self.stop_metrics_exporter()
+            self.stop_rates_publisher()
+            self.close_fleet_reader()
+            self.set_process_attribution(False)
+            self.stop_burst_thread()
+            self.layering.stop()
             
             # Remove tray icon before quitting
             if hasattr(self, 'tray_icon'):
@@ -633,8 +804,8 @@ class SpeedMeter(DraggableWidget):
 
     def load_position(self):
         """Load saved window position"""
-        pos_x = self.settings.value('pos_x', None, type=int)  # Specify type as int
-        pos_y = self.settings.value('pos_y', None, type=int)
+        pos_x = self.settings.get_int('pos_x', None)
+        pos_y = self.settings.get_int('pos_y', None)
         
         if pos_x is not None and pos_y is not None:
             screen = QApplication.primaryScreen().geometry()
@@ -647,26 +818,45 @@ class SpeedMeter(DraggableWidget):
 
     def load_settings(self):
         try:
-            self.current_font_size = self.settings.value('font_size', 30, type=int)
-            self.opacity = self.settings.value('opacity', 0.8, type=float)
-            self.current_theme = self.settings.value('theme', 'dark', type=str)
-            self.show_colored_arrows = self.settings.value('colored_arrows', True, type=bool)
+            self.current_font_size = self.settings.get_int('font_size', 30)
+            self.opacity = self.normal_opacity = self.settings.get_float('opacity', 0.8)
+            self.current_theme = self.settings.get_str('theme', 'dark')
+            custom_bg = self.settings.get_str('custom_bg', '')
+            if custom_bg:
+                self.custom_colors = {'bg': custom_bg,
+                                      'text': self.settings.get_str('custom_text', self.text_color)}
+            self.show_colored_arrows = self.settings.get_bool('colored_arrows', True)
+            self.speed_calculator.set_smoothing(
+                self.settings.get_str('smoothing', 'instant'),
+                window=self.settings.get_float('smoothing_window', 1.0),
+                half_life=self.settings.get_float('smoothing_half_life', 0.5)
+            )
+            self.interface_filter.configure(
+                include=self.settings.get_list('interface_include', []),
+                exclude=self.settings.get_list('interface_exclude', list(DEFAULT_EXCLUDE)),
+                physical_only=self.settings.get_bool('physical_only', False)
+            )
         except Exception as e:
             logger.error(f"Error loading settings: {str(e)}")
             # Use defaults if settings load fails
             self.current_font_size = 30
-            self.opacity = 0.8
+            self.opacity = self.normal_opacity = 0.8
             self.current_theme = 'dark'
             self.show_colored_arrows = True
+            self.speed_calculator.set_smoothing('instant')
+            self.interface_filter.configure()
+        self.apply_arrow_colors()
+        self.apply_theme(self.current_theme)
+        # A custom theme whose colours weren't saved keeps the default one
+        self.current_theme = self.theme.name
+        self.main_widget.set_opacity(self.opacity)
 
     def moveEvent(self, event):
         """Called whenever the window is moved"""
         super().moveEvent(event)
-        # Save position after move is complete
-        if not self.dragging:  # Only save when not dragging to avoid excessive writes
-            self.settings.setValue('pos_x', self.pos().x())
-            self.settings.setValue('pos_y', self.pos().y())
-            self.settings.sync()  # Force settings to be written immediately
+        # Kept in memory; written once the window has stayed put for a moment
+        self.settings.set('pos_x', self.pos().x())
+        self.settings.set('pos_y', self.pos().y())
 
     def mouseMoveEvent(self, event: QMouseEvent):
         super().mouseMoveEvent(event)
@@ -679,11 +869,11 @@ class SpeedMeter(DraggableWidget):
         try:
             # If auto_start setting doesn't exist, create it as True
             if not self.settings.contains('auto_start'):
-                self.settings.setValue('auto_start', True)
+                self.settings.set('auto_start', True)
                 self.add_to_startup()  # Actually add to startup
                 self.auto_start = True
             else:
-                self.auto_start = self.settings.value('auto_start', True, type=bool)
+                self.auto_start = self.settings.get_bool('auto_start', True)
                 if self.auto_start and not self.is_in_startup():
                     self.add_to_startup()  # Ensure it's in startup if it should be
                 elif not self.auto_start and self.is_in_startup():
@@ -704,7 +894,7 @@ class SpeedMeter(DraggableWidget):
                 self.remove_from_startup()
                 
             self.auto_start = enable
-            self.settings.setValue('auto_start', enable)
+            self.settings.set('auto_start', enable)
             return True
         except Exception as e:
             logger.error(f"Error toggling startup: {e}")
@@ -712,6 +902,8 @@ class SpeedMeter(DraggableWidget):
 
     def is_in_startup(self):
         """Check if app is in startup registry"""
+        if winreg is None:
+            return False
         try:
             key = winreg.OpenKey(
                 winreg.HKEY_CURRENT_USER,
@@ -722,11 +914,13 @@ class SpeedMeter(DraggableWidget):
             value, _ = winreg.QueryValueEx(key, self.app_name)
             winreg.CloseKey(key)
             return value == self.get_executable_path()
-        except WindowsError:
+        except OSError:
             return False
 
     def add_to_startup(self):
         """Add app to startup registry"""
+        if winreg is None:
+            return
         key = winreg.OpenKey(
             winreg.HKEY_CURRENT_USER,
             self.startup_registry_path,
@@ -744,6 +938,8 @@ class SpeedMeter(DraggableWidget):
 
     def remove_from_startup(self):
         """Remove app from startup registry"""
+        if winreg is None:
+            return
         try:
             key = winreg.OpenKey(
                 winreg.HKEY_CURRENT_USER,
@@ -753,7 +949,7 @@ class SpeedMeter(DraggableWidget):
             )
             winreg.DeleteValue(key, self.app_name)
             winreg.CloseKey(key)
-        except WindowsError:
+        except OSError:
             pass
 
     def get_executable_path(self):
@@ -766,43 +962,52 @@ class SpeedMeter(DraggableWidget):
             return f'pythonw "{os.path.abspath(__file__)}"'
 
     def show(self):
-        """Override show method to ensure window stays on top"""
-        self.setWindowFlags(
-            Qt.FramelessWindowHint | 
-            Qt.WindowStaysOnTopHint | 
-            Qt.Tool |
-            Qt.SubWindow
-        )
+        """Show the window; the layering helper raises it once it is mapped"""
+        self.layering.apply()
         super().show()
-        self.raise_()
-        self.activateWindow()
-
-    def set_always_on_top(self):
-        """Ensure window is always on top"""
-        self.setWindowFlags(
-            Qt.FramelessWindowHint | 
-            Qt.WindowStaysOnTopHint | 
-            Qt.Tool |
-            Qt.SubWindow
-        )
-        if self.isVisible():
-            super().show()  # Use super().show() to avoid recursion
-            self.raise_()
-            self.activateWindow()
 
     def show_and_raise(self):
-        """Show window and ensure it's on top"""
-        self.show()  # Now just calls show() which already handles staying on top
+        """Show window, bring it to the front and give it focus, as asked from the tray"""
+        self.show()
+        self.raise_()
+        self.layering.activate()
 
     def showEvent(self, event):
-        """Override show event"""
+        """Sample at full rate again once visible"""
         super().showEvent(event)
-        self.raise_()
-        self.activateWindow()
+        if self.speed_thread is not None:
+            self.speed_thread.set_visible(True)
+        if self.burst_thread is not None:
+            self.burst_thread.set_visible(True)
+
+    def hideEvent(self, event):
+        """Sample less often while hidden in the tray"""
+        super().hideEvent(event)
+        if self.speed_thread is not None:
+            self.speed_thread.set_visible(False)
+        if self.burst_thread is not None:
+            # Nobody sees the peaks, so don't sample a thousand times a second
+            self.burst_thread.set_visible(False)
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    meter = SpeedMeter()
+    parser = argparse.ArgumentParser(description='Internet Speed Meter')
+    parser.add_argument('--replay', metavar='TRACE', help='show a recorded counter trace instead of live counters')
+    parser.add_argument('--replay-speed', type=float, default=1.0,
+                        help='replay speed factor, 0 for as fast as possible')
+    parser.add_argument('--metrics-port', type=int, default=None,
+                        help='serve OpenMetrics on this local port, 0 to disable (default: metrics_port setting)')
+    parser.add_argument('--fleet', action='store_true', default=None,
+                        help='show totals from a local fleet aggregator (default: fleet_view setting)')
+    parser.add_argument('--shared-memory', action='store_true', default=None,
+                        help='publish live rates in shared memory (default: shared_memory setting)')
+    parser.add_argument('--burst', action='store_true', default=None,
+                        help='sample at up to 1 kHz and show peaks (default: burst_mode setting)')
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    meter = SpeedMeter(replay_path=args.replay, replay_speed=args.replay_speed or None,
+                       metrics_port=args.metrics_port, shared_memory=args.shared_memory,
+                       fleet_view=args.fleet, burst_mode=args.burst)
     meter.show()
     sys.exit(app.exec_())
 
@@ -0,0 +1,45 @@
+import numpy as np
+
+from batch_analysis import analyze, compute_rates, trace_arrays
+from counter_trace import TraceRecorder
+from net_sampler import InterfaceTable
+
+
+def record_trace(path, samples=6, appears=3, lifetime=10 ** 10):
+    """eth0 moves 1000 B/s throughout; eth1 shows up with a large counter at sample `appears`"""
+    table = InterfaceTable()
+    table.add_interface('eth0')
+    recorder = TraceRecorder(str(path))
+    for n in range(samples):
+        if n == appears:
+            table.add_interface('eth1')
+        table.begin_tick(1000.0 + n)
+        table.bytes_recv[0] = 1000 * n
+        if n >= appears:
+            table.bytes_recv[1] = lifetime + 500 * (n - appears)
+        table.updated = len(table)
+        recorder.record(table)
+    recorder.close()
+
+
+def test_interface_appearing_mid_trace_has_no_lifetime_spike(tmp_path):
+    path = tmp_path / 'trace.nst'
+    record_trace(path)
+    timestamps, counters, names = trace_arrays(str(path))
+    assert names == ['eth0', 'eth1']
+    assert counters.mask[:3, 1].all() and not counters.mask[3:, 1].any()
+    result = analyze(timestamps, counters, window=2)
+    rates = result['rates']
+    assert np.array_equal(rates[:, 0], np.full(5, 1000.0))
+    assert np.isnan(rates[:3, 1]).all()
+    assert np.array_equal(rates[3:, 1], [500.0, 500.0])
+    assert not result['resets'].any()
+    assert result['percentiles'][99][1] == 500.0
+
+
+def test_interface_that_goes_away_and_comes_back_is_a_gap():
+    counters = np.ma.masked_array([[100, 5000], [200, 0], [300, 9000], [400, 9100]],
+                                  [[False, False], [False, True], [False, False], [False, False]])
+    rates, _, resets = compute_rates([0.0, 1.0, 2.0, 3.0], counters)
+    assert np.isnan(rates[:2, 1]).all() and rates[2, 1] == 100.0
+    assert not resets.any()
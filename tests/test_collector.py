@@ -0,0 +1,117 @@
+import threading
+
+from collector import Collector
+from history import HistoryStore
+from net_sampler import InterfaceFilter, NetSampler
+from speed_calculator import SpeedCalculator
+from test_net_sampler import Clock, ScriptedSource
+
+TICKS = 3
+
+
+class CountingScheduler:
+    """Lets a fixed number of ticks through, without sleeping"""
+
+    def __init__(self, ticks):
+        self.ticks = ticks
+
+    def wait(self):
+        self.ticks -= 1
+        return self.ticks >= 0
+
+    def report_activity(self, bytes_per_second):
+        pass
+
+    def set_visible(self, visible):
+        pass
+
+    def stop(self):
+        self.ticks = 0
+
+
+class SlowHistoryLog:
+    """A log whose replay blocks until released"""
+
+    def __init__(self, end):
+        self.end = end
+        self.release = threading.Event()
+        self.closed = False
+
+    def read(self, start=None, end=None):
+        self.release.wait(5)
+        for t in range(self.end - 600, self.end - 300):
+            yield t, 1.0, 500.0, 50.0
+
+    def append(self, timestamp, seconds, recv, sent):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_ticks_do_not_wait_for_the_history_replay():
+    readings = [{'eth0': (n * 1000, n * 100)} for n in range(TICKS)]
+    history = HistoryStore()
+    log = SlowHistoryLog(1_700_000_000)
+    collector = Collector(SpeedCalculator(), InterfaceFilter(exclude=()),
+                          NetSampler(ScriptedSource(readings), clock=Clock()), CountingScheduler(TICKS),
+                          history=history, history_log=log)
+    ticks = []
+    ticked = threading.Event()
+
+    def listener(download, upload, interval):
+        ticks.append(download)
+        if len(ticks) == TICKS - 1:
+            ticked.set()
+
+    collector.add_listener(listener)
+    runner = threading.Thread(target=collector.run)
+    runner.start()
+    assert ticked.wait(5)
+    runner.join(0.1)
+    # Every tick ran while the replay was still blocked; close() waits for it
+    assert len(ticks) == TICKS - 1
+    assert runner.is_alive() and not log.closed
+    log.release.set()
+    runner.join(5)
+    assert log.closed
+    points = history.query('recv', log.end - 600, log.end - 300)
+    assert sum(point.total for point in points) == 300 * 500.0
+
+
+def test_restored_history_never_overwrites_newer_buckets():
+    history = HistoryStore()
+    now = 1_700_000_000
+    history.record(now, 1.0, (1000.0, 100.0, 0.0, 0.0, 0.0, 0.0))
+    # One hour and one second earlier lands in the same slot of the second tier
+    history.load([(now - 3600, 1.0, 7.0, 7.0)])
+    points = history.query('recv', now - 10, now + 1)
+    assert [point.mean for point in points] == [1000.0]
+
+
+def run_steady(interface_quantiles):
+    readings = [{'eth0': (n * 1000, n * 100)} for n in range(TICKS + 1)]
+    calculator = SpeedCalculator()
+    collector = Collector(calculator, InterfaceFilter(exclude=()),
+                          NetSampler(ScriptedSource(readings), clock=Clock()), CountingScheduler(TICKS + 1),
+                          interface_quantiles=interface_quantiles)
+    collector.run()
+    return calculator, collector.sampler.table
+
+
+def test_interface_quantiles_are_fed_once_per_tick():
+    calculator, table = run_steady(True)
+    # Other consumers of the total rate, a benchmark say, must not feed the quantiles again
+    calculator.calculate_rates(table)
+    series = calculator.quantiles.series['eth0'][0]
+    series.flush()
+    # One second per tick, however often the rates are calculated
+    assert sum(series.windows['1 min'].counts.values()) == TICKS
+    download, upload = calculator.get_quantiles('eth0')['1 min']
+    assert abs(download[0] - 1000) <= 50 and abs(upload[0] - 100) <= 5
+
+
+def test_interface_quantiles_can_be_turned_off():
+    calculator, _ = run_steady(False)
+    assert calculator.quantiles.interfaces() == []
+    assert calculator.get_quantiles()['1 min'] is not None
@@ -0,0 +1,113 @@
+import asyncio
+import os
+import socket
+import uuid
+
+from fleet import HostHistory, RateAgent, aggregate, fleet_segment_name
+from shared_rates import SharedRatesReader
+
+AGENTS = 5
+CAPACITY = 3
+
+
+def free_udp_port():
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+async def run_fleet(name, port):
+    task = asyncio.create_task(aggregate('127.0.0.1', port, publish_period=0.05,
+                                         name=name, capacity=CAPACITY))
+    await asyncio.sleep(0.1)
+    agents = [RateAgent(None, '127.0.0.1', port, name=f'host-{n}') for n in range(AGENTS)]
+    try:
+        for n, agent in enumerate(agents):
+            agent.send(1000.0 * (n + 1), 100.0 * (n + 1), 1.0)
+        reader = None
+        for _ in range(100):
+            await asyncio.sleep(0.05)
+            try:
+                reader = reader or SharedRatesReader(name)
+            except FileNotFoundError:
+                continue
+            snapshot = reader.snapshot()
+            if snapshot.total == AGENTS:
+                reader.close()
+                return snapshot
+        raise AssertionError('the aggregator never published every agent')
+    finally:
+        for agent in agents:
+            agent.close()
+        task.cancel()
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+
+
+def test_agents_reach_the_reader_through_the_aggregator():
+    snapshot = asyncio.run(run_fleet(f'netspeedmeter-test-fleet-{uuid.uuid4().hex[:8]}', free_udp_port()))
+    # Every host counts towards the totals, only the busiest fit in the segment
+    assert snapshot.total == AGENTS
+    assert [host.name for host in snapshot.interfaces] == ['host-4', 'host-3', 'host-2']
+    assert snapshot.download == 1000.0 * (1 + 2 + 3 + 4 + 5)
+    assert snapshot.upload == 100.0 * (1 + 2 + 3 + 4 + 5)
+    assert snapshot.interfaces[0].recv_rate == 5000.0
+
+
+async def run_second_aggregator(name, port, second_port):
+    first = asyncio.create_task(aggregate('127.0.0.1', port, publish_period=0.05, name=name))
+    await asyncio.sleep(0.1)
+    try:
+        status = await asyncio.wait_for(aggregate('127.0.0.1', second_port, name=name), 2)
+    finally:
+        first.cancel()
+        try:
+            await first
+        except asyncio.CancelledError:
+            pass
+    return status
+
+
+def test_second_aggregator_exits_cleanly_without_binding():
+    second_port = free_udp_port()
+    status = asyncio.run(run_second_aggregator(f'netspeedmeter-test-fleet-{uuid.uuid4().hex[:8]}',
+                                               free_udp_port(), second_port))
+    assert status == 1
+    # The segment was refused before the port was taken, so nothing is left bound
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+        sock.bind(('127.0.0.1', second_port))
+
+
+def test_fleet_segment_is_per_user():
+    assert fleet_segment_name() != 'netspeedmeter-fleet'
+    if hasattr(os, 'getuid'):
+        assert fleet_segment_name().endswith(f'-{os.getuid()}')
+
+
+def test_agent_restarting_within_its_first_minute_is_not_discarded():
+    host = HostHistory('crashloop')
+    for sequence in range(1, 11):
+        assert host.add(sequence, 1000.0 + sequence, 100.0, 10.0, 1000.0 + sequence)
+    # Restarted at sequence 1, a second later
+    assert host.add(1, 1011.0, 200.0, 20.0, 1011.0)
+    assert host.latest()[1:] == (200.0, 20.0)
+    assert host.add(2, 1012.0, 300.0, 30.0, 1012.0)
+    assert host.lost == 0
+
+
+def test_reordered_datagram_is_still_discarded():
+    host = HostHistory('reorder')
+    for sequence in (1, 2, 4):
+        assert host.add(sequence, 1000.0 + sequence, 100.0 * sequence, 10.0, 1000.0 + sequence)
+    assert not host.add(3, 1003.0, 300.0, 30.0, 1004.1)
+    assert host.latest()[1:] == (400.0, 10.0)
+
+
+def test_agent_back_after_a_silence_with_a_lower_sequence_is_a_restart():
+    host = HostHistory('rebooted')
+    for sequence in range(1, 11):
+        assert host.add(sequence, 1000.0 + sequence, 100.0, 10.0, 1000.0 + sequence)
+    # Wall clock stepped back on reboot, but the host was gone for a while
+    assert host.add(3, 900.0, 200.0, 20.0, 1030.0)
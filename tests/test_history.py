@@ -0,0 +1,30 @@
+from history import HistoryStore
+
+
+def filled_store(seconds, end=1_700_000_000):
+    store = HistoryStore()
+    for t in range(end - seconds, end):
+        store.record(t + 1, 1.0, (1000.0, 100.0, 10.0, 1.0, 0.0, 0.0))
+    return store, end
+
+
+def test_fine_query_over_a_day_falls_back_to_a_tier_that_covers_it():
+    store, end = filled_store(2 * 3600)
+    points = store.query('recv', end - 2 * 3600, end, resolution=1)
+    # The second tier only keeps an hour; minute buckets reach back to the start
+    assert points[0].time <= end - 2 * 3600 + 60
+    assert {point.seconds for point in points[1:-1]} == {60.0}
+    assert sum(point.total for point in points) == 2 * 3600 * 1000.0
+
+
+def test_fine_query_within_the_hour_stays_at_one_second():
+    store, end = filled_store(2 * 3600)
+    points = store.query('recv', end - 600, end, resolution=1)
+    assert len(points) == 600
+    assert all(point.seconds == 1.0 for point in points)
+
+
+def test_coarse_resolution_uses_coarse_buckets():
+    store, end = filled_store(2 * 3600)
+    assert store.tier_for(60, end - 600, end).name == 'minute'
+    assert store.tier_for(3600, end - 600, end).name == 'hour'
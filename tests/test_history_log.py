@@ -0,0 +1,43 @@
+import os
+
+from history_log import RECORD, SEGMENT_HEADER, HistoryLog
+
+RECORDS_PER_SEGMENT = 10
+
+
+def fill(log, start, count):
+    for t in range(start, start + count):
+        log.append(float(t), 1.0, 1000.0, 100.0)
+    return start + count
+
+
+def test_segment_retired_during_a_read_is_closed_once_the_read_ends(tmp_path):
+    log = HistoryLog(str(tmp_path), segment_size=SEGMENT_HEADER.size + RECORDS_PER_SEGMENT * RECORD.size,
+                     flush_interval=3600)
+    t = fill(log, 1000, RECORDS_PER_SEGMENT + 1)
+    first = log.segment
+    reader = log.read()
+    assert next(reader) == (1000.0, 1.0, 1000.0, 100.0)
+    # The first segment fills up and is retired while the reader is inside it
+    fill(log, t, 2)
+    assert log.segment is not first
+    log._maintain()
+    assert not first.map.closed
+    # A read covers the segments and records there were when it started
+    assert [record[0] for record in reader] == [float(n) for n in range(1001, 1000 + RECORDS_PER_SEGMENT)]
+    log._maintain()
+    assert first.map.closed
+    assert log.retired == []
+    assert os.path.getsize(first.path) == SEGMENT_HEADER.size + RECORDS_PER_SEGMENT * RECORD.size
+    log.close()
+
+
+def test_close_leaves_a_segment_being_read_mapped(tmp_path):
+    log = HistoryLog(str(tmp_path), flush_interval=3600)
+    fill(log, 1000, 5)
+    current = log.segment
+    reader = log.read()
+    next(reader)
+    log.close()
+    assert not current.map.closed
+    assert [record[0] for record in reader] == [1001.0, 1002.0, 1003.0]
@@ -0,0 +1,40 @@
+import time
+
+from counter_sources import CounterSource, ProcNetDevCounterSource
+from microburst import BurstSampler
+from net_sampler import InterfaceFilter
+from test_net_sampler import PAGE, page_reads, proc_net_dev
+
+
+class FailingSource(CounterSource):
+    def __init__(self):
+        self.reads = 0
+
+    def read(self, table):
+        self.reads += 1
+        raise OSError('counters unavailable')
+
+
+def test_procfs_totals_cover_more_than_a_page(tmp_path, monkeypatch):
+    page_reads(monkeypatch)
+    path = tmp_path / 'dev'
+    path.write_text(proc_net_dev([(f'veth{n:08x}', 1000, 100) for n in range(200)]))
+    assert path.stat().st_size > 2 * PAGE
+    sampler = BurstSampler(InterfaceFilter(exclude=()), source=ProcNetDevCounterSource(str(path)))
+    assert sampler.read_totals() == (200 * 1000, 200 * 100)
+    sampler.source.close()
+
+
+def test_errors_back_off_after_a_quick_hide_and_show():
+    source = FailingSource()
+    sampler = BurstSampler(InterfaceFilter(exclude=()), source=source)
+    # Unpausing while the thread hasn't slept on it yet leaves the wake-up set
+    sampler.set_paused(True)
+    sampler.set_paused(False)
+    sampler.start()
+    deadline = time.monotonic() + 2
+    while not source.reads and time.monotonic() < deadline:
+        time.sleep(0.01)
+    time.sleep(0.3)
+    sampler.stop()
+    assert source.reads == 1
@@ -0,0 +1,43 @@
+import sys
+
+import pytest
+
+if not sys.platform.startswith('linux'):
+    pytest.skip('network namespaces are Linux only', allow_module_level=True)
+
+from namespaces import NamespaceCounters
+from test_net_sampler import page_reads, proc_net_dev
+
+PID = 99999999   # never a live process, so no pidfd is watched
+CONTAINER = '0123456789abcdef0123'
+INTERFACES = 200
+
+
+class FixedClock:
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_namespace_with_many_interfaces_is_read_whole(tmp_path, monkeypatch):
+    page_reads(monkeypatch)
+    proc = tmp_path / 'proc'
+    (proc / str(PID) / 'ns').mkdir(parents=True)
+    (proc / str(PID) / 'net').mkdir()
+    (proc / str(PID) / 'ns' / 'net').write_text('')
+    (proc / str(PID) / 'cgroup').write_text(f'0::/system.slice/docker-{CONTAINER}.scope\n')
+    dev = proc / str(PID) / 'net' / 'dev'
+    names = [f'eth{n}' for n in range(INTERFACES)]
+    dev.write_text(proc_net_dev([(name, 1000, 100) for name in names]))
+
+    clock = FixedClock()
+    counters = NamespaceCounters(proc=str(proc), netns_dir=str(tmp_path / 'netns'), clock=clock)
+    counters.update()
+    dev.write_text(proc_net_dev([(name, 3000, 300) for name in names]))
+    clock.now += 2.0
+    counters.update()
+    assert counters.rates == [(CONTAINER[:12], INTERFACES * 1000.0, INTERFACES * 100.0)]
+    assert counters.scans == 1
+    counters.close()
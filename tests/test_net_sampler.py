@@ -0,0 +1,106 @@
+import os
+
+from counter_sources import CounterSource, ProcNetDevCounterSource
+from net_sampler import InterfaceFilter, NetSampler
+from speed_calculator import SpeedCalculator
+
+PROC_HEADER = ('Inter-|   Receive                                                |  Transmit\n'
+               ' face |bytes    packets errs drop fifo frame compressed multicast|'
+               'bytes    packets errs drop fifo colls carrier compressed\n')
+
+
+PAGE = 4096   # what a procfs seq_file hands out per read
+
+
+def proc_net_dev(lines):
+    """/proc/net/dev text for (name, bytes_recv, bytes_sent) rows"""
+    rows = ''.join(f'{name}: {recv} 1 0 0 0 0 0 0 {sent} 1 0 0 0 0 0 0\n' for name, recv, sent in lines)
+    return PROC_HEADER + rows
+
+
+def page_reads(monkeypatch):
+    """Make every pread return at most a page, like procfs does"""
+    preadv = os.preadv
+    monkeypatch.setattr(os, 'preadv', lambda fd, buffers, offset: preadv(fd, [buffers[0][:PAGE]], offset))
+
+
+class ScriptedSource(CounterSource):
+    """Reports {name: (bytes_recv, bytes_sent)} from a list, one entry per tick"""
+
+    def __init__(self, readings):
+        self.readings = iter(readings)
+
+    def read(self, table):
+        reading = next(self.readings)
+        for name, (recv, sent) in reading.items():
+            i = table.index.get(name)
+            if i is None:
+                i = table.add_interface(name)
+            table.bytes_recv[i] = recv
+            table.bytes_sent[i] = sent
+            table.seen[i] = table.tick
+        table.updated = len(reading)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        self.now += 1.0
+        return self.now
+
+
+def rates(sampler, ticks):
+    calculator = SpeedCalculator()
+    interface_filter = InterfaceFilter(exclude=())
+    return [calculator.calculate_rates(sampler.sample(), interface_filter) for _ in range(ticks)]
+
+
+def test_hot_plugged_interface_starts_from_its_first_reading():
+    lifetime = 10 * 1024 ** 3
+    source = ScriptedSource([
+        {'eth0': (1000, 100)},
+        {'eth0': (2000, 200)},
+        {'eth0': (3000, 300), 'eth1': (lifetime, lifetime)},
+        {'eth0': (4000, 400), 'eth1': (lifetime + 500, lifetime + 50)},
+    ])
+    result = rates(NetSampler(source, clock=Clock()), 4)
+    assert result[1] == (1000.0, 100.0)
+    # eth1 appears with 10 GB on its counters: no delta for it yet
+    assert result[2] == (1000.0, 100.0)
+    assert result[3] == (1500.0, 150.0)
+
+
+def test_hot_plugged_interface_in_proc_net_dev(tmp_path):
+    path = tmp_path / 'dev'
+
+    def write(lines):
+        path.write_text(proc_net_dev(lines))
+
+    write([('eth0', 1000, 100)])
+    sampler = NetSampler(ProcNetDevCounterSource(str(path)), clock=Clock())
+    calculator = SpeedCalculator()
+    interface_filter = InterfaceFilter(exclude=())
+    calculator.calculate_rates(sampler.sample(), interface_filter)
+    write([('eth0', 2000, 200), ('veth1a2b', 10 ** 10, 10 ** 10)])
+    assert calculator.calculate_rates(sampler.sample(), interface_filter) == (1000.0, 100.0)
+    write([('eth0', 3000, 300), ('veth1a2b', 10 ** 10 + 700, 10 ** 10 + 70)])
+    assert calculator.calculate_rates(sampler.sample(), interface_filter) == (1700.0, 170.0)
+    sampler.close()
+
+
+def test_proc_net_dev_longer_than_a_read(tmp_path, monkeypatch):
+    page_reads(monkeypatch)
+    path = tmp_path / 'dev'
+    veths = [f'veth{n:08x}' for n in range(200)]
+    path.write_text(proc_net_dev([(name, 1000, 100) for name in veths]))
+    assert path.stat().st_size > 2 * PAGE
+    sampler = NetSampler(ProcNetDevCounterSource(str(path), buffer_size=1024), clock=Clock())
+    calculator = SpeedCalculator()
+    interface_filter = InterfaceFilter(exclude=())
+    calculator.calculate_rates(sampler.sample(), interface_filter)
+    path.write_text(proc_net_dev([(name, 2000, 200) for name in veths]))
+    assert calculator.calculate_rates(sampler.sample(), interface_filter) == (200 * 1000.0, 200 * 100.0)
+    assert sampler.table.names == veths
+    sampler.close()
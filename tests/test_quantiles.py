@@ -0,0 +1,39 @@
+from quantiles import EXPIRY_PERIOD, QuantileTracker
+
+DAY = 24 * 3600
+
+
+def test_interface_idle_for_longer_than_a_day_is_dropped():
+    tracker = QuantileTracker()
+    tracker.add('veth1', 0.0, 1000.0, 100.0, 1.0)
+    tracker.add('eth0', 0.0, 1000.0, 100.0, 1.0)
+    for t in range(1, DAY + 120, 30):
+        tracker.add('eth0', float(t), 1000.0, 100.0, 1.0)
+        tracker.add(QuantileTracker.TOTAL, float(t), 1000.0, 100.0, 1.0)
+    assert tracker.interfaces() == ['eth0']
+    assert tracker.summary('veth1') == {}
+    assert tracker.summary()['24 h'] is not None
+
+
+def test_interface_seen_within_the_day_is_kept():
+    tracker = QuantileTracker()
+    tracker.add('veth1', 0.0, 1000.0, 100.0, 1.0)
+    tracker.add('eth0', DAY - 60.0, 1000.0, 100.0, 1.0)
+    assert sorted(tracker.interfaces()) == ['eth0', 'veth1']
+    assert tracker.summary('veth1', now=DAY - 60.0)['24 h'][0] is not None
+
+
+def test_series_are_capped_and_the_idlest_goes_first():
+    tracker = QuantileTracker(max_series=3)
+    for n, name in enumerate(('veth1', 'veth2', 'veth3')):
+        tracker.add(name, float(n), 1000.0, 100.0, 1.0)
+    tracker.add(QuantileTracker.TOTAL, 2.0, 1000.0, 100.0, 1.0)
+    # All three still active: a fourth is not tracked rather than evicting one
+    tracker.add('veth4', 3.0, 1000.0, 100.0, 1.0)
+    assert sorted(tracker.interfaces()) == ['veth1', 'veth2', 'veth3']
+    later = EXPIRY_PERIOD + 5.0
+    tracker.add('veth2', later, 1000.0, 100.0, 1.0)
+    tracker.add('veth3', later, 1000.0, 100.0, 1.0)
+    tracker.add('veth4', later, 1000.0, 100.0, 1.0)
+    assert sorted(tracker.interfaces()) == ['veth2', 'veth3', 'veth4']
+    assert tracker.summary()['1 min'] is not None
@@ -0,0 +1,57 @@
+import os
+import subprocess
+import sys
+import uuid
+
+import pytest
+
+from shared_rates import (HEADER, SHARED_MAGIC, SHARED_VERSION, ENTRY, SharedRatesPublisher,
+                          SharedRatesReader, attach, default_segment_name, segment_size)
+from multiprocessing import shared_memory
+
+
+@pytest.fixture
+def name():
+    return f'netspeedmeter-test-{uuid.uuid4().hex[:12]}'
+
+
+def dead_pid():
+    process = subprocess.Popen([sys.executable, '-c', 'pass'])
+    process.wait()
+    return process.pid
+
+
+def test_default_segment_is_per_user():
+    assert default_segment_name() != 'netspeedmeter'
+    if hasattr(os, 'getuid'):
+        assert default_segment_name().endswith(f'-{os.getuid()}')
+
+
+def test_second_publisher_does_not_steal_a_live_segment(name):
+    first = SharedRatesPublisher(name=name)
+    try:
+        reader = SharedRatesReader(name)
+        with pytest.raises(FileExistsError):
+            SharedRatesPublisher(name=name)
+        first.write(1.0, 1.0, 123.0, 45.0, [])
+        assert reader.rates() == (123.0, 45.0)
+        reader.close()
+    finally:
+        first.close()
+
+
+def test_segment_of_a_dead_publisher_is_replaced(name):
+    stale = shared_memory.SharedMemory(name, create=True, size=segment_size(4))
+    HEADER.pack_into(stale.buf, 0, SHARED_MAGIC, SHARED_VERSION, ENTRY.size, 8, 4, 0,
+                     0.0, 0.0, 9.0, 9.0, dead_pid(), 0)
+    stale.close()
+    publisher = SharedRatesPublisher(name=name)
+    try:
+        publisher.write(2.0, 1.0, 1.0, 2.0, [])
+        reader = SharedRatesReader(name)
+        assert reader.rates() == (1.0, 2.0)
+        reader.close()
+    finally:
+        publisher.close()
+    with pytest.raises(FileNotFoundError):
+        attach(name)
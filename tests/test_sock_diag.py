@@ -0,0 +1,95 @@
+import os
+import socket
+import sys
+import time
+
+import pytest
+
+if not sys.platform.startswith('linux'):
+    pytest.skip('sock_diag is Linux only', allow_module_level=True)
+
+from sock_diag import SockDiag, TcpEndpoints
+
+PAYLOAD = 3 * 65536 + 123
+
+
+@pytest.fixture
+def diag():
+    try:
+        diag = SockDiag()
+    except OSError as e:
+        pytest.skip(f'NETLINK_SOCK_DIAG unavailable: {e}')
+    yield diag
+    diag.close()
+
+
+@pytest.fixture
+def connection():
+    """A loopback TCP pair: (client, server, server port)"""
+    listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(1)
+    client = socket.create_connection(listener.getsockname())
+    server, _ = listener.accept()
+    listener.close()
+    yield client, server, server.getsockname()[1]
+    client.close()
+    server.close()
+
+
+def inode(sock):
+    return os.fstat(sock.fileno()).st_ino
+
+
+def transfer(client, server, size=PAYLOAD):
+    client.sendall(b'x' * size)
+    received = 0
+    while received < size:
+        received += len(server.recv(size - received))
+
+
+def settled(read, check, timeout=2.0):
+    """Re-read until check passes: acks can trail the data by a moment"""
+    deadline = time.monotonic() + timeout
+    while True:
+        value = read()
+        if check(value) or time.monotonic() > deadline:
+            return value
+        time.sleep(0.01)
+
+
+def test_tcp_bytes_counts_a_loopback_transfer(diag, connection):
+    client, server, _ = connection
+    transfer(client, server)
+    counters = settled(lambda: diag.tcp_bytes(include_loopback=True),
+                       lambda c: c.get(inode(client), (0, 0))[1] >= PAYLOAD)
+    # (bytes received, bytes acked); the kernel counts the SYN as one byte acked
+    assert counters[inode(client)] in ((0, PAYLOAD), (0, PAYLOAD + 1))
+    assert counters[inode(server)] == (PAYLOAD, 0)
+    without_loopback = diag.tcp_bytes(include_loopback=False)
+    assert inode(client) not in without_loopback and inode(server) not in without_loopback
+
+
+def test_endpoints_credit_the_transfer_to_the_remote_port(diag, connection):
+    client, server, port = connection
+    endpoints = TcpEndpoints(diag, include_loopback=True)
+    endpoints.update()
+    transfer(client, server)
+
+    def update():
+        endpoints.update()
+        return dict((name, (recv, sent)) for name, recv, sent in endpoints.top(1000))
+
+    top = settled(update, lambda top: top.get(f'127.0.0.1:{port}', (0, 0))[1] >= PAYLOAD)
+    # The client's remote end is the server port; the server's is the client's ephemeral port
+    assert top[f'127.0.0.1:{port}'] == (0, PAYLOAD)
+    assert top[f'127.0.0.1:{client.getsockname()[1]}'] == (PAYLOAD, 0)
+
+
+def test_abandoned_dump_does_not_cut_the_next_one_short(diag, connection):
+    client, server, _ = connection
+    dump = diag.dump(socket.AF_INET)
+    next(dump)
+    dump.close()
+    counters = diag.tcp_bytes(include_loopback=True)
+    assert inode(client) in counters and inode(server) in counters
@@ -0,0 +1,29 @@
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PyQt5.QtWidgets')
+
+from speed_display import SpeedDisplay
+
+
+@pytest.fixture(scope='module')
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def test_moving_to_a_screen_with_another_scale_rerenders_the_glyphs(app):
+    window = QtWidgets.QWidget()
+    display = SpeedDisplay('↓', '1.23 KB/s', window)
+    window.show()
+    app.processEvents()
+    assert display.cache.pixel_ratio == display.devicePixelRatioF()
+    ratio = display.cache.pixel_ratio * 2
+    # Stands in for the new screen's scale; the offscreen platform only has one screen
+    display.devicePixelRatioF = lambda: ratio
+    window.windowHandle().screenChanged.emit(window.windowHandle().screen())
+    assert display.cache.pixel_ratio == ratio
+    assert display.arrow_cache.pixel_ratio == ratio
+    assert display.cache.glyph('1').devicePixelRatio() == ratio
+    window.close()
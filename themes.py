@@ -0,0 +1,123 @@
+from PyQt5.QtCore import QRectF, QTimeLine
+from PyQt5.QtGui import QBrush, QColor, QPainter, QPalette, QPen
+from PyQt5.QtWidgets import QWidget
+
+# Built-in themes: background and text colour; the background's alpha comes from the opacity
+THEMES = {
+    'light': {'bg': '#f0f0f0', 'text': '#333333'},
+    'dark': {'bg': '#000000', 'text': '#E0E0E0'},
+}
+BORDER_COLOR = QColor(255, 255, 255, 25)   # a faint outline that shows on any background
+CORNER_RADIUS = 10
+HOVER_FADE_MS = 150   # duration of the opacity change when the pointer enters or leaves
+HOVER_FRAME_MS = 30   # between fade frames; every frame repaints the whole window
+CACHED_THEMES = 16    # compiled themes kept, built-in ones included
+
+
+class Theme:
+    """A theme turned into ready Qt objects once, instead of a style sheet per change.
+
+    Brushes for the background are kept per alpha level, so fading the
+    opacity on hover reuses them rather than building colours every frame.
+    """
+
+    def __init__(self, name, background, text):
+        self.name = name
+        self.background = QColor(background)
+        self.text = QColor(text).name()
+        self.border = QPen(BORDER_COLOR, 1)
+        self._brushes = {}   # alpha -> QBrush
+
+    def brush(self, opacity):
+        alpha = max(0, min(int(opacity * 255), 255))
+        brush = self._brushes.get(alpha)
+        if brush is None:
+            color = QColor(self.background)
+            color.setAlpha(alpha)
+            brush = self._brushes[alpha] = QBrush(color)
+        return brush
+
+
+class ThemeCache:
+    """Compiled themes by name and colours, custom ones from the settings dialog included"""
+
+    def __init__(self):
+        self.themes = {}     # (name, background, text) -> Theme
+        self.palettes = {}   # text colour -> QPalette
+
+    def get(self, name, custom_colors=None, default_text='#E0E0E0'):
+        """Compiled theme, or None for a custom theme without colours"""
+        if name == 'custom':
+            if not custom_colors or 'bg' not in custom_colors:
+                return None
+            colors = {'bg': custom_colors['bg'], 'text': custom_colors.get('text', default_text)}
+        else:
+            colors = THEMES.get(name, THEMES['dark'])
+        key = (name, colors['bg'], colors['text'])
+        theme = self.themes.get(key)
+        if theme is None:
+            if len(self.themes) >= CACHED_THEMES:
+                self.themes.clear()
+            theme = self.themes[key] = Theme(name, colors['bg'], colors['text'])
+        return theme
+
+    def text_palette(self, color):
+        """Palette that colours a QLabel's text, in place of a style sheet"""
+        palette = self.palettes.get(color)
+        if palette is None:
+            palette = QPalette()
+            palette.setColor(QPalette.WindowText, QColor(color))
+            palette.setColor(QPalette.Text, QColor(color))
+            self.palettes[color] = palette
+        return palette
+
+
+class ThemedPanel(QWidget):
+    """The meter's rounded background, painted from a compiled Theme.
+
+    Changing the opacity only picks another cached brush and repaints;
+    nothing is parsed or re-polished. fade_to() animates the change at a
+    modest frame rate, since each frame repaints the labels on top too.
+    """
+
+    def __init__(self, theme=None, opacity=1.0, parent=None):
+        super().__init__(parent)
+        self.theme = theme
+        self.opacity = opacity
+        self.fade_from = self.fade_target = opacity
+        self.fade = QTimeLine(HOVER_FADE_MS, self)
+        self.fade.setUpdateInterval(HOVER_FRAME_MS)
+        self.fade.valueChanged.connect(self._fade_step)
+
+    def set_theme(self, theme):
+        if theme is not self.theme:
+            self.theme = theme
+            self.update()
+
+    def set_opacity(self, opacity):
+        self.fade.stop()
+        self._set_opacity(opacity)
+
+    def fade_to(self, opacity):
+        """Animate the opacity from wherever it is now"""
+        self.fade.stop()
+        self.fade_from, self.fade_target = self.opacity, opacity
+        self.fade.start()
+
+    def _fade_step(self, progress):
+        self._set_opacity(self.fade_from + (self.fade_target - self.fade_from) * progress)
+
+    def _set_opacity(self, opacity):
+        if opacity != self.opacity:
+            self.opacity = opacity
+            self.update()
+
+    def paintEvent(self, event):
+        if self.theme is None:
+            return
+        painter = QPainter(self)
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(self.theme.border)
+        painter.setBrush(self.theme.brush(self.opacity))
+        painter.drawRoundedRect(QRectF(self.rect()).adjusted(0.5, 0.5, -0.5, -0.5), CORNER_RADIUS, CORNER_RADIUS)
+        painter.end()
@@ -0,0 +1,123 @@
+import logging
+import time
+
+from PyQt5.QtCore import QEvent, QObject, Qt, QTimer
+from PyQt5.QtGui import QGuiApplication, QPlatformSurfaceEvent
+from PyQt5.QtWidgets import QApplication
+
+logger = logging.getLogger('NetSpeedMeter')
+
+# Frameless, above other windows and kept out of the taskbar
+WINDOW_FLAGS = Qt.FramelessWindowHint | Qt.WindowStaysOnTopHint | Qt.Tool | Qt.SubWindow
+
+RAISE_DELAY_MS = 250         # coalesces a burst of stacking events into one raise
+REPORT_INTERVAL_MS = 3600 * 1000
+# Platforms where a client can't restack its own windows, so raising is pointless
+NO_RAISE_PLATFORMS = ('wayland', 'offscreen', 'minimal')
+
+
+class WindowLayering(QObject):
+    """Keeps a top-level widget above other windows without polling.
+
+    The stay-on-top flags are set once, and the window manager honours them
+    (_NET_WM_STATE_ABOVE on X11, topmost on Windows). All that is left is
+    putting the window back up after its stacking really changed: it was
+    shown or restored, another application's window was activated, or it
+    moved to another screen. Those events schedule one raise_(), a restack
+    request that neither recreates the native window nor takes focus. On
+    Wayland clients can't restack themselves, so nothing is attempted and
+    the compositor's layering stands.
+
+    Native window creations, raises and activations are counted and logged
+    once an hour, since re-setting window flags on most platforms destroys
+    and recreates the native window.
+    """
+
+    def __init__(self, widget, clock=time.monotonic):
+        super().__init__(widget)
+        self.widget = widget
+        self.clock = clock
+        platform = QGuiApplication.platformName()
+        self.can_raise = not platform.startswith(NO_RAISE_PLATFORMS)
+        self.native_windows = 0   # created for the widget, the first one included
+        self.raises = 0
+        self.activations = 0
+        self.started = clock()
+        self._window = None
+        self._raise_timer = QTimer(self)
+        self._raise_timer.setSingleShot(True)
+        self._raise_timer.setInterval(RAISE_DELAY_MS)
+        self._raise_timer.timeout.connect(self.raise_now)
+        self._report_timer = QTimer(self)
+        self._report_timer.timeout.connect(self.log_summary)
+        self._report_timer.start(REPORT_INTERVAL_MS)
+        self.apply()
+        widget.installEventFilter(self)
+
+    def apply(self):
+        """Set the window flags, unless they are already in place"""
+        if int(self.widget.windowFlags()) & int(WINDOW_FLAGS) != int(WINDOW_FLAGS):
+            self.widget.setWindowFlags(WINDOW_FLAGS)
+
+    def eventFilter(self, obj, event):
+        kind = event.type()
+        if kind == QEvent.PlatformSurface:
+            if event.surfaceEventType() == QPlatformSurfaceEvent.SurfaceCreated:
+                self.native_windows += 1
+                if self.native_windows > 1:
+                    logger.debug(f"Native window recreated ({self.native_windows - 1} so far)")
+                self.watch_screen()
+        elif kind == QEvent.Show or kind == QEvent.WindowDeactivate:
+            self.schedule_raise()
+        elif kind == QEvent.WindowStateChange and not self.widget.isMinimized():
+            self.schedule_raise()
+        return False
+
+    def watch_screen(self):
+        window = self.widget.windowHandle()
+        if window is not None and window is not self._window:
+            self._window = window
+            window.screenChanged.connect(self.schedule_raise)
+
+    def schedule_raise(self, *args):
+        if self.can_raise:
+            self._raise_timer.start()
+
+    def raise_now(self):
+        widget = self.widget
+        if not widget.isVisible() or widget.isMinimized():
+            return
+        active = QApplication.activeWindow()
+        if QApplication.activePopupWidget() or (active is not None and active is not widget):
+            # One of our own dialogs or menus is in front; don't cover it
+            return
+        widget.raise_()
+        self.raises += 1
+
+    def activate(self):
+        """Give the widget focus; only for explicit requests like the tray's Show"""
+        self.widget.activateWindow()
+        self.activations += 1
+
+    def stats(self):
+        hours = max(self.clock() - self.started, 1.0) / 3600
+        recreations = max(self.native_windows - 1, 0)
+        return {
+            'hours': hours,
+            'native_windows': self.native_windows,
+            'recreations_per_hour': recreations / hours,
+            'raises_per_hour': self.raises / hours,
+            'activations_per_hour': self.activations / hours,
+        }
+
+    def log_summary(self):
+        stats = self.stats()
+        logger.info(f"Window layering over {stats['hours']:.1f} h: "
+                    f"{stats['recreations_per_hour']:.1f} native window recreations, "
+                    f"{stats['raises_per_hour']:.1f} raises and "
+                    f"{stats['activations_per_hour']:.1f} activations per hour")
+
+    def stop(self):
+        self._raise_timer.stop()
+        self._report_timer.stop()
+        self.log_summary()